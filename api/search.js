@@ -1,73 +1,47 @@
-const fs = require('fs');
+const os = require('os');
 const path = require('path');
+const { PackedSearch } = require('../backend/packed-search');
+const { TranscriptStore } = require('../backend/transcript-store');
+const { QueryCache, corpusVersion } = require('../backend/query-cache');
 
-// Load transcript cache data 
-function loadTranscriptCache() {
-  try {
-    const cacheDir = path.join(process.cwd(), 'api', 'transcript-cache');
-    const cacheFiles = fs.readdirSync(cacheDir);
-    const videos = [];
-    
-    for (const file of cacheFiles) {
-      if (file.endsWith('_real.json')) {
-        try {
-          const videoId = file.replace('_real.json', '');
-          const data = JSON.parse(fs.readFileSync(path.join(cacheDir, file), 'utf8'));
-          
-          if (data.transcript && data.transcript.length > 0) {
-            videos.push({
-              id: data.video_id || data.videoId || videoId,
-              title: data.video_title || data.videoTitle || `Video ${videoId}`,
-              duration: Math.max(...data.transcript.map(t => t.start)) + 30,
-              transcript: data.transcript,
-              method: 'cached-real'
-            });
-          }
-        } catch (error) {
-          // Skip invalid cache files
-        }
-      }
+const storeDir = path.join(process.cwd(), 'transcript-store');
+
+// The store and its search indexes are generated at deploy time (vercel.json buildCommand:
+// npm run build:store); the serverless filesystem is read-only, so nothing is built here
+const MISSING_STORE = 'transcript-store/ is missing from this deployment; build it with `npm run build:store`';
+
+// Loaded once per warm instance instead of on every request
+let packedSearch;
+let transcriptStore;
+
+// Query results, saved to /tmp for later instances on the same host;
+// a query_cache.json deployed with transcript-store warms fresh instances
+const queryCache = new QueryCache({ filePath: path.join(os.tmpdir(), 'ltw-query-cache.json') });
+let queryCacheWarmed = false;
+
+function loadQueryCache() {
+  if (!transcriptStore) {
+    transcriptStore = TranscriptStore.load(storeDir);
+    if (!transcriptStore) throw new Error(MISSING_STORE);
+  }
+  queryCache.setVersion(corpusVersion(transcriptStore, loadPackedSearch()));
+  if (!queryCacheWarmed) {
+    queryCacheWarmed = true;
+    const warmed = queryCache.load() + queryCache.load(path.join(storeDir, 'query_cache.json'));
+    if (warmed > 0) {
+      console.log(`Query cache warmed with ${warmed} entries`);
     }
-    
-    return videos;
-  } catch (error) {
-    console.log('Cache loading failed, using fallback');
-    return [{
-      id: 'dQw4w9WgXcQ',
-      title: 'Rick Astley - Never Gonna Give You Up',
-      duration: 212,
-      transcript: [
-        { start: 43, text: "Never gonna give you up" },
-        { start: 45, text: "Never gonna let you down" },
-        { start: 47, text: "Never gonna run around and desert you" }
-      ],
-      method: 'fallback'
-    }];
   }
+  return queryCache;
 }
 
-// Simple search function
-function searchTranscripts(query, videos) {
-  const results = [];
-  const searchLower = query.toLowerCase();
-  
-  for (const video of videos) {
-    for (const segment of video.transcript) {
-      if (segment.text && segment.text.toLowerCase().includes(searchLower)) {
-        results.push({
-          videoId: video.id,
-          title: video.title,
-          startTime: Math.floor(segment.start),
-          transcript: segment.text,
-          similarity: 0.9,
-          searchQuery: query,
-          method: video.method
-        });
-      }
-    }
+// corpus.pack + search indexes (built into the store by backend/corpus_pack.py --index)
+function loadPackedSearch() {
+  if (!packedSearch) {
+    packedSearch = PackedSearch.load(storeDir);
+    if (!packedSearch) throw new Error(`${MISSING_STORE} (no corpus.pack)`);
   }
-  
-  return results.slice(0, 10); // Limit to 10 results
+  return packedSearch;
 }
 
 export default async function handler(req, res) {
@@ -94,12 +68,19 @@ export default async function handler(req, res) {
     console.log(`🔍 Searching for: "${query}"`);
     const startTime = Date.now();
     
-    // Load videos and search
-    const videos = loadTranscriptCache();
-    const results = searchTranscripts(query, videos);
+    const cache = loadQueryCache();
+    const cacheKey = cache.key(query, 10);
+    let search = cache.get(cacheKey);
+    const cached = search !== undefined;
+    if (!cached) {
+      const corpus = loadPackedSearch();
+      search = { results: corpus.search(query, 10), videosInDatabase: corpus.videoCount, method: 'packed-search' };
+      cache.set(cacheKey, search);
+    }
+    const results = search.results;
     
     const searchTime = Date.now() - startTime;
-    console.log(`✅ Found ${results.length} results in ${searchTime}ms`);
+    console.log(`✅ Found ${results.length} results in ${searchTime}ms${cached ? ' (cached)' : ''}`);
     
     res.json({
       query: query,
@@ -108,13 +89,15 @@ export default async function handler(req, res) {
       searchTime: searchTime,
       systemInfo: {
         source: 'vercel-serverless',
-        videosInDatabase: videos.length,
-        method: 'cached-search'
+        videosInDatabase: search.videosInDatabase,
+        method: search.method,
+        cached: cached,
+        cacheSize: cache.size
       }
     });
     
   } catch (error) {
     console.error('❌ Search error:', error);
-    res.status(500).json({ error: 'Internal server error' });
+    res.status(500).json({ error: error.message.startsWith(MISSING_STORE) ? error.message : 'Internal server error' });
   }
 } 
\ No newline at end of file
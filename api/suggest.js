@@ -0,0 +1,52 @@
+const path = require('path');
+const { PackedSearch } = require('../backend/packed-search');
+
+const storeDir = path.join(process.cwd(), 'transcript-store');
+
+// Built at deploy time by `npm run build:store` (vercel.json buildCommand)
+const MISSING_STORE = 'transcript-store/ is missing from this deployment; build it with `npm run build:store`';
+
+// Loaded once per warm instance; suggest_index.pack is memory-mapped like the other indexes
+let packedSearch;
+
+function loadPackedSearch() {
+  if (!packedSearch) {
+    packedSearch = PackedSearch.load(storeDir);
+    if (!packedSearch) throw new Error(`${MISSING_STORE} (no corpus.pack)`);
+  }
+  return packedSearch;
+}
+
+export default async function handler(req, res) {
+  // Enable CORS
+  res.setHeader('Access-Control-Allow-Origin', '*');
+  res.setHeader('Access-Control-Allow-Methods', 'GET');
+  res.setHeader('Access-Control-Allow-Headers', 'Content-Type');
+
+  if (req.method === 'OPTIONS') {
+    return res.status(200).end();
+  }
+
+  if (req.method !== 'GET') {
+    return res.status(405).json({ error: 'Method not allowed' });
+  }
+
+  try {
+    const prefix = typeof req.query.q === 'string' ? req.query.q : '';
+    const limit = Math.min(Math.max(parseInt(req.query.limit, 10) || 8, 1), 20);
+    const startTime = process.hrtime.bigint();
+
+    const suggestions = loadPackedSearch().suggest(prefix, limit);
+
+    // Suggestions only change with a new deploy, let the CDN answer repeats
+    res.setHeader('Cache-Control', 's-maxage=3600, stale-while-revalidate=86400');
+    res.json({
+      query: prefix,
+      suggestions: suggestions,
+      suggestTime: Number(process.hrtime.bigint() - startTime) / 1e6
+    });
+  } catch (error) {
+    console.error('❌ Suggest error:', error);
+    res.status(500).json({ error: error.message.startsWith(MISSING_STORE) ? error.message : 'Internal server error' });
+  }
+}
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Offline pipeline benchmark
+Replays the stored transcripts through a stub YouTubeTranscriptApi and
+the .en.srt files through srt_ingest, then builds every index and runs a
+fixed query set, all inside a temporary directory with no network access.
+Prints one JSON document with throughput and latency percentiles per stage,
+so two runs (before/after a change) can be compared number by number.
+
+Usage:
+    python benchmark.py [--cache-dir DIR] [--srt-dir DIR] [--repeat N] [--out FILE]
+    python benchmark.py --baseline previous.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import corpus_pack
+import srt_ingest
+import transcript_languages
+from extract_transcript import extract_transcript
+from failure_store import FailureStore
+from overlap_windows import WindowIndex
+from lemma_index import LemmaIndex, build_lemma_index
+from phrase_index import PhraseIndex, build_phrase_index
+from suggest_index import SuggestIndex, build_suggest_index
+from text_blocks import register_functions
+from trigram_index import TrigramIndex, build_trigram_index
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+QUERIES = [
+    'good morning',
+    'welcome back',
+    'thank you so much',
+    "i don't know",
+    'at the end of the day',
+    'the easiest job in the world',
+    'let me know in the comments',
+    'how are you',
+    'machine learning',
+    'never gonna give you up'
+]
+
+# Learner typos, looked up through the trigram index
+FUZZY_QUERIES = [
+    'god morning',
+    'welcom back',
+    'thank you so mcuh',
+    'at the end of the dya',
+    'the easyest job in the world',
+    'let me know in the coments',
+    'machine lerning',
+    'yesterdya'
+]
+
+
+class StubTranscript:
+    """Caption track backed by cached segments instead of a timedtext request"""
+
+    def __init__(self, segments, language_code='en', language='English', is_generated=False):
+        self.segments = segments
+        self.language_code = language_code
+        self.language = language
+        self.is_generated = is_generated
+
+    def fetch(self):
+        return StubFetchedTranscript(self.segments)
+
+
+class StubFetchedTranscript:
+    def __init__(self, segments):
+        self.segments = segments
+
+    def to_raw_data(self):
+        return [dict(segment) for segment in self.segments]
+
+
+class StubTranscriptList:
+    def __init__(self, tracks):
+        self.tracks = tracks
+
+    def __iter__(self):
+        return iter(self.tracks)
+
+    def _find(self, language_codes, generated):
+        for code in language_codes:
+            for track in self.tracks:
+                if track.language_code == code and track.is_generated == generated:
+                    return track
+        raise LookupError(f'No track for {language_codes}')
+
+    def find_generated_transcript(self, language_codes):
+        return self._find(language_codes, True)
+
+    def find_manually_created_transcript(self, language_codes):
+        return self._find(language_codes, False)
+
+
+class StubTranscriptApi:
+    """Same list()/fetch() surface as YouTubeTranscriptApi 1.x, served from memory"""
+
+    def __init__(self, videos):
+        self.videos = videos
+
+    def list(self, video_id):
+        return StubTranscriptList([StubTranscript(self.videos[video_id])])
+
+
+def load_raw_segments(cache_dir):
+    """video_id -> youtube-transcript-api style raw segments (seconds as floats)"""
+    videos = {}
+    for video_id, _, _, transcript in corpus_pack.iter_cache(cache_dir):
+        raw = []
+        for segment in transcript:
+            start, duration = corpus_pack.segment_ms(segment)
+            raw.append({'text': segment.get('text') or '', 'start': start / 1000,
+                        'duration': duration / 1000})
+        videos[video_id] = raw
+    return videos
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies_ms, items=None, unit='items'):
+    """Stage report: per-call latency percentiles plus throughput"""
+    values = sorted(latencies_ms)
+    total_ms = sum(values)
+    items = len(values) if items is None else items
+    return {
+        'calls': len(values),
+        unit: items,
+        'total_ms': round(total_ms, 3),
+        'per_second': round(items / (total_ms / 1000), 1) if total_ms else None,
+        'p50_ms': round(percentile(values, 0.50), 3),
+        'p90_ms': round(percentile(values, 0.90), 3),
+        'p99_ms': round(percentile(values, 0.99), 3),
+        'max_ms': round(values[-1], 3) if values else 0.0
+    }
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    value = fn(*args, **kwargs)
+    return (time.perf_counter() - started) * 1000, value
+
+
+def bench_extraction(videos, workdir):
+    """extract_transcript() per video against the stub API"""
+    api = StubTranscriptApi(videos)
+    store = FailureStore(os.path.join(workdir, 'failures.db'))
+    # keep language manifests out of the real transcript-cache
+    transcript_languages._default_cache = transcript_languages.LanguageManifestCache(
+        os.path.join(workdir, 'language_manifest.db'), legacy_path=None
+    )
+    latencies, segments, failed = [], 0, 0
+    for video_id in videos:
+        elapsed, result = timed(extract_transcript, video_id, api, store=store)
+        latencies.append(elapsed)
+        if result['success']:
+            segments += result['segments']
+        else:
+            failed += 1
+    report = summarize(latencies, len(videos), 'videos')
+    report['segments'] = segments
+    report['failed'] = failed
+    return report
+
+
+def bench_normalization(srt_files):
+    """srt_ingest.parse_subtitles() per subtitle file"""
+    latencies, segments = [], 0
+    for path in srt_files:
+        elapsed, transcript = timed(srt_ingest.parse_subtitles, path)
+        latencies.append(elapsed)
+        segments += len(transcript)
+    report = summarize(latencies, len(srt_files), 'files')
+    report['segments'] = segments
+    return report
+
+
+def bench_indexes(cache_dir, workdir):
+    """One full build of every index, returns (reports, corpus_path, phrase_path, fts_path)"""
+    reports = {}
+    corpus_path = os.path.join(workdir, corpus_pack.CORPUS_FILE)
+    phrase_path = os.path.join(workdir, 'phrase_index.pack')
+    fts_path = os.path.join(workdir, 'fast_search.db')
+
+    elapsed, meta = timed(corpus_pack.build_corpus, corpus_pack.iter_cache(cache_dir), corpus_path)
+    reports['corpus_pack'] = summarize([elapsed], meta['segments'], 'segments')
+    reports['corpus_pack']['bytes'] = os.path.getsize(corpus_path)
+
+    elapsed, meta = timed(build_phrase_index, corpus_path, phrase_path)
+    reports['phrase_index'] = summarize([elapsed], meta['tokens'], 'tokens')
+    reports['phrase_index']['bytes'] = os.path.getsize(phrase_path)
+
+    lemma_path = os.path.join(workdir, 'lemma_index.pack')
+    elapsed, meta = timed(build_lemma_index, corpus_path, lemma_path)
+    reports['lemma_index'] = summarize([elapsed], meta['tokens'], 'tokens')
+    reports['lemma_index']['bytes'] = os.path.getsize(lemma_path)
+
+    trigram_path = os.path.join(workdir, 'trigram_index.pack')
+    elapsed, meta = timed(build_trigram_index, phrase_path, trigram_path)
+    reports['trigram_index'] = summarize([elapsed], meta['terms'], 'terms')
+    reports['trigram_index']['bytes'] = os.path.getsize(trigram_path)
+
+    suggest_path = os.path.join(workdir, 'suggest_index.pack')
+    elapsed, meta = timed(build_suggest_index, corpus_path, suggest_path)
+    reports['suggest_index'] = summarize([elapsed], meta['phrases'], 'phrases')
+    reports['suggest_index']['bytes'] = os.path.getsize(suggest_path)
+
+    windows = WindowIndex(os.path.join(workdir, 'overlap_search.db'))
+    try:
+        elapsed, summary = timed(windows.sync_cache_dir, cache_dir)
+        reports['overlap_windows'] = summarize([elapsed], summary['windows'], 'windows')
+        elapsed, _ = timed(windows.sync_cache_dir, cache_dir)
+        reports['overlap_windows_noop'] = summarize([elapsed], summary['videos'], 'videos')
+    finally:
+        windows.close()
+
+    corpus = corpus_pack.Corpus(corpus_path)
+    videos = [(video_id, title, transcript) for video_id, title, _, transcript in corpus]
+    corpus.close()
+    db = sqlite3.connect(fts_path)
+    try:
+        elapsed, _ = timed(srt_ingest.write_index, db, videos)
+    finally:
+        db.close()
+    reports['fts_index'] = summarize([elapsed], sum(len(v[2]) for v in videos), 'segments')
+    return reports, corpus_path, phrase_path, fts_path
+
+
+def bench_queries(phrase_path, fts_path, repeat):
+    reports = {}
+
+    lemma_path = os.path.join(os.path.dirname(phrase_path), 'lemma_index.pack')
+    for name, index in (('query_phrase_index', PhraseIndex(phrase_path)),
+                        ('query_lemma_index', LemmaIndex(lemma_path))):
+        latencies, hits = [], 0
+        for _ in range(repeat):
+            for query in QUERIES:
+                elapsed, found = timed(index.find, query, 10)
+                latencies.append(elapsed)
+                hits += len(found)
+        index.close()
+        reports[name] = summarize(latencies, unit='queries')
+        reports[name]['hits'] = hits // repeat
+
+    # Misspelled queries: correct through the trigram index, then the phrase index
+    phrase_index = PhraseIndex(phrase_path)
+    trigram_index = TrigramIndex(os.path.join(os.path.dirname(phrase_path), 'trigram_index.pack'))
+
+    def find_fuzzy(query):
+        known = lambda term: phrase_index.term_id(term) is not None
+        for alternative in trigram_index.alternatives(query, known):
+            found = phrase_index.find(alternative, 10)
+            if found:
+                return found
+        return []
+
+    latencies, hits = [], 0
+    for _ in range(repeat):
+        for query in FUZZY_QUERIES:
+            elapsed, found = timed(find_fuzzy, query)
+            latencies.append(elapsed)
+            hits += len(found)
+    trigram_index.close()
+    phrase_index.close()
+    reports['query_trigram_index'] = summarize(latencies, unit='queries')
+    reports['query_trigram_index']['hits'] = hits // repeat
+
+    # Search-as-you-type: every prefix of each query, keystroke by keystroke
+    suggest_index = SuggestIndex(os.path.join(os.path.dirname(phrase_path), 'suggest_index.pack'))
+    latencies, hits = [], 0
+    for _ in range(repeat):
+        for query in QUERIES:
+            for end in range(1, len(query) + 1):
+                elapsed, found = timed(suggest_index.suggest, query[:end], 10)
+                latencies.append(elapsed)
+                hits += len(found)
+    suggest_index.close()
+    reports['query_suggest_index'] = summarize(latencies, unit='keystrokes')
+    reports['query_suggest_index']['hits'] = hits // repeat
+
+    # FastSearchSystem's first step: every word ANDed in one FTS5 MATCH, ranked
+    # on the index alone, then only the hits' text blocks inflated (search-pool.js)
+    db = sqlite3.connect(fts_path)
+    register_functions(db)
+
+    def fts_and(match):
+        ranked = db.execute(
+            'SELECT rowid, bm25(transcript_search) AS score '
+            'FROM transcript_search WHERE transcript_search MATCH ? ORDER BY score LIMIT 10',
+            (match,)
+        ).fetchall()
+        return [db.execute(
+            'SELECT v.video_id, c.start_ms, c.text FROM segment_content c '
+            'JOIN indexed_videos v ON v.id = c.id >> ? WHERE c.id = ?',
+            (srt_ingest.SEGMENT_BITS, rowid)
+        ).fetchone() for rowid, _ in ranked]
+
+    latencies, hits = [], 0
+    for _ in range(repeat):
+        for query in QUERIES:
+            match = ' AND '.join(f'"{word}"' for word in query.split())
+            elapsed, rows = timed(fts_and, match)
+            latencies.append(elapsed)
+            hits += len(rows)
+    db.close()
+    reports['query_fts_and'] = summarize(latencies, unit='queries')
+    reports['query_fts_and']['hits'] = hits // repeat
+    return reports
+
+
+NODE_BENCH = r'''
+const { PackedSearch } = require(process.argv[1]);
+const [cacheDir, queries, repeat] = [process.argv[2], JSON.parse(process.argv[3]), Number(process.argv[4])];
+let started = process.hrtime.bigint();
+const search = PackedSearch.load(cacheDir);
+const loadMs = Number(process.hrtime.bigint() - started) / 1e6;
+const latencies = [];
+for (let r = 0; r < repeat; r++) {
+  for (const query of queries) {
+    started = process.hrtime.bigint();
+    search.search(query, 10);
+    latencies.push(Number(process.hrtime.bigint() - started) / 1e6);
+  }
+}
+console.log(JSON.stringify({ loadMs, latencies }));
+'''
+
+
+def bench_node_search(workdir, repeat):
+    """packed-search.js (what /api/search serves) in a node subprocess, None without node"""
+    node = shutil.which('node')
+    if not node:
+        return None
+    completed = subprocess.run(
+        [node, '-e', NODE_BENCH, os.path.join(BACKEND_DIR, 'packed-search.js'),
+         workdir, json.dumps(QUERIES), str(repeat)],
+        capture_output=True, text=True, timeout=300
+    )
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip()[-500:]}
+    data = json.loads(completed.stdout.strip().splitlines()[-1])
+    report = summarize(data['latencies'], unit='queries')
+    report['load_ms'] = round(data['loadMs'], 3)
+    return report
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(stages, baseline):
+    """p50 change in percent per stage against an earlier run"""
+    changes = {}
+    for name, report in stages.items():
+        before = baseline.get('stages', {}).get(name)
+        if report and before and before.get('p50_ms'):
+            changes[name] = round((report['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100, 1)
+    return changes
+
+
+def run(cache_dir, srt_dir, repeat):
+    workdir = tempfile.mkdtemp(prefix='ltw-bench-')
+    try:
+        videos = load_raw_segments(cache_dir)
+        srt_files = sorted(glob.glob(os.path.join(srt_dir, '*.srt')) + glob.glob(os.path.join(srt_dir, '*.vtt')))
+
+        stages = {
+            'extraction': bench_extraction(videos, workdir),
+            'normalization': bench_normalization(srt_files)
+        }
+        index_reports, _, phrase_path, fts_path = bench_indexes(cache_dir, workdir)
+        stages.update(index_reports)
+        stages.update(bench_queries(phrase_path, fts_path, repeat))
+        stages['query_node_packed_search'] = bench_node_search(workdir, repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'videos': len(videos),
+            'subtitle_files': len(srt_files),
+            'queries': len(QUERIES),
+            'repeat': repeat
+        },
+        'stages': stages
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline extraction/ingestion/search benchmark')
+    parser.add_argument('--cache-dir', default=corpus_pack.CACHE_DIR)
+    parser.add_argument('--srt-dir', default=BACKEND_DIR)
+    parser.add_argument('--repeat', type=int, default=20, help='passes over the query set')
+    parser.add_argument('--out', help='also write the JSON report to FILE')
+    parser.add_argument('--baseline', help='earlier report to compare p50 latencies against')
+    args = parser.parse_args()
+
+    report = run(args.cache_dir, args.srt_dir, args.repeat)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            report['p50_change_percent'] = compare(report['stages'], json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Whole-transcript caption normalization
+Runs once per transcript rather than once per segment: the segment texts are
+joined with a separator so markup stripping, entity decoding, whitespace
+collapsing and search-text folding are each one regex/str pass over the whole
+transcript, and timings live in parallel arrays like corpus_pack.
+
+normalize_transcript() then
+  - drops words a cue repeats from the end of the previous one (rolling
+    auto-captions that survived as joined text),
+  - merges sub-second or few-word fragments ("all I") into phrase-sized
+    segments of at most MAX_SEGMENT_CHARS.
+
+fold_texts() gives the lowercase, accent-free search text that corpus.pack
+stores next to the display text (corpus-pack.js folds queries the same way).
+
+Usage:
+    python caption_normalize.py [--store DIR] [--write]
+"""
+
+import argparse
+import html
+import json
+import re
+import time
+import unicodedata
+from array import array
+
+SEP = '\x1f'  # never appears in caption text
+TAG_RE = re.compile(r'<[^>\x1f]*>|\{\\[^}\x1f]*\}')
+SPACE_RE = re.compile(r'[^\S\x1f]+')
+MARK_RE = re.compile('[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]')
+QUOTES = str.maketrans({'’': "'", '‘': "'", '“': '"', '”': '"'})
+
+MIN_FRAGMENT_MS = 1000
+MIN_FRAGMENT_WORDS = 3
+MAX_SEGMENT_CHARS = 84
+MAX_MERGE_GAP_MS = 1500
+MIN_ROLLING_WORDS = 3
+
+
+def to_ms(seconds):
+    return max(0, int(round(float(seconds) * 1000)))
+
+
+def segment_ms(segment):
+    """(start_ms, duration_ms), preferring the millisecond fields over legacy seconds"""
+    start = segment.get('start_ms')
+    duration = segment.get('duration_ms')
+    return (
+        to_ms(segment.get('start', 0)) if start is None else max(0, int(start)),
+        to_ms(segment.get('duration', 0)) if duration is None else max(0, int(duration))
+    )
+
+
+def _split(blob, count):
+    parts = blob.split(SEP)
+    if len(parts) != count:
+        raise ValueError('caption text contains the segment separator')
+    return parts
+
+
+def clean_texts(texts):
+    """Strip tags/entities and collapse whitespace for a whole transcript at once"""
+    blob = SEP.join(texts)
+    blob = html.unescape(TAG_RE.sub('', blob))
+    blob = SPACE_RE.sub(' ', blob)
+    return [text.strip() for text in _split(blob, len(texts))]
+
+
+def fold(text):
+    """Lowercase, accent-free text for matching ("Café" -> "cafe")"""
+    text = MARK_RE.sub('', unicodedata.normalize('NFKD', text))
+    return unicodedata.normalize('NFC', text).translate(QUOTES).lower()
+
+
+def fold_texts(texts):
+    """fold() over many texts in one pass"""
+    return _split(fold(SEP.join(texts)), len(texts))
+
+
+def _overlap(previous, words):
+    """How many leading words repeat the end of the previous segment"""
+    tail = [w.lower() for w in previous[-len(words):]]
+    lowered = [w.lower() for w in words[:len(tail)]]
+    for k in range(len(lowered), MIN_ROLLING_WORDS - 1, -1):
+        if tail[-k:] == lowered[:k]:
+            return k
+    return 0
+
+
+def normalize_transcript(transcript):
+    """Cache-format segments in, cleaned/deduplicated/merged cache-format segments out"""
+    if not transcript:
+        return []
+
+    count = len(transcript)
+    texts = clean_texts([segment.get('text') or '' for segment in transcript])
+    starts, ends = array('q'), array('q')
+    for segment in transcript:
+        start, duration = segment_ms(segment)
+        starts.append(start)
+        ends.append(start + duration)
+    # legacy segments without a duration last until the next one starts
+    for i in range(count):
+        if ends[i] <= starts[i]:
+            ends[i] = max(starts[i], starts[i + 1] if i + 1 < count else starts[i])
+
+    out_start, out_end = array('q'), array('q')
+    out_words, out_text, out_timed = [], [], []
+    last_fragment = False
+    for i in range(count):
+        words = texts[i].split()
+        if not words:
+            continue
+        timed = transcript[i].get('words')
+
+        if out_words:
+            repeated = _overlap(out_words[-1], words)
+            if repeated == len(words):
+                out_end[-1] = max(out_end[-1], ends[i])
+                continue
+            if repeated:
+                words = words[repeated:]
+                timed = timed[repeated:] if timed and len(timed) == len(words) + repeated else None
+
+        text = ' '.join(words)
+        fragment = ends[i] - starts[i] < MIN_FRAGMENT_MS or len(words) < MIN_FRAGMENT_WORDS
+        if (out_words and (fragment or last_fragment)
+                and starts[i] - out_end[-1] <= MAX_MERGE_GAP_MS
+                and len(out_text[-1]) + 1 + len(text) <= MAX_SEGMENT_CHARS):
+            out_words[-1].extend(words)
+            out_text[-1] += ' ' + text
+            out_end[-1] = max(out_end[-1], ends[i])
+            if out_timed[-1] is not None and timed:
+                out_timed[-1].extend(timed)
+            last_fragment = len(out_words[-1]) < MIN_FRAGMENT_WORDS
+            continue
+
+        out_start.append(starts[i])
+        out_end.append(ends[i])
+        out_words.append(words)
+        out_text.append(text)
+        out_timed.append(list(timed) if timed else None)
+        last_fragment = fragment
+
+    normalized = []
+    for i, text in enumerate(out_text):
+        segment = {
+            'start': out_start[i] // 1000,
+            'start_ms': out_start[i],
+            'duration_ms': out_end[i] - out_start[i],
+            'text': text
+        }
+        if out_timed[i]:
+            segment['words'] = out_timed[i]
+        normalized.append(segment)
+    return normalized
+
+
+def main():
+    from transcript_store import STORE_DIR, open_store
+
+    parser = argparse.ArgumentParser(description='Normalize stored transcripts')
+    parser.add_argument('--store', default=STORE_DIR)
+    parser.add_argument('--write', action='store_true',
+                        help='replace stored transcripts with their normalized form')
+    args = parser.parse_args()
+
+    started = time.time()
+    store = open_store(args.store)
+    summary = {'videos': 0, 'segments_before': 0, 'segments_after': 0,
+               'chars_before': 0, 'chars_after': 0}
+    changed = []
+    for video_id, title, method, transcript in store.iter_videos():
+        normalized = normalize_transcript(transcript)
+        summary['videos'] += 1
+        summary['segments_before'] += len(transcript)
+        summary['segments_after'] += len(normalized)
+        summary['chars_before'] += sum(len(s.get('text') or '') for s in transcript)
+        summary['chars_after'] += sum(len(s['text']) for s in normalized)
+        if normalized != transcript:
+            changed.append((video_id, title, method, normalized))
+
+    summary['changed'] = len(changed)
+    if args.write:
+        summary['written'] = store.put_many(changed)
+    summary['time_ms'] = int((time.time() - started) * 1000)
+    print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
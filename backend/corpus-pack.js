@@ -0,0 +1,173 @@
+const { PackFile } = require('./packfile');
+
+const MARK_RE = /[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]/g;
+
+/**
+ * 소문자 + 악센트 제거 검색용 텍스트 (caption_normalize.py 의 fold() 와 동일하게 유지)
+ */
+function fold(text) {
+  return text.normalize('NFKD').replace(MARK_RE, '').normalize('NFC')
+    .replace(/[’‘]/g, "'").replace(/[“”]/g, '"').toLowerCase();
+}
+
+/**
+ * corpus_pack.py 가 만든 corpus.pack 로더
+ * 영상 수백 개의 JSON을 파싱하는 대신 파일 하나를 읽고 그대로 검색
+ */
+class CorpusPack {
+  constructor(filePath) {
+    const pack = new PackFile(filePath);
+    this.meta = pack.json('meta');
+    this.videoIds = pack.strings('video_ids').toArray();
+    this.titles = pack.strings('video_titles').toArray();
+    this.methods = pack.strings('video_methods').toArray();
+    this.firstSegment = pack.u32('video_first_segment');
+    this.startMs = pack.u32('segment_start_ms');
+    this.durationMs = pack.u32('segment_duration_ms');
+    this.texts = pack.strings('segment_text');
+
+    // 세그먼트별 앞뒤 맥락 범위 (CORPUS_VERSION 3 부터, 없으면 바로 앞뒤 세그먼트)
+    this.contextFirst = pack.has('segment_context_first') ? pack.u32('segment_context_first') : null;
+    this.contextLast = this.contextFirst ? pack.u32('segment_context_last') : null;
+    this.videoIndex = null;
+
+    // corpus_pack.py 가 미리 만든 검색용 텍스트 (CORPUS_VERSION 2 부터)
+    this.folded = pack.has('segment_search_text');
+    this.searchTexts = this.folded ? pack.strings('segment_search_text') : this.texts;
+    this.searchText = this.searchTexts.data();
+    if (!this.folded) {
+      // 예전 pack: ASCII만 소문자로 바꾼 사본 (바이트 위치가 그대로 유지됨)
+      this.searchText = Buffer.from(this.searchText);
+      for (let i = 0; i < this.searchText.length; i++) {
+        const byte = this.searchText[i];
+        if (byte >= 65 && byte <= 90) {
+          this.searchText[i] = byte + 32;
+        }
+      }
+    }
+  }
+
+  get videoCount() {
+    return this.videoIds.length;
+  }
+
+  get segmentCount() {
+    return this.texts.length;
+  }
+
+  /**
+   * 세그먼트 번호가 속한 영상 번호 (이진 탐색)
+   */
+  videoOf(segment) {
+    let low = 0;
+    let high = this.videoCount - 1;
+    while (low < high) {
+      const mid = (low + high + 1) >> 1;
+      if (this.firstSegment[mid] <= segment) {
+        low = mid;
+      } else {
+        high = mid - 1;
+      }
+    }
+    return low;
+  }
+
+  /**
+   * 세그먼트 하나를 포함하는 부분 문자열 검색
+   * [{ segment, start, end }] 배열, start/end 는 검색 텍스트 안의 문자 위치
+   */
+  findMatches(query, limit = 10) {
+    const needle = Buffer.from(this.folded ? fold(query) : query.toLowerCase(), 'utf8');
+    const offsets = this.searchTexts.offsets;
+    const matches = [];
+    if (needle.length === 0) return matches;
+
+    let position = this.searchText.indexOf(needle);
+    while (position !== -1 && matches.length < limit) {
+      const segment = this.searchTexts.indexAt(position);
+      if (position + needle.length <= offsets[segment + 1]) {
+        const start = this.searchText.toString('utf8', offsets[segment], position).length;
+        const length = this.searchText.toString('utf8', position, position + needle.length).length;
+        matches.push({ segment, start, end: start + length });
+        position = this.searchText.indexOf(needle, offsets[segment + 1]);
+      } else {
+        // 세그먼트 경계를 넘는 매치는 무시
+        position = this.searchText.indexOf(needle, position + 1);
+      }
+    }
+    return matches;
+  }
+
+  /**
+   * 세그먼트 번호 배열만 필요할 때
+   */
+  findSegments(query, limit = 10) {
+    return this.findMatches(query, limit).map(match => match.segment);
+  }
+
+  /**
+   * 같은 영상 안의 앞뒤 맥락 세그먼트 범위 [first, last] (corpus_pack.py 가 미리 계산)
+   */
+  contextRange(index) {
+    if (this.contextFirst) {
+      return [this.contextFirst[index], this.contextLast[index]];
+    }
+    const video = this.videoOf(index);
+    return [Math.max(index - 1, this.firstSegment[video]), Math.min(index + 1, this.firstSegment[video + 1] - 1)];
+  }
+
+  /**
+   * 세그먼트 앞뒤 맥락 텍스트 { before, after }
+   */
+  context(index) {
+    const [first, last] = this.contextRange(index);
+    const before = [];
+    const after = [];
+    for (let i = first; i < index; i++) before.push(this.texts.get(i));
+    for (let i = index + 1; i <= last; i++) after.push(this.texts.get(i));
+    return { before: before.join(' '), after: after.join(' ') };
+  }
+
+  /**
+   * 영상 ID + 시작 위치(ms)로 세그먼트 번호 찾기 (없으면 -1)
+   */
+  segmentAt(videoId, startMs) {
+    if (!this.videoIndex) {
+      this.videoIndex = new Map(this.videoIds.map((id, i) => [id, i]));
+    }
+    const video = this.videoIndex.get(videoId);
+    if (video === undefined) return -1;
+
+    let low = this.firstSegment[video];
+    let high = this.firstSegment[video + 1] - 1;
+    if (high < low || this.startMs[low] > startMs) return -1;
+    while (low < high) {
+      const mid = (low + high + 1) >> 1;
+      if (this.startMs[mid] <= startMs) {
+        low = mid;
+      } else {
+        high = mid - 1;
+      }
+    }
+    return low;
+  }
+
+  segment(index) {
+    return {
+      start: Math.floor(this.startMs[index] / 1000),
+      startMs: this.startMs[index],
+      durationMs: this.durationMs[index],
+      text: this.texts.get(index)
+    };
+  }
+
+  video(index) {
+    return {
+      id: this.videoIds[index],
+      title: this.titles[index],
+      method: this.methods[index]
+    };
+  }
+}
+
+module.exports = { CorpusPack, fold };
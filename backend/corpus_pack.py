@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Consolidated transcript corpus
+Packs every transcript in the shared transcript-store (or a legacy
+transcript-cache/*_real.json directory) into one corpus.pack (see
+packfile.py): a string table of segment texts plus parallel arrays of
+start/duration, so loaders map one file instead of JSON-parsing hundreds.
+A parallel table holds the folded search text (lowercase, accents removed;
+see caption_normalize.fold) so searchers don't re-fold on every load, and
+two more hold each segment's context window (the neighbouring segments of
+the same video shown around a search hit), so search responses carry their
+surrounding lines without another lookup.
+
+Usage:
+    python corpus_pack.py [--cache-dir DIR] [--out FILE | --index]
+"""
+
+import argparse
+import bisect
+import glob
+import json
+import os
+import time
+from array import array
+
+from caption_normalize import fold, fold_texts, segment_ms
+from packfile import JSON, STRINGS, U32, PackFile, write_pack
+from transcript_store import STORE_DIR, store_for
+
+CACHE_DIR = STORE_DIR
+CORPUS_FILE = 'corpus.pack'
+CORPUS_VERSION = 3
+CONTEXT_SEGMENTS = 2  # at most this many neighbours on each side
+CONTEXT_CHARS = 160  # ... and about this much text, but always the nearest one
+
+
+def load_cache_file(path):
+    """(video_id, title, method, transcript) from one *_real.json, or None if empty"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    transcript = data.get('transcript') or []
+    if not transcript:
+        return None
+
+    fallback_id = os.path.basename(path).replace('_real.json', '')
+    video_id = data.get('video_id') or data.get('videoId') or fallback_id
+    title = data.get('video_title') or data.get('videoTitle') or f'Video {video_id}'
+    return video_id, title, data.get('method') or 'json', transcript
+
+
+def iter_cache(cache_dir=CACHE_DIR):
+    store = store_for(cache_dir)
+    if store is not None:
+        yield from store.iter_videos()
+        return
+    for path in sorted(glob.glob(os.path.join(cache_dir, '*_real.json'))):
+        try:
+            video = load_cache_file(path)
+        except (OSError, ValueError):
+            continue  # skip invalid cache files, same as the JS loaders
+        if video:
+            yield video
+
+
+def context_windows(first_segment, texts):
+    """(context_first, context_last) arrays: the neighbour segments of the same
+    video shown around each segment"""
+    context_first, context_last = array('I'), array('I')
+    for v in range(len(first_segment) - 1):
+        low, high = first_segment[v], first_segment[v + 1]
+        for i in range(low, high):
+            j, chars = i, 0
+            while j > low and i - j < CONTEXT_SEGMENTS and (j == i or chars + len(texts[j - 1]) <= CONTEXT_CHARS):
+                j -= 1
+                chars += len(texts[j])
+            k, chars = i, 0
+            while k < high - 1 and k - i < CONTEXT_SEGMENTS and (k == i or chars + len(texts[k + 1]) <= CONTEXT_CHARS):
+                k += 1
+                chars += len(texts[k])
+            context_first.append(j)
+            context_last.append(k)
+    return context_first, context_last
+
+
+def build_corpus(videos, out_path):
+    """Write (video_id, title, method, transcript) tuples to one pack file"""
+    video_ids, titles, methods = [], [], []
+    first_segment = array('I', [0])
+    start_ms, duration_ms = array('I'), array('I')
+    texts = []
+
+    for video_id, title, method, transcript in videos:
+        video_ids.append(video_id)
+        titles.append(title)
+        methods.append(method)
+        for segment in transcript:
+            text = segment.get('text') or ''
+            start, duration = segment_ms(segment)
+            start_ms.append(start)
+            duration_ms.append(duration)
+            texts.append(text)
+        first_segment.append(len(texts))
+
+    context_first, context_last = context_windows(first_segment, texts)
+    meta = {
+        'version': CORPUS_VERSION,
+        'videos': len(video_ids),
+        'segments': len(texts),
+        'built_at': int(time.time())
+    }
+    write_pack(out_path, {
+        'meta': (JSON, meta),
+        'video_ids': (STRINGS, video_ids),
+        'video_titles': (STRINGS, titles),
+        'video_methods': (STRINGS, methods),
+        'video_first_segment': (U32, first_segment),
+        'segment_start_ms': (U32, start_ms),
+        'segment_duration_ms': (U32, duration_ms),
+        'segment_text': (STRINGS, texts),
+        'segment_search_text': (STRINGS, fold_texts(texts)),
+        'segment_context_first': (U32, context_first),
+        'segment_context_last': (U32, context_last)
+    })
+    return meta
+
+
+def pack_cache_dir(cache_dir=CACHE_DIR, out_path=None):
+    return build_corpus(iter_cache(cache_dir), out_path or os.path.join(cache_dir, CORPUS_FILE))
+
+
+def pack_and_index(cache_dir=CACHE_DIR):
+    """Rebuild corpus.pack and every search index derived from it"""
+    from lemma_index import index_cache_dir as build_lemma_index
+    from phrase_index import index_cache_dir as build_phrase_index
+    from suggest_index import index_cache_dir as build_suggest_index
+    from trigram_index import index_cache_dir as build_trigram_index
+
+    meta = pack_cache_dir(cache_dir)
+    meta['phrase_index'] = build_phrase_index(cache_dir)
+    meta['lemma_index'] = build_lemma_index(cache_dir)
+    meta['trigram_index'] = build_trigram_index(cache_dir)
+    meta['suggest_index'] = build_suggest_index(cache_dir)
+    return meta
+
+
+class Corpus:
+    """Memory-mapped corpus.pack reader"""
+
+    def __init__(self, path):
+        self.pack = PackFile(path)
+        self.meta = self.pack.json('meta')
+        self.video_ids = self.pack.strings('video_ids')
+        self.titles = self.pack.strings('video_titles')
+        self.methods = self.pack.strings('video_methods')
+        self.first_segment = self.pack.u32('video_first_segment')
+        self.start_ms = self.pack.u32('segment_start_ms')
+        self.duration_ms = self.pack.u32('segment_duration_ms')
+        self.texts = self.pack.strings('segment_text')
+        # packs from before CORPUS_VERSION 2 have no folded copy
+        self.search_texts = (self.pack.strings('segment_search_text')
+                             if 'segment_search_text' in self.pack else None)
+        # ... and none before CORPUS_VERSION 3 have context windows
+        self.context_first = (self.pack.u32('segment_context_first')
+                              if 'segment_context_first' in self.pack else None)
+        self.context_last = self.pack.u32('segment_context_last') if self.context_first is not None else None
+
+    def __len__(self):
+        return len(self.video_ids)
+
+    def search_text(self, i):
+        return self.search_texts[i] if self.search_texts is not None else fold(self.texts[i])
+
+    def context(self, i):
+        """(texts before, texts after) segment i within its video"""
+        if self.context_first is None:
+            video = bisect.bisect_right(self.first_segment, i) - 1
+            first = max(i - 1, self.first_segment[video])
+            last = min(i + 1, self.first_segment[video + 1] - 1)
+        else:
+            first, last = self.context_first[i], self.context_last[i]
+        return [self.texts[j] for j in range(first, i)], [self.texts[j] for j in range(i + 1, last + 1)]
+
+    def segment_range(self, video_index):
+        return range(self.first_segment[video_index], self.first_segment[video_index + 1])
+
+    def transcript(self, video_index):
+        """Segments of one video in the cache JSON shape"""
+        return [
+            {
+                'start': self.start_ms[i] // 1000,
+                'start_ms': self.start_ms[i],
+                'duration_ms': self.duration_ms[i],
+                'text': self.texts[i]
+            }
+            for i in self.segment_range(video_index)
+        ]
+
+    def __iter__(self):
+        """(video_id, title, method, transcript) like iter_cache()"""
+        for v in range(len(self)):
+            yield self.video_ids[v], self.titles[v], self.methods[v], self.transcript(v)
+
+    def close(self):
+        self.pack.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pack transcript cache into corpus.pack')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--out', help=f'output file (default: <cache-dir>/{CORPUS_FILE})')
+    parser.add_argument('--index', action='store_true', help='also rebuild the search indexes')
+    args = parser.parse_args()
+
+    started = time.time()
+    if args.index and not args.out:
+        meta = pack_and_index(args.cache_dir)
+    else:
+        meta = pack_cache_dir(args.cache_dir, args.out)
+    meta['time_ms'] = int((time.time() - started) * 1000)
+    print(json.dumps(meta))
+
+
+if __name__ == '__main__':
+    main()
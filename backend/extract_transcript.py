@@ -1,42 +1,112 @@
 #!/usr/bin/env python3
 """
 YouTube Transcript Extractor
-Called by Node.js with video ID as argument
+Called by Node.js with video ID as argument, or started once with --serve
+to answer newline-delimited JSON requests without paying Python startup,
+imports and a fresh HTTP session for every video. --batch works through a
+file of IDs/URLs with a bounded worker pool.
 """
 
+import argparse
 import json
+import os
+import re
+import socket
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
 from youtube_transcript_api import YouTubeTranscriptApi
 
-def extract_transcript(video_id):
+from caption_normalize import normalize_transcript
+from failure_store import BLOCKED_ERRORS, default_store
+from metrics import default_metrics
+from transcript_languages import select_transcript
+from transcript_store import STORE_DIR, has_video, store_for
+
+CACHE_DIR = STORE_DIR
+
+
+def create_session():
+    """Keep-alive HTTP session shared by every fetch in this process"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return default_metrics().instrument_session(session)
+
+
+def create_api(session=None):
+    """Build one reusable YouTubeTranscriptApi bound to a pooled session"""
     try:
-        # Try new API format first
-        try:
-            ytt_api = YouTubeTranscriptApi()
-            fetched_transcript = ytt_api.fetch(video_id)
-            transcript = [
-                {
-                    'start': snippet.start,
-                    'duration': snippet.duration,
-                    'text': snippet.text
-                }
-                for snippet in fetched_transcript
-            ]
-        except AttributeError:
-            # Fallback to old API format
-            transcript = YouTubeTranscriptApi.get_transcript(video_id)
+        return YouTubeTranscriptApi(http_client=session or create_session())
+    except TypeError:
+        # Old API format: no constructor arguments, static methods only
+        return YouTubeTranscriptApi()
+
+
+def extract_transcript(video_id, api=None, languages=None, store=None):
+    """Extract one video, skipping IDs the failure store says to leave alone"""
+    store = store or default_store()
+    metrics = default_metrics()
+    with metrics.record('extract', video_id=video_id) as record:
+        with metrics.stage('failure_store'):
+            known_failure = store.check(video_id)
+        if known_failure:
+            result = store.skipped_result(video_id, known_failure)
+        else:
+            result = _extract_transcript(video_id, api, languages)
+            with metrics.stage('failure_store'):
+                store.record(result)
+        record['success'] = result['success']
+        record['error_type'] = result.get('error_type')
+        metrics.count_result(result)
+    return result
+
+
+def format_segment(item):
+    """Cache segment: millisecond timing, 'start' kept in whole seconds for old readers"""
+    start = float(item['start'])
+    return {
+        'start': int(start),
+        'start_ms': int(round(start * 1000)),
+        'duration_ms': int(round(float(item.get('duration') or 0) * 1000)),
+        'text': item['text'].replace('\n', ' ').strip()
+    }
+
+
+def format_transcript(items):
+    """Raw API items -> normalized cache segments (see caption_normalize.py)"""
+    metrics = default_metrics()
+    with metrics.stage('format'):
+        segments = [format_segment(item) for item in items]
+    with metrics.stage('normalize'):
+        return normalize_transcript(segments)
+
+
+def _extract_transcript(video_id, api=None, languages=None):
+    try:
+        # One list call, then fetch the best track (manual English first)
+        transcript, track = select_transcript(api or create_api(), video_id, languages)
+        if transcript is None:
+            return {
+                'success': False,
+                'video_id': video_id,
+                'error': 'No transcripts available for this video',
+                'error_type': 'NoTranscriptFound'
+            }
         
         # Convert to our format
-        formatted_transcript = []
-        for segment in transcript:
-            formatted_transcript.append({
-                'start': int(segment['start']),
-                'text': segment['text'].replace('\n', ' ').strip()
-            })
+        formatted_transcript = format_transcript(transcript)
         
         result = {
             'success': True,
             'video_id': video_id,
+            'language': track['language_code'],
+            'is_generated': track['is_generated'],
             'segments': len(formatted_transcript),
             'transcript': formatted_transcript
         }
@@ -47,17 +117,329 @@ def extract_transcript(video_id):
         return {
             'success': False,
             'video_id': video_id,
-            'error': str(e)
+            'error': str(e),
+            'error_type': type(e).__name__
         }
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
+
+def is_blocked(result):
+    """True if a failed result looks like rate limiting / an IP block"""
+    if result.get('success'):
+        return False
+    return (result.get('error_type') in BLOCKED_ERRORS
+            or '429' in result.get('error', ''))
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by all workers hitting youtube.com
+
+    The rate adapts: every block halves it (down to min_rate) and pauses
+    all workers with exponential backoff, every success nudges it back up
+    towards the configured rate.
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=0.05, max_backoff=300):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.max_backoff = max_backoff
+        self.blocks = 0
+        self.paused_until = 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self):
+        """Back off after a 429 / blocked response, returns the pause in seconds"""
+        with self.lock:
+            self.blocks += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            backoff = min(self.max_backoff, 2 ** self.blocks)
+            self.paused_until = max(self.paused_until, time.monotonic() + backoff)
+            self.tokens = 0
+            return backoff
+
+    def reward(self):
+        with self.lock:
+            self.blocks = max(0, self.blocks - 1)
+            self.rate = min(self.max_rate, self.rate * 1.1)
+
+
+def read_video_ids(path):
+    """Video IDs from a file of bare IDs or YouTube URLs, one per line"""
+    video_ids = []
+    with open(path, encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            match = re.search(r'(?:v=|youtu\.be/)([\w-]{11})', line)
+            video_ids.append(match.group(1) if match else line)
+    return list(dict.fromkeys(video_ids))
+
+
+def load_progress(progress_path):
+    """Video IDs already finished in a previous run of the same batch"""
+    done = set()
+    if not progress_path or not os.path.exists(progress_path):
+        return done
+    with open(progress_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # partially written line from an interrupted run
+            if entry.get('success') or not entry.get('retry'):
+                done.add(entry['video_id'])
+    return done
+
+
+def save_to_cache(result, cache_dir):
+    """Write a result where PythonYouTubeBridge looks for it"""
+    store = store_for(cache_dir)
+    if store is not None:
+        store.put_result(result)
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_file = os.path.join(cache_dir, f"{result['video_id']}_real.json")
+    tmp_file = cache_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, cache_file)
+
+
+def extract_many(video_ids, workers=4, rate=1.0, max_retries=3,
+                 progress_path=None, cache_dir=CACHE_DIR, on_result=None, pool=None,
+                 windows=None):
+    """Extract many videos concurrently under one shared rate limit
+
+    Videos already in cache_dir, recorded in progress_path or still cooling
+    down in the failure store are skipped, so an interrupted batch can simply
+    be started again. With a ProxyPool each
+    attempt goes out through the healthiest idle Tor circuit instead of the
+    worker's own session. With a WindowIndex, each saved video's overlap
+    windows are written as it arrives. Returns a summary dict.
+    """
+    done = load_progress(progress_path)
+    todo = default_store().eligible([
+        video_id for video_id in video_ids
+        if video_id not in done
+        and not has_video(cache_dir, video_id)
+    ])
+
+    bucket = TokenBucket(rate)
+    metrics = default_metrics()
+    local = threading.local()
+    progress_lock = threading.Lock()
+    summary = {'total': len(video_ids), 'skipped': len(video_ids) - len(todo),
+               'success': 0, 'failed': 0}
+
+    def work(video_id):
+        if pool is None and not hasattr(local, 'api'):
+            local.api = create_api()
+        for _ in range(max_retries + 1):
+            with metrics.stage('rate_wait'):
+                bucket.acquire()
+            if pool is not None:
+                result = pool.extract(video_id, extract_transcript)
+            else:
+                result = extract_transcript(video_id, local.api)
+            if not is_blocked(result):
+                bucket.reward()
+                break
+            metrics.count('blocked_retries')
+            bucket.penalize()
+        return result
+
+    progress = open(progress_path, 'a', encoding='utf-8') if progress_path else None
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(work, video_id) for video_id in todo]
+            for future in as_completed(futures):
+                result = future.result()
+                if result['success']:
+                    save_to_cache(result, cache_dir)
+                    if windows is not None:
+                        video_id = result['video_id']
+                        windows.update_video(video_id, f'Video {video_id}', result['transcript'])
+                    summary['success'] += 1
+                else:
+                    summary['failed'] += 1
+
+                entry = {'video_id': result['video_id'], 'success': result['success']}
+                if result['success']:
+                    entry['segments'] = result['segments']
+                else:
+                    entry['error'] = result['error']
+                    entry['retry'] = is_blocked(result) or result.get('error_type') == 'KnownFailure'
+                with progress_lock:
+                    if progress:
+                        progress.write(json.dumps(entry) + '\n')
+                        progress.flush()
+                if on_result:
+                    on_result(entry)
+    finally:
+        if progress:
+            progress.close()
+
+    return summary
+
+
+def handle_request(line, api):
+    """Answer one serve-mode request: {"id": ..., "video_id": ..., "save": bool} or a bare ID
+
+    With "save", a successful result is also written to the transcript store.
+    """
+    try:
+        request = json.loads(line)
+    except ValueError:
+        request = line
+
+    if isinstance(request, str):
+        request = {'video_id': request}
+    if not isinstance(request, dict):
+        return {'success': False, 'error': 'Request must be a JSON object'}
+
+    video_id = request.get('video_id') or request.get('videoId')
+    if not video_id:
+        result = {'success': False, 'error': 'Missing video_id'}
+    else:
+        result = extract_transcript(video_id, api)
+        if result['success'] and request.get('save'):
+            save_to_cache(result, CACHE_DIR)
+
+    if 'id' in request:
+        result['id'] = request['id']
+    return result
+
+
+def serve_stream(infile, outfile, api):
+    """Read requests line by line and stream back one JSON result per line"""
+    for line in infile:
+        line = line.strip()
+        if not line:
+            continue
+        outfile.write(json.dumps(handle_request(line, api)) + '\n')
+        outfile.flush()
+
+
+def serve_socket(path, api):
+    """Same protocol as stdin mode, over a local Unix socket"""
+    if os.path.exists(path):
+        os.unlink(path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn, \
+                    conn.makefile('r', encoding='utf-8') as infile, \
+                    conn.makefile('w', encoding='utf-8') as outfile:
+                serve_stream(infile, outfile, api)
+    finally:
+        server.close()
+        os.unlink(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='YouTube Transcript Extractor')
+    parser.add_argument('video_id', nargs='?')
+    parser.add_argument('--serve', action='store_true',
+                        help='read newline-delimited JSON requests on stdin')
+    parser.add_argument('--socket', metavar='PATH',
+                        help='serve requests on a Unix socket instead of stdin')
+    parser.add_argument('--batch', metavar='FILE',
+                        help='extract every video ID / URL listed in FILE')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help='max requests per second across all workers')
+    parser.add_argument('--progress', metavar='FILE',
+                        help='resumable progress log (default: <batch>.progress.jsonl)')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--pack', action='store_true',
+                        help='rebuild <cache-dir>/corpus.pack and search indexes after the batch')
+    parser.add_argument('--windows', action='store_true',
+                        help='update overlap_search.db as each video is saved')
+    parser.add_argument('--metrics', action='store_true',
+                        help='per-video stage timings as JSON lines on stderr')
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help='keep Prometheus text-format totals in PATH')
+    parser.add_argument('--tor', type=int, metavar='N', default=0,
+                        help='spread batch requests over N isolated Tor circuits')
+    args = parser.parse_args()
+    default_metrics().configure(stderr=args.metrics or None, prometheus_path=args.metrics_file)
+
+    if args.batch:
+        pool = None
+        if args.tor:
+            from proxy_pool import ProxyPool
+            pool = ProxyPool(size=args.tor)
+        windows = None
+        if args.windows:
+            from overlap_windows import WindowIndex
+            windows = WindowIndex()
+
+        def report(entry):
+            print(json.dumps(entry), flush=True)
+
+        summary = extract_many(
+            read_video_ids(args.batch),
+            workers=args.workers,
+            rate=args.rate,
+            progress_path=args.progress or args.batch + '.progress.jsonl',
+            cache_dir=args.cache_dir,
+            on_result=report,
+            pool=pool,
+            windows=windows
+        )
+        if windows is not None:
+            windows.close()
+        if args.pack:
+            from corpus_pack import pack_and_index
+            summary['corpus'] = pack_and_index(args.cache_dir)
+        print(json.dumps(summary))
+        return
+
+    if args.serve or args.socket:
+        api = create_api()
+        try:
+            if args.socket:
+                serve_socket(args.socket, api)
+            else:
+                serve_stream(sys.stdin, sys.stdout, api)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if not args.video_id:
         print(json.dumps({
             'success': False,
-            'error': 'Usage: python extract_transcript.py <video_id>'
+            'error': 'Usage: python extract_transcript.py <video_id> | --serve [--socket PATH] | --batch FILE'
         }))
         sys.exit(1)
-    
-    video_id = sys.argv[1]
-    result = extract_transcript(video_id)
-    print(json.dumps(result)) 
\ No newline at end of file
+
+    result = extract_transcript(args.video_id)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
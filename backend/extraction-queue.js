@@ -0,0 +1,314 @@
+const os = require('os');
+const { PythonYouTubeBridge } = require('./python-youtube-bridge');
+
+const PRIORITY_QUERY = 100; // 최근 검색어에 걸린 영상
+const PRIORITY_BACKFILL = 0; // 나머지 일괄 처리
+const ENQUEUE_BATCH = 100;
+
+/**
+ * SQLite 기반 추출 작업 큐 (LazyTranscriptSystem 의 transcripts.db 에 저장)
+ * - 우선순위: 검색어에 걸린 영상 중 가장 최근에 요청된 것 (last_requested_at) → 여러 검색에서 요청된 영상(requests)
+ *   → 먼저 들어온 영상. 오래전 검색이 쌓인 작업이 방금 검색한 영상을 밀어내지 않게
+ * - worker 마다 extract_transcript.py --serve 프로세스를 하나씩 사용 (동시 추출 수 = concurrency)
+ * - lease: 실행 중 작업은 leaseMs 안에 끝나지 않으면 (프로세스가 죽었거나 멈춤) 다시 대기열로
+ * - 실패하면 지수 백오프로 재시도, maxAttempts 번 실패하면 failed
+ */
+class ExtractionQueue {
+  /**
+   * handler(videoId, bridge) → { success, error? } : 실제 추출 + 저장
+   */
+  constructor(db, handler, {
+    concurrency = parseInt(process.env.EXTRACTION_WORKERS, 10) || 2,
+    leaseMs = 2 * 60 * 1000,
+    maxAttempts = 3,
+    retryDelayMs = 30 * 1000,
+    delayMs = 1000, // worker 별 작업 간격 (YouTube 요청 속도 제한)
+    pollMs = 5000
+  } = {}) {
+    this.db = db;
+    this.handler = handler;
+    this.concurrency = concurrency;
+    this.leaseMs = leaseMs;
+    this.maxAttempts = maxAttempts;
+    this.retryDelayMs = retryDelayMs;
+    this.delayMs = delayMs;
+    this.pollMs = pollMs;
+    this.owner = `${os.hostname()}:${process.pid}`;
+    this.running = false;
+    this.workers = [];
+    this.bridges = [];
+    this.sleepers = new Set();
+    this.session = { started: 0, done: 0, failed: 0, retried: 0, totalMs: 0 };
+  }
+
+  async init() {
+    await this.db.exec(`
+      CREATE TABLE IF NOT EXISTS extraction_jobs (
+        video_id TEXT PRIMARY KEY,
+        priority INTEGER NOT NULL DEFAULT 0,
+        requests INTEGER NOT NULL DEFAULT 1, -- 이 영상을 요청한 검색 수 (인기도)
+        status TEXT NOT NULL DEFAULT 'queued', -- queued | running | done | failed
+        attempts INTEGER NOT NULL DEFAULT 0,
+        query TEXT,
+        last_error TEXT,
+        lease_owner TEXT,
+        lease_expires_at INTEGER,
+        available_at INTEGER NOT NULL DEFAULT 0,
+        enqueued_at INTEGER NOT NULL,
+        last_requested_at INTEGER NOT NULL DEFAULT 0, -- 이 우선순위로 마지막 요청된 시각
+        updated_at INTEGER NOT NULL
+      )
+    `);
+    const columns = await this.db.all('PRAGMA table_info(extraction_jobs)');
+    if (!columns.some(column => column.name === 'last_requested_at')) {
+      // 이전 버전 큐: 들어온 시각을 마지막 요청 시각으로
+      await this.db.exec(`
+        ALTER TABLE extraction_jobs ADD COLUMN last_requested_at INTEGER NOT NULL DEFAULT 0;
+        UPDATE extraction_jobs SET last_requested_at = enqueued_at;
+      `);
+    }
+    await this.db.exec(`
+      DROP INDEX IF EXISTS idx_extraction_jobs_next;
+      CREATE INDEX IF NOT EXISTS idx_extraction_jobs_recent
+      ON extraction_jobs(status, priority DESC, last_requested_at DESC, requests DESC, enqueued_at)
+    `);
+    return this.recoverExpired();
+  }
+
+  /**
+   * 영상 ID 들을 대기열에 추가, 이미 있으면 우선순위를 올리고 요청 수 증가
+   * 같거나 높은 우선순위로 다시 요청되면 last_requested_at 갱신 (backfill 이 검색 요청 시각을 덮지 않게)
+   * (이미 끝난 작업은 그대로)
+   */
+  async enqueue(videoIds, { priority = PRIORITY_BACKFILL, query = null } = {}) {
+    const now = Date.now();
+    // 여러 행을 문장 하나로 (동시에 들어온 검색끼리 트랜잭션이 겹치지 않게)
+    for (let i = 0; i < videoIds.length; i += ENQUEUE_BATCH) {
+      const batch = videoIds.slice(i, i + ENQUEUE_BATCH);
+      await this.db.run(`
+        INSERT INTO extraction_jobs (video_id, priority, query, enqueued_at, last_requested_at, updated_at)
+        VALUES ${batch.map(() => '(?, ?, ?, ?, ?, ?)').join(', ')}
+        ON CONFLICT (video_id) DO UPDATE SET
+          last_requested_at = CASE WHEN excluded.priority >= priority
+            THEN excluded.last_requested_at ELSE last_requested_at END,
+          priority = MAX(priority, excluded.priority),
+          requests = requests + 1,
+          query = COALESCE(excluded.query, query),
+          updated_at = excluded.updated_at
+      `, batch.flatMap(videoId => [videoId, priority, query, now, now, now]));
+    }
+    if (videoIds.length > 0) this.wake();
+    return videoIds.length;
+  }
+
+  /**
+   * 다음 작업 하나를 lease 로 가져오기 (다른 worker / 프로세스와 겹치지 않게 조건부 UPDATE)
+   */
+  async claim() {
+    for (;;) {
+      const now = Date.now();
+      const job = await this.db.get(`
+        SELECT video_id, attempts, query FROM extraction_jobs
+        WHERE status = 'queued' AND available_at <= ?
+        ORDER BY priority DESC, last_requested_at DESC, requests DESC, enqueued_at
+        LIMIT 1
+      `, [now]);
+      if (!job) return null;
+
+      const result = await this.db.run(`
+        UPDATE extraction_jobs
+        SET status = 'running', attempts = attempts + 1, lease_owner = ?, lease_expires_at = ?, updated_at = ?
+        WHERE video_id = ? AND status = 'queued'
+      `, [this.owner, now + this.leaseMs, now, job.video_id]);
+      if (result.changes === 1) {
+        return { videoId: job.video_id, attempts: job.attempts + 1, query: job.query };
+      }
+      // 다른 worker 가 먼저 가져감 - 다음 작업으로
+    }
+  }
+
+  async complete(job) {
+    await this.db.run(`
+      UPDATE extraction_jobs
+      SET status = 'done', last_error = NULL, lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+      WHERE video_id = ?
+    `, [Date.now(), job.videoId]);
+  }
+
+  async fail(job, error) {
+    const now = Date.now();
+    const retry = job.attempts < this.maxAttempts;
+    await this.db.run(`
+      UPDATE extraction_jobs
+      SET status = ?, last_error = ?, available_at = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+      WHERE video_id = ?
+    `, [
+      retry ? 'queued' : 'failed',
+      String(error).slice(0, 500),
+      now + this.retryDelayMs * 2 ** (job.attempts - 1),
+      now,
+      job.videoId
+    ]);
+    return retry;
+  }
+
+  /**
+   * lease 가 만료된 실행 중 작업 복구 (worker 가 죽었거나 멈춘 경우), 복구한 수 반환
+   */
+  async recoverExpired() {
+    const now = Date.now();
+    const result = await this.db.run(`
+      UPDATE extraction_jobs
+      SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+          last_error = COALESCE(last_error, 'lease expired'),
+          lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+      WHERE status = 'running' AND lease_expires_at < ?
+    `, [this.maxAttempts, now, now]);
+    if (result.changes > 0) {
+      console.log(`♻️ Recovered ${result.changes} expired extraction jobs`);
+    }
+    return result.changes;
+  }
+
+  /**
+   * worker 시작 (이미 실행 중이면 무시)
+   */
+  start() {
+    if (this.running) return;
+    this.running = true;
+    this.session.started = Date.now();
+    for (let i = 0; i < this.concurrency; i++) {
+      const bridge = new PythonYouTubeBridge();
+      this.bridges.push(bridge);
+      this.workers.push(this.runWorker(i, bridge));
+    }
+    this.recoveryTimer = setInterval(() => {
+      this.recoverExpired().catch(error => console.error('❌ Job recovery failed:', error.message));
+    }, this.leaseMs);
+    this.recoveryTimer.unref();
+    console.log(`👷 Extraction queue started with ${this.concurrency} workers`);
+  }
+
+  async runWorker(index, bridge) {
+    while (this.running) {
+      let job;
+      try {
+        job = await this.claim();
+      } catch (error) {
+        console.error(`❌ Worker ${index} claim failed:`, error.message);
+      }
+      if (!job) {
+        await this.sleep(this.pollMs, { wakeable: true, unref: true });
+        continue;
+      }
+
+      const startTime = Date.now();
+      let result;
+      try {
+        result = await this.handler(job.videoId, bridge);
+      } catch (error) {
+        result = { success: false, error: error.message };
+      }
+      this.session.totalMs += Date.now() - startTime;
+
+      try {
+        if (result && result.success) {
+          await this.complete(job);
+          this.session.done++;
+        } else {
+          const retry = await this.fail(job, result ? result.error : 'no result');
+          this.session[retry ? 'retried' : 'failed']++;
+        }
+      } catch (error) {
+        // lease 가 만료되면 recoverExpired() 가 다시 대기열로 돌림
+        console.error(`❌ Worker ${index} could not record ${job.videoId}:`, error.message);
+      }
+      if (this.delayMs > 0) {
+        await this.sleep(this.delayMs, { unref: true });
+      }
+    }
+  }
+
+  /**
+   * ms 동안 대기, wakeable 이면 enqueue() 가 바로 깨움
+   * unref: 쉬고 있는 worker 때문에 프로세스가 안 끝나는 일이 없게
+   */
+  sleep(ms, { wakeable = false, unref = false } = {}) {
+    return new Promise(resolve => {
+      const done = () => {
+        clearTimeout(timer);
+        this.sleepers.delete(done);
+        resolve();
+      };
+      const timer = setTimeout(done, ms);
+      if (unref) timer.unref();
+      if (wakeable) this.sleepers.add(done);
+    });
+  }
+
+  wake() {
+    for (const done of [...this.sleepers]) done();
+  }
+
+  async stop() {
+    this.running = false;
+    clearInterval(this.recoveryTimer);
+    this.wake();
+    await Promise.all(this.workers);
+    this.bridges.forEach(bridge => bridge.close());
+    this.workers = [];
+    this.bridges = [];
+  }
+
+  /**
+   * 대기열 상태 + 이번 실행의 처리 속도 / 예상 남은 시간
+   */
+  async progress() {
+    const counts = { queued: 0, running: 0, done: 0, failed: 0 };
+    for (const row of await this.db.all('SELECT status, COUNT(*) AS count FROM extraction_jobs GROUP BY status')) {
+      counts[row.status] = row.count;
+    }
+    const finished = this.session.done + this.session.failed + this.session.retried;
+    const elapsedMs = this.session.started ? Date.now() - this.session.started : 0;
+    const perMinute = elapsedMs > 0 ? finished / (elapsedMs / 60000) : 0;
+    return {
+      ...counts,
+      workers: this.running ? this.concurrency : 0,
+      session: { ...this.session, avgMs: finished > 0 ? Math.round(this.session.totalMs / finished) : 0 },
+      perMinute: Math.round(perMinute * 10) / 10,
+      etaMinutes: perMinute > 0 ? Math.round(((counts.queued + counts.running) / perMinute) * 10) / 10 : null
+    };
+  }
+
+  /**
+   * 대기 / 실행 중 작업이 없을 때까지 기다리기, onProgress 로 주기적으로 보고
+   */
+  async drain(onProgress = null, intervalMs = 10000) {
+    for (;;) {
+      const progress = await this.progress();
+      if (onProgress) onProgress(progress);
+      if (progress.queued + progress.running === 0) return progress;
+      await this.sleep(intervalMs);
+    }
+  }
+
+  /**
+   * 특정 영상들이 끝날 때까지 최대 timeoutMs 기다리기, 끝난 영상 ID 배열 반환
+   */
+  async waitFor(videoIds, timeoutMs) {
+    const deadline = Date.now() + timeoutMs;
+    const placeholders = videoIds.map(() => '?').join(',');
+    for (;;) {
+      const rows = videoIds.length === 0 ? [] : await this.db.all(
+        `SELECT video_id, status FROM extraction_jobs WHERE video_id IN (${placeholders})`, videoIds
+      );
+      const pending = rows.filter(row => row.status === 'queued' || row.status === 'running');
+      if (pending.length === 0 || Date.now() >= deadline) {
+        return rows.filter(row => row.status === 'done').map(row => row.video_id);
+      }
+      await this.sleep(Math.min(1000, deadline - Date.now()));
+    }
+  }
+}
+
+module.exports = { ExtractionQueue, PRIORITY_QUERY, PRIORITY_BACKFILL };
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Persistent negative cache for failed extractions
+Remembers which videos failed, why, and when they may be tried again, so
+batch runs and lazy searches stop re-hitting YouTube for known-bad IDs.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extraction_failures.db')
+
+# The video itself has no usable captions: retry rarely
+PERMANENT_ERRORS = {
+    'TranscriptsDisabled', 'NoTranscriptFound', 'VideoUnavailable',
+    'VideoUnplayable', 'AgeRestricted', 'InvalidVideoId'
+}
+# YouTube is throttling our IP: says nothing about the video, not recorded
+# (the caller's backoff / circuit rotation retries it)
+BLOCKED_ERRORS = {'RequestBlocked', 'IpBlocked', 'TooManyRequests'}
+# Our own network / proxy is down: says nothing about the video, not recorded
+NETWORK_ERRORS = {
+    'ConnectionError', 'ProxyError', 'SSLError', 'Timeout',
+    'ConnectTimeout', 'ReadTimeout', 'KnownFailure'
+}
+
+PERMANENT_TTL = 7 * 24 * 3600
+PERMANENT_MAX_TTL = 90 * 24 * 3600
+OTHER_BACKOFF = 5 * 60
+MAX_BACKOFF = 24 * 3600
+
+
+def classify(error_type, error=''):
+    if error_type in PERMANENT_ERRORS:
+        return 'permanent'
+    if error_type in BLOCKED_ERRORS or '429' in (error or ''):
+        return 'blocked'
+    return 'other'
+
+
+def retry_delay(kind, attempts):
+    """Seconds to wait after the given number of consecutive failures"""
+    if kind == 'permanent':
+        return min(PERMANENT_MAX_TTL, PERMANENT_TTL * attempts)
+    return min(MAX_BACKOFF, OTHER_BACKOFF * 2 ** (attempts - 1))
+
+
+class FailureStore:
+    """SQLite-backed failure records keyed by video ID"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS failures (
+                video_id TEXT PRIMARY KEY,
+                error_type TEXT NOT NULL,
+                error TEXT,
+                kind TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 1,
+                first_failed_at REAL NOT NULL,
+                last_failed_at REAL NOT NULL,
+                next_eligible_at REAL NOT NULL
+            )
+        ''')
+        self.db.commit()
+
+    def check(self, video_id, now=None):
+        """The failure record if the video is still cooling down, else None"""
+        now = now or time.time()
+        with self.lock:
+            # 'blocked' rows were written before IP blocks stopped being recorded per video
+            row = self.db.execute(
+                "SELECT * FROM failures WHERE video_id = ? AND next_eligible_at > ? AND kind != 'blocked'",
+                (video_id, now)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def eligible(self, video_ids, now=None):
+        """Filter a list of IDs down to the ones worth a network call"""
+        now = now or time.time()
+        with self.lock:
+            blocked = {
+                row['video_id'] for row in self.db.execute(
+                    "SELECT video_id FROM failures WHERE next_eligible_at > ? AND kind != 'blocked'", (now,)
+                )
+            }
+        return [video_id for video_id in video_ids if video_id not in blocked]
+
+    def record_failure(self, video_id, error_type, error=''):
+        now = time.time()
+        kind = classify(error_type, error)
+        with self.lock:
+            row = self.db.execute(
+                'SELECT attempts, first_failed_at FROM failures WHERE video_id = ?',
+                (video_id,)
+            ).fetchone()
+            attempts = row['attempts'] + 1 if row else 1
+            first_failed_at = row['first_failed_at'] if row else now
+            self.db.execute('''
+                INSERT OR REPLACE INTO failures
+                (video_id, error_type, error, kind, attempts,
+                 first_failed_at, last_failed_at, next_eligible_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (video_id, error_type, (error or '')[:500], kind, attempts,
+                  first_failed_at, now, now + retry_delay(kind, attempts)))
+            self.db.commit()
+
+    def record_success(self, video_id):
+        with self.lock:
+            self.db.execute('DELETE FROM failures WHERE video_id = ?', (video_id,))
+            self.db.commit()
+
+    def record(self, result):
+        """Record an extractor result dict ({'success', 'video_id', 'error_type', ...})"""
+        video_id = result.get('video_id') or result.get('videoId')
+        if not video_id or result.get('error_type') in NETWORK_ERRORS:
+            return
+        if not result.get('success') and classify(result.get('error_type'), result.get('error', '')) == 'blocked':
+            return
+        if result.get('success'):
+            self.record_success(video_id)
+        else:
+            self.record_failure(video_id, result.get('error_type') or 'Unknown',
+                                result.get('error', ''))
+
+    def skipped_result(self, video_id, record):
+        """Result dict returned instead of a network call for a cooling-down video"""
+        wait = max(0, int(record['next_eligible_at'] - time.time()))
+        return {
+            'success': False,
+            'video_id': video_id,
+            'error': (f"Skipped: {record['error_type']} x{record['attempts']}, "
+                      f"retry in {wait}s"),
+            'error_type': 'KnownFailure',
+            'last_error_type': record['error_type']
+        }
+
+    def stats(self):
+        with self.lock:
+            rows = self.db.execute('''
+                SELECT kind, COUNT(*) AS count, SUM(next_eligible_at > ?) AS waiting
+                FROM failures GROUP BY kind
+            ''', (time.time(),)).fetchall()
+        return {row['kind']: {'total': row['count'], 'waiting': row['waiting']} for row in rows}
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def default_store():
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = FailureStore()
+        return _default_store
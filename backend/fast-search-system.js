@@ -1,38 +1,97 @@
 const Database = require('better-sqlite3');
 const fs = require('fs');
 const path = require('path');
+const { spawnSync } = require('child_process');
+const { TranscriptStore, STORE_DIR } = require('./transcript-store');
+const { QueryCache } = require('./query-cache');
+const { loadSource, toVideoRows, parseSources, buildSnapshot } = require('./fast-search-worker');
+const { SearchPool, searchIndex } = require('./search-pool');
+const { BLOCK_SEGMENTS, trainDictionary, packBlock, unpackBlock, registerTextFunctions } = require('./text-blocks');
+
+const BULK_MIN_VIDEOS = 20; // 이보다 많이 바뀌면 대량 인덱싱 모드
+const BULK_BATCH_SEGMENTS = 50000; // 대량 인덱싱 트랜잭션 하나에 넣을 세그먼트 수
+const FTS_AUTOMERGE = 4; // FTS5 기본값
+const CACHE_DIR = path.join(__dirname, 'transcript-cache');
+const PYTHON_COMMAND = process.env.PYTHON_COMMAND || 'py'; // python-youtube-bridge.js 와 같은 기본값
+const SNAPSHOT_GRACE_MS = 60 * 1000; // 게시 안 된 스냅샷을 지우기 전 대기 (다른 프로세스가 빌드 중일 수 있음)
+const WATCH_DELAY_MS = 2000; // 첫 변경 감지 후 인덱싱까지 모으는 시간
+const WATCH_POLL_MS = 30 * 1000; // fs.watch 가 놓친 변경 확인 주기
+const WATCHED_FILE = /^manifest\.json$|_real\.json$/;
+// 1: 세그먼트마다 제목 / method / 시작 시각까지 FTS 행에 저장
+// 2: 영상 정보는 indexed_videos 에 한 번, 텍스트는 사전 압축 블록 (FTS 는 외부 콘텐츠 테이블)
+const SCHEMA_VERSION = 2;
+// 세그먼트 id = 영상 id << SEGMENT_BITS | 영상 안 순번, 블록 id = 세그먼트 id >> BLOCK_BITS
+const SEGMENT_BITS = 20;
+const BLOCK_BITS = Math.log2(BLOCK_SEGMENTS);
+const SCHEMA_SQL = `
+  CREATE TABLE IF NOT EXISTS indexed_videos (
+    id INTEGER PRIMARY KEY,
+    video_id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    method TEXT,
+    content_hash TEXT NOT NULL,
+    segments INTEGER NOT NULL,
+    indexed_at INTEGER NOT NULL
+  );
+  CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    start_ms INTEGER NOT NULL
+  );
+  CREATE TABLE IF NOT EXISTS segment_blocks (
+    id INTEGER PRIMARY KEY,
+    dictionary INTEGER,
+    data BLOB NOT NULL
+  );
+  CREATE TABLE IF NOT EXISTS text_dictionaries (
+    id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL,
+    created_at INTEGER NOT NULL
+  );
+  CREATE VIEW IF NOT EXISTS segment_content AS
+    SELECT s.id AS id, s.start_ms AS start_ms,
+           segment_text(b.data, b.dictionary, d.data, s.id & ${BLOCK_SEGMENTS - 1}) AS text
+    FROM segments s
+    JOIN segment_blocks b ON b.id = s.id >> ${BLOCK_BITS}
+    LEFT JOIN text_dictionaries d ON d.id = b.dictionary;
+  CREATE VIRTUAL TABLE IF NOT EXISTS transcript_search USING fts5(
+    text,
+    content = 'segment_content',
+    content_rowid = 'id',
+    tokenize = 'porter ascii'
+  );
+  CREATE TABLE IF NOT EXISTS index_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    videos INTEGER NOT NULL,
+    segments INTEGER NOT NULL
+  );
+`;
 
 /**
  * 고속 검색 시스템 (SQLite FTS 기반 - better-sqlite3)
  */
 class FastSearchSystem {
-  constructor() {
+  constructor(dbPath = 'fast_search.db') {
+    this.dbPath = path.resolve(dbPath);
     this.db = null;
-    this.searchCache = new Map();
-    this.cacheTimeout = 5 * 60 * 1000; // 5분 캐시
+    this.currentFile = null; // 지금 읽고 쓰는 스냅샷 파일
+    this.pointerPath = `${this.dbPath.replace(/\.db$/, '')}.current.json`;
+    this.pool = null; // startSearchPool() 전에는 메인 스레드에서 검색
+    this.building = Promise.resolve(); // buildIndex() 는 한 번에 하나씩
+    this.watching = null;
+    this.searchCache = new QueryCache({ maxEntries: 500, ttlMs: 5 * 60 * 1000 }); // 5분 캐시
+    this.counters = { videos: 0, segments: 0 }; // index_stats 의 메모리 사본
   }
 
   /**
    * 데이터베이스 초기화 및 FTS 테이블 생성
+   * 게시된 스냅샷이 있으면 그것을, 없으면 dbPath 를 엶
    */
   initialize() {
     console.log('🚀 Fast Search System 초기화 중...');
     
     try {
-      this.db = new Database('fast_search.db');
-
-      // FTS5 가상 테이블 생성
-      this.db.exec(`
-        CREATE VIRTUAL TABLE IF NOT EXISTS transcript_search USING fts5(
-          video_id,
-          video_title, 
-          text,
-          start_time,
-          method,
-          tokenize = 'porter ascii'
-        )
-      `);
-      
+      this.openSnapshot(this.publishedSnapshot());
+      this.pruneSnapshots();
       console.log('✅ FTS 테이블 생성 완료');
     } catch (err) {
       console.error('❌ DB 초기화 오류:', err);
@@ -40,87 +99,302 @@ class FastSearchSystem {
     }
   }
 
+  /**
+   * 스냅샷 파일 열기 (없으면 테이블 생성), 열려 있던 연결은 닫음
+   *
+   * 구조 (SCHEMA_VERSION 2):
+   *   indexed_videos     영상마다 한 행 - 제목 / method / content hash (증분 인덱싱용) / 세그먼트 수
+   *   segments           세그먼트 id → 시작 시각 (ms)
+   *   segment_blocks     한 영상의 연속된 세그먼트 64개 텍스트를 사전 압축한 블록 (text-blocks.js)
+   *   text_dictionaries  블록 압축 사전
+   *   transcript_search  텍스트만 인덱싱하는 외부 콘텐츠 FTS5, 본문은 segment_content 뷰가 블록에서 꺼냄
+   *   index_stats        영상 / 세그먼트 수 (인덱싱할 때마다 같은 트랜잭션에서 갱신, COUNT 쿼리 대신 사용)
+   */
+  openSnapshot(file) {
+    const db = new Database(file);
+    // WAL: 검색 worker 의 읽기 전용 연결이 인덱싱 중에도 막히지 않게
+    db.pragma('journal_mode = WAL');
+    registerTextFunctions(db);
+
+    if (db.pragma('user_version', { simple: true }) < SCHEMA_VERSION) {
+      const legacy = db.prepare("SELECT 1 FROM sqlite_master WHERE name = 'transcript_search'").get();
+      if (legacy) {
+        // 예전 구조는 옮길 것 없이 비우고 다음 buildIndex() 에서 전부 다시 인덱싱
+        console.log('🔄 이전 인덱스 구조 - 압축 블록 구조로 다시 인덱싱합니다');
+        db.exec('DROP TABLE IF EXISTS transcript_search; DROP TABLE IF EXISTS indexed_videos; DROP TABLE IF EXISTS index_stats;');
+      }
+    }
+    db.exec(SCHEMA_SQL);
+    db.pragma(`user_version = ${SCHEMA_VERSION}`);
+
+    const previous = this.db;
+    this.db = db;
+    this.currentFile = file;
+    this.loadCounters();
+    this.prepareStatements();
+    this.loadDictionary();
+    if (previous) previous.close();
+  }
+
+  snapshotPath(version) {
+    return `${this.dbPath.replace(/\.db$/, '')}.${version}.db`;
+  }
+
+  /**
+   * 포인터 파일 { file, previous } (게시한 적이 없으면 null)
+   */
+  readPointer() {
+    try {
+      return JSON.parse(fs.readFileSync(this.pointerPath, 'utf8'));
+    } catch (error) {
+      return null; // 포인터 없음
+    }
+  }
+
+  /**
+   * 포인터 파일이 가리키는 게시된 스냅샷 (게시한 적이 없으면 dbPath)
+   */
+  publishedSnapshot() {
+    const pointer = this.readPointer();
+    if (pointer) {
+      const file = path.join(path.dirname(this.dbPath), pointer.file);
+      if (fs.existsSync(file)) return file;
+    }
+    return this.dbPath;
+  }
+
+  /**
+   * 지우면 안 되는 스냅샷: 게시된 것 + 그 직전 것 (다른 프로세스가 아직 전환 전일 수 있음) + 이 프로세스가 연 것
+   */
+  liveSnapshots() {
+    const dir = path.dirname(this.dbPath);
+    const pointer = this.readPointer();
+    const live = new Set([this.publishedSnapshot()]);
+    if (pointer && pointer.previous) live.add(path.join(dir, pointer.previous));
+    if (this.currentFile) live.add(this.currentFile);
+    return live;
+  }
+
+  /**
+   * 다 만든 스냅샷을 새 인덱스 버전으로 게시
+   * 포인터 파일을 임시 파일 + rename 으로 원자적으로 바꾸고 이 프로세스의 연결 / 검색 worker 를 옮김
+   * (검색은 교체 직전까지 이전 스냅샷을 온전히 봄)
+   * 이전 스냅샷은 포인터에 previous 로 남겨 다음 게시까지 지우지 않음 (그 전 것만 정리)
+   */
+  publish(file, version) {
+    const previous = this.publishedSnapshot();
+    const tmpPath = `${this.pointerPath}.${process.pid}.tmp`;
+    fs.writeFileSync(tmpPath, JSON.stringify({
+      file: path.basename(file),
+      previous: previous !== file ? path.basename(previous) : null,
+      version,
+      publishedAt: Date.now()
+    }));
+    fs.renameSync(tmpPath, this.pointerPath);
+    this.activate(file);
+    this.pruneSnapshots();
+    console.log(`📦 인덱스 스냅샷 게시: ${path.basename(file)} (${this.counters.videos}개 영상, ${this.counters.segments}개 세그먼트)`);
+  }
+
+  activate(file) {
+    this.openSnapshot(file);
+    if (this.pool) this.pool.reopen(file);
+    this.searchCache.clear();
+  }
+
+  /**
+   * 다른 프로세스 (CLI rebuild 등) 가 새 스냅샷을 게시했으면 따라감, 바꿨으면 true
+   */
+  refreshSnapshot() {
+    const file = this.publishedSnapshot();
+    if (file === this.currentFile) return false;
+    this.activate(file);
+    console.log(`🔄 새 인덱스 스냅샷으로 전환: ${path.basename(file)}`);
+    return true;
+  }
+
+  removeSnapshotFiles(file) {
+    for (const suffix of ['', '-wal', '-shm']) {
+      fs.rmSync(file + suffix, { force: true });
+    }
+  }
+
+  /**
+   * 현재 / 직전 게시본이 아닌 스냅샷 정리 (두 번 이상 교체된 것, 빌드 중 종료된 것)
+   * 최근에 수정된 파일은 다른 프로세스가 빌드 중일 수 있어서 남겨 둠
+   */
+  pruneSnapshots() {
+    const dir = path.dirname(this.dbPath);
+    const prefix = `${path.basename(this.dbPath).replace(/\.db$/, '')}.`;
+    const live = this.liveSnapshots();
+    for (const name of fs.readdirSync(dir)) {
+      const file = path.join(dir, name);
+      const snapshot = file === this.dbPath || (name.startsWith(prefix) && /^\d+\.db$/.test(name.slice(prefix.length)));
+      if (!snapshot || live.has(file)) continue;
+      if (Date.now() - fs.statSync(file).mtimeMs > SNAPSHOT_GRACE_MS) {
+        this.removeSnapshotFiles(file);
+      }
+    }
+  }
+
+  /**
+   * index_stats 읽기 (없으면 indexed_videos 에서 한 번만 계산해서 채움)
+   */
+  loadCounters() {
+    let row = this.db.prepare('SELECT videos, segments FROM index_stats WHERE id = 1').get();
+    if (!row) {
+      row = this.db.prepare(
+        'SELECT COUNT(*) AS videos, COALESCE(SUM(segments), 0) AS segments FROM indexed_videos'
+      ).get();
+      this.db.prepare('INSERT INTO index_stats (id, videos, segments) VALUES (1, ?, ?)').run(row.videos, row.segments);
+    }
+    this.counters = { videos: row.videos, segments: row.segments };
+  }
+
+  /**
+   * 인덱싱에 쓰는 문장은 한 번만 prepare
+   * 세그먼트 / 블록 id 는 SQL 안에서 정수 연산으로 계산 (JS number 를 그대로 넘기면 REAL 로 바인딩되고,
+   * 외부 콘텐츠 FTS5 는 REAL rowid 를 무시하고 새 rowid 를 붙임)
+   */
+  prepareStatements() {
+    const segmentId = `((? << ${SEGMENT_BITS}) | ?)`;
+    const videoRange = `BETWEEN (? << ${SEGMENT_BITS}) AND ((? + 1) << ${SEGMENT_BITS}) - 1`;
+    const blockRange = `BETWEEN (? << ${SEGMENT_BITS - BLOCK_BITS}) AND ((? + 1) << ${SEGMENT_BITS - BLOCK_BITS}) - 1`;
+    this.statements = {
+      insertSegment: this.db.prepare(`INSERT INTO segments (id, start_ms) VALUES (${segmentId}, ?)`),
+      insertText: this.db.prepare(`INSERT INTO transcript_search (rowid, text) VALUES (${segmentId}, ?)`),
+      insertBlock: this.db.prepare(
+        `INSERT INTO segment_blocks (id, dictionary, data) VALUES (${segmentId} >> ${BLOCK_BITS}, ?, ?)`
+      ),
+      // 외부 콘텐츠 FTS 는 지울 때 인덱싱했던 텍스트가 필요 → 그 영상의 블록을 풀어서 'delete' 명령으로
+      videoBlocks: this.db.prepare(`SELECT id, dictionary, data FROM segment_blocks WHERE id ${blockRange}`),
+      deleteText: this.db.prepare(`
+        INSERT INTO transcript_search (transcript_search, rowid, text)
+        VALUES ('delete', (? << ${BLOCK_BITS}) | ?, ?)
+      `),
+      deleteVideoSegments: this.db.prepare(`DELETE FROM segments WHERE id ${videoRange}`),
+      deleteVideoBlocks: this.db.prepare(`DELETE FROM segment_blocks WHERE id ${blockRange}`),
+      indexedVideo: this.db.prepare('SELECT id, segments FROM indexed_videos WHERE video_id = ?'),
+      upsertIndexed: this.db.prepare(`
+        INSERT INTO indexed_videos (video_id, title, method, content_hash, segments, indexed_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (video_id) DO UPDATE SET
+          title = excluded.title,
+          method = excluded.method,
+          content_hash = excluded.content_hash,
+          segments = excluded.segments,
+          indexed_at = excluded.indexed_at
+        RETURNING id
+      `),
+      deleteIndexed: this.db.prepare('DELETE FROM indexed_videos WHERE video_id = ?'),
+      dictionary: this.db.prepare('SELECT data FROM text_dictionaries WHERE id = ?'),
+      insertDictionary: this.db.prepare('INSERT INTO text_dictionaries (data, created_at) VALUES (?, ?) RETURNING id'),
+      addCounters: this.db.prepare('UPDATE index_stats SET videos = videos + ?, segments = segments + ? WHERE id = 1')
+    };
+  }
+
+  /**
+   * 새 블록을 압축할 사전 (가장 최근에 학습한 것), 없으면 null
+   */
+  loadDictionary() {
+    const row = this.db.prepare('SELECT id, data FROM text_dictionaries ORDER BY id DESC LIMIT 1').get();
+    this.dictionary = row || null;
+    this.dictionaries = new Map(row ? [[row.id, row.data]] : []);
+  }
+
+  /**
+   * 블록이 가리키는 사전 (복사한 스냅샷에는 예전 사전으로 압축한 블록이 남아 있을 수 있음)
+   */
+  dictionaryData(id) {
+    if (id === null) return null;
+    if (!this.dictionaries.has(id)) {
+      const row = this.statements.dictionary.get(id);
+      this.dictionaries.set(id, row ? row.data : null);
+    }
+    return this.dictionaries.get(id);
+  }
+
+  /**
+   * 사전이 아직 없으면 이번에 쓸 영상들의 텍스트로 학습해서 저장 (처음 인덱싱 / 강제 재구축 때 한 번)
+   */
+  ensureDictionary(videos) {
+    if (this.dictionary) return;
+    const texts = videos.filter(video => video.texts).flatMap(video => video.texts);
+    if (texts.length === 0) return;
+    const startTime = Date.now();
+    const data = trainDictionary(texts);
+    const { id } = this.statements.insertDictionary.get(data, Date.now());
+    this.dictionary = { id, data };
+    this.dictionaries.set(id, data);
+    console.log(`📚 텍스트 압축 사전 학습: ${data.length} bytes (${Date.now() - startTime}ms)`);
+  }
+
+  /**
+   * 카운터 증감 (트랜잭션 안에서 호출)
+   */
+  addCounters(videos, segments) {
+    this.statements.addCounters.run(videos, segments);
+    this.counters.videos += videos;
+    this.counters.segments += segments;
+  }
+
   /**
    * 빌드 인덱스
+   * 영상별 content hash 를 indexed_videos 에 기록해 두고, 새로 생겼거나 바뀐 영상만 다시 인덱싱
+   * 동시에 불려도 순서대로 하나씩 실행
    */
-  async buildIndex(force = false) {
+  buildIndex(force = false) {
+    const run = this.building.then(() => this.runBuild(force));
+    this.building = run.catch(() => {});
+    return run;
+  }
+
+  /**
+   * 변경이 적으면 현재 스냅샷에 트랜잭션 하나로 반영
+   * 강제 재구축 / 대량 변경은 별도 스냅샷 파일에서 만들어 다 되면 게시 (검색은 그동안 이전 스냅샷에서)
+   * → 어느 쪽이든 검색은 반쯤 만든 인덱스를 보지 않음
+   */
+  async runBuild(force) {
     const startTime = Date.now();
     console.log('🔨 인덱스 빌드 시작...');
     
     try {
+      const { sources, changed, removed } = this.pendingChanges();
+
       // 강제 재인덱싱이 아니라면 필요성 확인
-      if (!force) {
-        const needsIndex = await this.needsIndexing();
-        if (!needsIndex) {
-          console.log('✅ 인덱스가 이미 최신 상태입니다. 재구축을 건너뜁니다.');
-          const stats = await this.getStats();
-          console.log(`📊 기존 인덱스: ${stats.totalVideos}개 영상, ${stats.totalSegments}개 세그먼트`);
-          return { videos: stats.totalVideos, segments: stats.totalSegments, timeMs: 0, skipped: true };
-        }
+      if (!force && changed.length === 0 && removed.length === 0) {
+        console.log('✅ 인덱스가 이미 최신 상태입니다. 재구축을 건너뜁니다.');
+        const stats = await this.getStats();
+        console.log(`📊 기존 인덱스: ${stats.totalVideos}개 영상, ${stats.totalSegments}개 세그먼트`);
+        return { videos: stats.totalVideos, segments: stats.totalSegments, timeMs: 0, skipped: true };
       }
 
-      const cacheDir = path.join(__dirname, 'transcript-cache');
-      if (!fs.existsSync(cacheDir)) {
-        console.log('⚠️ transcript-cache 디렉터리가 없습니다.');
-        return { videos: 0, segments: 0, timeMs: 0, skipped: false };
-      }
-
-      // JSON 캐시 파일들 찾기
-      const files = fs.readdirSync(cacheDir).filter(file => file.endsWith('_real.json'));
-      console.log(`📁 발견된 JSON 캐시 파일: ${files.length}개`);
-      
-      if (files.length === 0) {
-        console.log('⚠️ JSON 캐시 파일이 없습니다.');
+      console.log(`📁 발견된 transcript: ${sources.length}개`);
+      if (sources.length === 0) {
+        console.log('⚠️ transcript-store / transcript-cache 에 인덱싱할 transcript 가 없습니다.');
         return { videos: 0, segments: 0, timeMs: 0, skipped: false };
       }
 
+      let stats;
       if (force) {
-        // 강제 재인덱싱: 기존 데이터 삭제
-        console.log('🗑️ 강제 재인덱싱 - 기존 인덱스 삭제 중...');
-        this.runQuery('DELETE FROM transcript_search');
-        console.log('✅ 기존 인덱스 삭제 완료\n');
+        console.log('🗑️ 강제 재인덱싱 - 빈 스냅샷에서 새로 구축');
+        stats = await this.rebuildSnapshot(sources, [], true);
+      } else if (changed.length >= BULK_MIN_VIDEOS) {
+        console.log(`📁 변경된 ${changed.length}개 영상, 제거된 ${removed.length}개 영상 - 스냅샷 복사본에 반영\n`);
+        stats = await this.rebuildSnapshot(changed, removed, false);
       } else {
-        // 증분 인덱싱: 이미 인덱싱된 비디오 제외
-        const indexedVideos = this.runQuery('SELECT DISTINCT video_id FROM transcript_search');
-        const indexedIds = new Set(indexedVideos.map(row => row.video_id));
-        const unindexedFiles = files.filter(file => {
-          const videoId = file.replace('_real.json', '');
-          return !indexedIds.has(videoId);
-        });
-        
-        if (unindexedFiles.length === 0) {
-          console.log('✅ 모든 영상이 이미 인덱싱되어 있습니다.');
-          const stats = await this.getStats();
-          return { videos: stats.totalVideos, segments: stats.totalSegments, timeMs: 0, skipped: true };
-        }
-        
-        console.log(`📁 새로운 ${unindexedFiles.length}개 파일만 인덱싱 예정\n`);
-        files.splice(0, files.length, ...unindexedFiles);
+        console.log(`📁 변경된 ${changed.length}개 영상 인덱싱, ${removed.length}개 영상 제거\n`);
+        stats = this.applyChanges(changed, removed);
       }
 
-      let indexedVideos = 0;
-      let totalSegments = 0;
-
-      // 각 파일 처리
-      for (let i = 0; i < files.length; i++) {
-        const file = files[i];
-        const progress = Math.round(((i + 1) / files.length) * 100);
-        console.log(`📝 처리 중 (${i + 1}/${files.length}) ${progress}%: ${file}`);
-        
-        try {
-          const segmentCount = await this.processJSONFile(file, cacheDir);
-          totalSegments += segmentCount;
-          indexedVideos++;
-        } catch (error) {
-          console.error(`❌ 파일 처리 오류 ${file}:`, error);
-        }
-      }
+      // 인덱스 내용이 바뀌었으니 이전 검색 결과는 무효
+      this.searchCache.clear();
 
       const buildTime = Date.now() - startTime;
       console.log(`✅ 인덱스 빌드 완료 (${buildTime}ms)`);
-      console.log(`📊 처리된 영상: ${indexedVideos}개, 세그먼트: ${totalSegments}개`);
+      console.log(`📊 처리된 영상: ${stats.videos}개, 세그먼트: ${stats.segments}개`);
       
-      return { videos: indexedVideos, segments: totalSegments, timeMs: buildTime, skipped: false };
+      return { videos: stats.videos, segments: stats.segments, timeMs: buildTime, skipped: false };
     } catch (error) {
       console.error('❌ 인덱스 빌드 오류:', error);
       throw error;
@@ -128,54 +402,323 @@ class FastSearchSystem {
   }
 
   /**
-   * JSON 캐시 파일 처리
+   * 새 스냅샷 파일을 worker thread 에서 만들고 게시 (fresh 가 아니면 현재 스냅샷 복사본에 변경분만)
    */
-  async processJSONFile(filename, cacheDir) {
+  async rebuildSnapshot(sources, removed, fresh) {
+    const version = Date.now();
+    const file = this.snapshotPath(version);
     try {
-      const filePath = path.join(cacheDir, filename);
-      const data = JSON.parse(fs.readFileSync(filePath, 'utf8'));
-      
-      const videoId = data.video_id || data.videoId || filename.replace('_real.json', '');
-      const title = data.video_title || data.videoTitle || 'Unknown Video';
+      if (!fresh) {
+        await this.db.backup(file);
+      }
+      console.log(`🏗️ 인덱스 스냅샷 빌드 중: ${path.basename(file)} (${sources.length}개 영상)`);
+      const stats = await buildSnapshot({ file, specs: sources.map(source => source.spec), removed, fresh });
+      this.publish(file, version);
+      return stats;
+    } catch (error) {
+      this.removeSnapshotFiles(file);
+      throw error;
+    }
+  }
 
-      if (!data.transcript || data.transcript.length === 0) {
-        console.log(`  ⚠️ 빈 transcript: ${filename}`);
-        return 0;
+  /**
+   * 적은 변경을 현재 스냅샷에 트랜잭션 하나로 반영 (WAL 이라 검색은 반영 전 / 후 중 하나만 봄)
+   */
+  applyChanges(changed, removed) {
+    const videos = changed.map(source => {
+      try {
+        const { title, method, transcript } = source.load();
+        return toVideoRows(source.videoId, source.hash, title, method, transcript || []);
+      } catch (error) {
+        return { videoId: source.videoId, error: error.message };
       }
+    });
+
+    let indexedVideos = 0;
+    let totalSegments = 0;
+    this.ensureDictionary(videos);
+    this.db.transaction(() => {
+      for (const videoId of removed) {
+        this.removeVideo(videoId);
+      }
+      for (const video of videos) {
+        if (video.error) {
+          console.error(`❌ 영상 처리 오류 ${video.videoId}: ${video.error}`);
+          continue;
+        }
+        if (video.texts.length === 0) {
+          console.log(`  ⚠️ 빈 transcript: ${video.videoId}`);
+          continue;
+        }
+        this.writeVideo(video);
+        console.log(`  ✅ ${video.videoId}: ${video.texts.length}개 세그먼트 인덱싱`);
+        indexedVideos++;
+        totalSegments += video.texts.length;
+      }
+    })();
+    return { videos: indexedVideos, segments: totalSegments };
+  }
 
-      let segmentCount = 0;
-      
-      // 데이터베이스에 삽입
-      const stmt = this.db.prepare(`
-        INSERT INTO transcript_search (video_id, video_title, text, start_time, method)
-        VALUES (?, ?, ?, ?, ?)
-      `);
-
-      for (const segment of data.transcript) {
-        stmt.run(videoId, title, segment.text, segment.start, data.method || 'json');
-        segmentCount++;
+  /**
+   * 감시 모드: 추출기 / SRT 변환기가 transcript-store 나 transcript-cache 에 쓰면 몇 초 안에 인덱싱
+   * 첫 변경 후 delayMs 동안 모아서 buildIndex(false) 한 번, fs.watch 가 놓친 변경은 pollMs 마다 확인
+   * 다른 프로세스가 게시한 스냅샷 (CLI rebuild 등) 도 여기서 따라감
+   */
+  watch({ delayMs = WATCH_DELAY_MS, pollMs = WATCH_POLL_MS, onUpdate = null } = {}) {
+    if (this.watching) return;
+
+    const run = async () => {
+      try {
+        this.refreshSnapshot();
+        const stats = await this.buildIndex(false);
+        if (!stats.skipped && onUpdate) onUpdate(stats);
+      } catch (error) {
+        console.error('❌ 감시 모드 인덱싱 오류:', error.message);
+      } finally {
+        this.watching.timer = null;
+      }
+    };
+    // 계속 쓰고 있어도 delayMs 안에는 반영되게 debounce 가 아니라 첫 이벤트 기준
+    const schedule = () => {
+      if (this.watching && !this.watching.timer) {
+        this.watching.timer = setTimeout(run, delayMs);
       }
+    };
+
+    this.watching = { timer: null, watchers: [], poll: setInterval(schedule, pollMs) };
+    this.watching.poll.unref();
+    for (const dir of [STORE_DIR, CACHE_DIR]) {
+      if (!fs.existsSync(dir)) continue;
+      try {
+        const watcher = fs.watch(dir, (event, file) => {
+          if (!file || WATCHED_FILE.test(file)) schedule();
+        });
+        watcher.on('error', error => console.log(`⚠️ ${dir} 감시 오류: ${error.message}`));
+        this.watching.watchers.push(watcher);
+      } catch (error) {
+        console.log(`⚠️ ${dir} 감시 실패, ${pollMs / 1000}초마다 확인: ${error.message}`);
+      }
+    }
+    console.log(`👀 인덱스 감시 모드 시작 (${this.watching.watchers.length}개 디렉터리)`);
+  }
 
-      console.log(`  ✅ ${segmentCount}개 세그먼트 인덱싱 완료`);
-      return segmentCount;
-    } catch (error) {
-      console.error(`❌ JSON 파일 처리 오류 ${filename}:`, error);
-      return 0;
+  unwatch() {
+    if (!this.watching) return;
+    clearTimeout(this.watching.timer);
+    clearInterval(this.watching.poll);
+    this.watching.watchers.forEach(watcher => watcher.close());
+    this.watching = null;
+  }
+
+  /**
+   * 인덱싱 대상 영상 목록 { videoId, hash, spec, load() }
+   * transcript-store 영상은 manifest 의 content hash, transcript-cache JSON 파일은 크기+수정 시각
+   * spec 은 worker 로 넘겨서 파싱할 수 있는 순수 객체 (fast-search-worker.js)
+   */
+  listSources() {
+    const store = TranscriptStore.load(STORE_DIR);
+    const specs = [];
+    if (store) {
+      for (const videoId of Object.keys(store.manifest.videos)) {
+        const entry = store.entry(videoId);
+        specs.push({
+          kind: 'store',
+          videoId,
+          hash: entry.hash,
+          title: entry.title,
+          method: entry.method,
+          dataPath: store.dataPath,
+          offset: entry.offset,
+          length: entry.length,
+          encoding: entry.encoding || null,
+          dictionaryPath: store.dictionaryPath(entry)
+        });
+      }
+    }
+    // SRT 변환기 등이 transcript-cache 에 직접 쓴 영상 (store 에 같은 영상이 있으면 store 우선)
+    if (fs.existsSync(CACHE_DIR)) {
+      const inStore = new Set(specs.map(spec => spec.videoId));
+      for (const file of fs.readdirSync(CACHE_DIR).filter(name => name.endsWith('_real.json'))) {
+        const videoId = file.replace('_real.json', '');
+        if (inStore.has(videoId)) continue;
+        const filePath = path.join(CACHE_DIR, file);
+        const stats = fs.statSync(filePath);
+        specs.push({
+          kind: 'file',
+          videoId,
+          hash: `${stats.size}-${stats.mtimeMs}`,
+          filePath
+        });
+      }
+    }
+    return specs.map(spec => ({ videoId: spec.videoId, hash: spec.hash, spec, load: () => loadSource(spec) }));
+  }
+
+  /**
+   * indexed_videos 와 비교해 새로 생겼거나 바뀐 영상, 사라진 영상 찾기
+   */
+  pendingChanges() {
+    const sources = this.listSources();
+    const indexed = new Map(
+      this.runQuery('SELECT video_id, content_hash FROM indexed_videos')
+        .map(row => [row.video_id, row.content_hash])
+    );
+    const present = new Set(sources.map(source => source.videoId));
+    return {
+      sources,
+      changed: sources.filter(source => indexed.get(source.videoId) !== source.hash),
+      removed: [...indexed.keys()].filter(videoId => !present.has(videoId))
+    };
+  }
+
+  /**
+   * 영상 하나의 행 쓰기 (트랜잭션 안에서 호출)
+   * video 는 toVideoRows() 형식, fresh 면 비어 있는 인덱스라 기존 행 삭제를 건너뜀
+   */
+  writeVideo(video, fresh = false) {
+    const previous = fresh ? null : this.statements.indexedVideo.get(video.videoId);
+    if (previous) {
+      this.deleteSegments(previous.id);
+    }
+    const { insertSegment, insertText, insertBlock, upsertIndexed } = this.statements;
+    const { id } = upsertIndexed.get(
+      video.videoId, video.title, video.method, video.hash, video.texts.length, Date.now()
+    );
+    for (let i = 0; i < video.texts.length; i++) {
+      insertSegment.run(id, i, Math.round(video.starts[i] * 1000));
+      insertText.run(id, i, video.texts[i]);
+    }
+    const dictionary = this.dictionary || { id: null, data: null };
+    for (let i = 0; i < video.texts.length; i += BLOCK_SEGMENTS) {
+      insertBlock.run(id, i, dictionary.id, packBlock(video.texts.slice(i, i + BLOCK_SEGMENTS), dictionary.data));
+    }
+    this.addCounters(previous ? 0 : 1, video.texts.length - (previous ? previous.segments : 0));
+  }
+
+  /**
+   * 영상 하나의 FTS 행 / 세그먼트 / 블록 삭제 (id 는 indexed_videos.id, 트랜잭션 안에서 호출)
+   * 그 영상의 블록만 풀어서 인덱싱했던 텍스트로 FTS 'delete'
+   */
+  deleteSegments(id) {
+    const { videoBlocks, deleteText, deleteVideoSegments, deleteVideoBlocks } = this.statements;
+    for (const block of videoBlocks.all(id, id)) {
+      unpackBlock(block.data, this.dictionaryData(block.dictionary)).forEach((text, slot) => {
+        deleteText.run(block.id, slot, text);
+      });
+    }
+    deleteVideoSegments.run(id, id);
+    deleteVideoBlocks.run(id, id);
+  }
+
+  /**
+   * 대량 인덱싱: worker thread 로 병렬 파싱한 뒤 BULK_BATCH_SEGMENTS 단위 트랜잭션으로 삽입
+   * 삽입 중에는 FTS5 automerge 를 끄고 마지막에 한 번 optimize
+   */
+  async bulkIndex(sources, { fresh = false } = {}) {
+    const parseStart = Date.now();
+    const parsed = await parseSources(sources.map(source => source.spec));
+    console.log(`📖 ${parsed.length}개 영상 파싱 완료 (${Date.now() - parseStart}ms)`);
+    return this.writeVideos(parsed, { fresh });
+  }
+
+  /**
+   * toVideoRows() 형식 영상들을 큰 트랜잭션으로 쓰기, { videos, segments } 반환
+   */
+  writeVideos(videos, { fresh = false } = {}) {
+    const writeBatch = this.db.transaction(batch => {
+      for (const video of batch) {
+        this.writeVideo(video, fresh);
+      }
+    });
+
+    let indexedVideos = 0;
+    let totalSegments = 0;
+    this.ensureDictionary(videos);
+    this.db.exec(`INSERT INTO transcript_search (transcript_search, rank) VALUES ('automerge', 0)`);
+    try {
+      let batch = [];
+      let batchSegments = 0;
+      for (const video of videos) {
+        if (video.error) {
+          console.error(`❌ 영상 처리 오류 ${video.videoId}: ${video.error}`);
+          continue;
+        }
+        if (video.texts.length === 0) {
+          console.log(`  ⚠️ 빈 transcript: ${video.videoId}`);
+          continue;
+        }
+        batch.push(video);
+        batchSegments += video.texts.length;
+        if (batchSegments >= BULK_BATCH_SEGMENTS) {
+          writeBatch(batch);
+          console.log(`📝 ${indexedVideos + batch.length}/${videos.length} 영상 인덱싱`);
+          indexedVideos += batch.length;
+          totalSegments += batchSegments;
+          batch = [];
+          batchSegments = 0;
+        }
+      }
+      if (batch.length > 0) {
+        writeBatch(batch);
+        indexedVideos += batch.length;
+        totalSegments += batchSegments;
+      }
+    } finally {
+      this.db.exec(`INSERT INTO transcript_search (transcript_search, rank) VALUES ('automerge', ${FTS_AUTOMERGE})`);
+    }
+
+    const optimizeStart = Date.now();
+    this.db.exec(`INSERT INTO transcript_search (transcript_search) VALUES ('optimize')`);
+    console.log(`🧹 FTS optimize 완료 (${Date.now() - optimizeStart}ms)`);
+    return { videos: indexedVideos, segments: totalSegments };
+  }
+
+  /**
+   * Python 추출기 결과를 바로 인덱싱 (extract_transcript.py 가 출력하는 JSON 그대로)
+   * { video_id | videoId, video_title | videoTitle, method, transcript }
+   * 인덱스에만 넣으면 다음 buildIndex() 가 store 에 없는 영상으로 보고 지우므로,
+   * 먼저 transcript_store.py put 으로 store 에 저장한 뒤 store 변경분을 인덱싱
+   */
+  async importResults(results) {
+    const input = results.map(result => JSON.stringify(result)).join('\n');
+    const put = spawnSync(PYTHON_COMMAND, [path.join(__dirname, 'transcript_store.py'), 'put', '-'], {
+      input,
+      encoding: 'utf8'
+    });
+    if (put.error || put.status !== 0) {
+      throw new Error(`transcript_store.py put failed: ${put.error ? put.error.message : put.stderr.trim()}`);
     }
+    const { stored } = JSON.parse(put.stdout.trim().split('\n').pop());
+    console.log(`💾 transcript-store 에 ${stored}개 영상 저장`);
+    return this.buildIndex(false);
+  }
+
+  removeVideo(videoId) {
+    this.db.transaction(() => {
+      const previous = this.statements.indexedVideo.get(videoId);
+      if (previous) {
+        this.deleteSegments(previous.id);
+        this.statements.deleteIndexed.run(videoId);
+        this.addCounters(-1, -previous.segments);
+      }
+    })();
+  }
+
+  /**
+   * 인덱싱된 세그먼트 수 (인덱싱 안 된 영상이면 null)
+   */
+  indexedSegments(videoId) {
+    const row = this.statements.indexedVideo.get(videoId);
+    return row ? row.segments : null;
   }
 
   /**
-   * 인덱싱이 필요한지 확인
+   * 인덱싱이 필요한지 확인 (새로 생겼거나 내용이 바뀐 / 사라진 영상이 있으면 true)
    */
   async needsIndexing() {
     try {
-      const cacheDir = path.join(__dirname, 'transcript-cache');
-      if (!fs.existsSync(cacheDir)) return false;
-      
-      const cacheFiles = fs.readdirSync(cacheDir).filter(f => f.endsWith('_real.json'));
-      const indexedVideos = this.runQuery('SELECT DISTINCT video_id FROM transcript_search');
-      
-      return cacheFiles.length > indexedVideos.length;
+      const { changed, removed } = this.pendingChanges();
+      return changed.length > 0 || removed.length > 0;
     } catch (error) {
       console.error('인덱싱 필요성 확인 오류:', error);
       return true;
@@ -183,174 +726,60 @@ class FastSearchSystem {
   }
 
   /**
-   * 인덱스 통계 가져오기
+   * 인덱스 통계 (메모리 카운터, 쿼리 없음)
+   */
+  stats() {
+    return {
+      totalVideos: this.counters.videos,
+      totalSegments: this.counters.segments,
+      cacheSize: this.searchCache.size,
+      cache: this.searchCache.stats(),
+      searchPool: this.pool ? this.pool.stats() : null
+    };
+  }
+
+  /**
+   * 인덱스 통계 가져오기 (기존 async 인터페이스)
    */
   async getStats() {
-    try {
-      const videosResult = this.runQuery('SELECT COUNT(DISTINCT video_id) as count FROM transcript_search');
-      const segmentsResult = this.runQuery('SELECT COUNT(*) as count FROM transcript_search');
-      
-      return {
-        totalVideos: videosResult[0]?.count || 0,
-        totalSegments: segmentsResult[0]?.count || 0
-      };
-    } catch (error) {
-      console.error('통계 가져오기 오류:', error);
-      return { totalVideos: 0, totalSegments: 0 };
+    return this.stats();
+  }
+
+  /**
+   * 검색 worker thread 풀 시작 (server.js), 이후 search() 는 풀에서 실행
+   */
+  startSearchPool(options = {}) {
+    if (!this.pool) {
+      this.pool = new SearchPool(this.currentFile, options).start();
     }
+    return this.pool;
   }
 
   /**
    * 고속 검색 실행
+   * signal / timeoutMs 는 검색 풀에서만 적용 (취소 / 시간 초과 시 빈 배열)
    */
-  async search(query, limit = 50) {
+  async search(query, limit = 50, { signal, timeoutMs } = {}) {
     // 캐시 확인
-    const cacheKey = `${query}_${limit}`;
-    if (this.searchCache.has(cacheKey)) {
-      const cached = this.searchCache.get(cacheKey);
-      if (Date.now() - cached.timestamp < this.cacheTimeout) {
-        console.log(`⚡ 캐시에서 반환: "${query}"`);
-        return cached.results;
-      }
+    const cacheKey = this.searchCache.key(query, limit);
+    const cached = this.searchCache.get(cacheKey);
+    if (cached) {
+      console.log(`⚡ 캐시에서 반환: "${query}"`);
+      return cached;
     }
 
     const startTime = Date.now();
-    
-    // 검색어를 개별 단어로 분리
-    const searchWords = query.split(' ')
-      .map(word => word.replace(/[^\w]/g, ''))
-      .filter(word => word.length > 0);
-    
-    if (searchWords.length === 0) {
-      return [];
-    }
-
     try {
-      let allResults = [];
-      
-      // 1단계: 모든 단어가 포함된 결과 검색 (AND 검색)
-      if (searchWords.length > 1) {
-        const andQuery = searchWords.join(' AND ');
-        
-        const exactResults = this.runQuery(`
-          SELECT 
-            video_id,
-            video_title,
-            text,
-            start_time,
-            method,
-            highlight(transcript_search, 2, '<mark>', '</mark>') as highlighted_text,
-            bm25(transcript_search) as relevance_score
-          FROM transcript_search 
-          WHERE transcript_search MATCH ?
-          ORDER BY relevance_score ASC
-          LIMIT ?
-        `, [andQuery, limit]);
-
-        // 완전 매치 결과에 우선순위 부여
-        exactResults.forEach(row => {
-          allResults.push({
-            videoId: row.video_id,
-            videoTitle: row.video_title,
-            text: row.text,
-            highlightedText: row.highlighted_text,
-            start: row.start_time,
-            method: row.method,
-            relevanceScore: row.relevance_score,
-            matchType: 'exact',
-            priority: 1
-          });
-        });
-      }
-      
-      // 2단계: 개별 단어 검색 (OR 검색)
-      if (allResults.length < limit) {
-        const orQuery = searchWords.join(' OR ');
-        const remainingLimit = limit - allResults.length;
-        
-        const partialResults = this.runQuery(`
-          SELECT 
-            video_id,
-            video_title,
-            text,
-            start_time,
-            method,
-            highlight(transcript_search, 2, '<mark>', '</mark>') as highlighted_text,
-            bm25(transcript_search) as relevance_score
-          FROM transcript_search 
-          WHERE transcript_search MATCH ?
-          ORDER BY relevance_score ASC
-          LIMIT ?
-        `, [orQuery, limit * 2]);
-        
-        // 이미 포함된 결과 제외
-        const existingIds = new Set(allResults.map(r => `${r.videoId}_${r.start}`));
-        
-        partialResults.forEach(row => {
-          const id = `${row.video_id}_${row.start_time}`;
-          if (!existingIds.has(id) && allResults.length < limit) {
-            const textLower = row.text.toLowerCase();
-            const matchedWords = searchWords.filter(word => 
-              textLower.includes(word.toLowerCase())
-            );
-            
-            allResults.push({
-              videoId: row.video_id,
-              videoTitle: row.video_title,
-              text: row.text,
-              highlightedText: row.highlighted_text,
-              start: row.start_time,
-              method: row.method,
-              relevanceScore: row.relevance_score,
-              matchType: 'partial',
-              matchedWordsCount: matchedWords.length,
-              totalWordsCount: searchWords.length,
-              priority: 2 + (searchWords.length - matchedWords.length)
-            });
-          }
-        });
-      }
-
-      // 결과 정렬
-      allResults.sort((a, b) => {
-        if (a.priority !== b.priority) {
-          return a.priority - b.priority;
-        }
-        if (a.matchedWordsCount && b.matchedWordsCount) {
-          if (a.matchedWordsCount !== b.matchedWordsCount) {
-            return b.matchedWordsCount - a.matchedWordsCount;
-          }
-        }
-        return a.relevanceScore - b.relevanceScore;
-      });
+      const results = this.pool && this.pool.available > 0
+        ? await this.pool.search(query, limit, { signal, timeoutMs })
+        : searchIndex(this.db, query, limit);
 
-      const finalResults = allResults.slice(0, limit);
-      const searchTime = Date.now() - startTime;
-      
-      console.log(`🔍 검색 완료: "${query}" - ${finalResults.length}개 결과 (${searchTime}ms)`);
-
-      // 결과 포맷팅
-      const formattedResults = finalResults.map(result => ({
-        videoId: result.videoId,
-        videoTitle: result.videoTitle,
-        text: result.text,
-        highlightedText: result.highlightedText,
-        start: result.start,
-        method: result.method,
-        relevanceScore: result.relevanceScore,
-        matchType: result.matchType,
-        matchInfo: result.matchedWordsCount ? 
-          `${result.matchedWordsCount}/${result.totalWordsCount} words matched` : 
-          'exact match'
-      }));
+      console.log(`🔍 검색 완료: "${query}" - ${results.length}개 결과 (${Date.now() - startTime}ms)`);
 
       // 캐시 저장
-      this.searchCache.set(cacheKey, {
-        results: formattedResults,
-        timestamp: Date.now()
-      });
+      this.searchCache.set(cacheKey, results);
 
-      return formattedResults;
+      return results;
     } catch (error) {
       console.error(`❌ 검색 오류: ${error.message}`);
       return [];
@@ -417,6 +846,11 @@ class FastSearchSystem {
    * 시스템 종료
    */
   close() {
+    this.unwatch();
+    if (this.pool) {
+      this.pool.close();
+      this.pool = null;
+    }
     if (this.db) {
       this.db.close();
       console.log('🔒 Fast Search System 종료');
@@ -424,4 +858,43 @@ class FastSearchSystem {
   }
 }
 
-module.exports = FastSearchSystem; 
\ No newline at end of file
+module.exports = FastSearchSystem;
+
+/**
+ * 명령행:
+ *   node fast-search-system.js rebuild          전체 재인덱싱 (새 스냅샷을 만들어 게시)
+ *   node fast-search-system.js watch            감시 모드: 추출 결과가 생기면 바로 인덱싱 (서버는 새 스냅샷을 따라감)
+ *   node fast-search-system.js import FILE|-    추출기 결과 JSON (한 줄에 하나 또는 배열) 바로 인덱싱
+ *     예) python extract_transcript.py VIDEO_ID | node fast-search-system.js import -
+ */
+async function main() {
+  const [command, file] = process.argv.slice(2);
+  const searchSystem = new FastSearchSystem();
+  searchSystem.initialize();
+  const startTime = Date.now();
+
+  let stats;
+  if (command === 'rebuild') {
+    stats = await searchSystem.buildIndex(true);
+  } else if (command === 'watch') {
+    await searchSystem.buildIndex(false);
+    searchSystem.watch();
+    return;
+  } else if (command === 'import' && file) {
+    const text = fs.readFileSync(file === '-' ? 0 : file, 'utf8').trim();
+    const results = text.startsWith('[') ? JSON.parse(text) :
+      text.split('\n').filter(line => line.trim()).map(line => JSON.parse(line));
+    stats = await searchSystem.importResults(results);
+  } else {
+    console.log('Usage: node fast-search-system.js rebuild | watch | import FILE|-');
+    process.exit(1);
+  }
+  console.log(JSON.stringify({ ...stats, ...searchSystem.stats(), time_ms: Date.now() - startTime }));
+}
+
+if (require.main === module) {
+  main().catch(error => {
+    console.error('❌', error);
+    process.exit(1);
+  });
+}
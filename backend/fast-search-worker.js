@@ -0,0 +1,116 @@
+const fs = require('fs');
+const os = require('os');
+const { Worker, isMainThread, parentPort, workerData } = require('worker_threads');
+const { decodeObject } = require('./transcript-store');
+
+const MAX_THREADS = 4;
+const MIN_VIDEOS_PER_THREAD = 16;
+
+/**
+ * 인덱싱할 영상 하나 읽기
+ * spec 은 worker 로 그대로 넘길 수 있는 순수 객체:
+ *   { kind: 'store', videoId, hash, title, method, dataPath, offset, length, encoding, dictionaryPath }
+ *   { kind: 'file', videoId, hash, filePath }
+ */
+function loadSource(spec) {
+  if (spec.kind === 'store') {
+    const data = Buffer.alloc(spec.length);
+    const fd = fs.openSync(spec.dataPath, 'r');
+    try {
+      fs.readSync(fd, data, 0, spec.length, spec.offset);
+    } finally {
+      fs.closeSync(fd);
+    }
+    return { title: spec.title, method: spec.method, transcript: decodeObject(spec, data, spec.dictionaryPath) };
+  }
+
+  const data = JSON.parse(fs.readFileSync(spec.filePath, 'utf8'));
+  return {
+    title: data.video_title || data.videoTitle || 'Unknown Video',
+    method: data.method || 'json',
+    transcript: data.transcript || []
+  };
+}
+
+/**
+ * transcript → FTS 에 넣을 열 단위 데이터 { videoId, hash, title, method, starts, texts }
+ * start 는 초 단위 실수 (start_ms 가 있으면 ms 정밀도 유지)
+ */
+function toVideoRows(videoId, hash, title, method, transcript) {
+  const starts = new Float64Array(transcript.length);
+  const texts = new Array(transcript.length);
+  transcript.forEach((segment, i) => {
+    starts[i] = segment.start_ms != null ? segment.start_ms / 1000 : segment.start;
+    texts[i] = segment.text;
+  });
+  return { videoId, hash, title, method, starts, texts };
+}
+
+function parseSource(spec) {
+  try {
+    const { title, method, transcript } = loadSource(spec);
+    return toVideoRows(spec.videoId, spec.hash, title, method, transcript);
+  } catch (error) {
+    return { videoId: spec.videoId, error: error.message };
+  }
+}
+
+/**
+ * 여러 영상을 worker thread 로 나눠서 읽고 JSON.parse (적으면 현재 스레드에서)
+ * 입력 순서대로 toVideoRows() 결과 배열 반환, 실패한 영상은 { videoId, error }
+ */
+function parseSources(specs, threads = Math.min(MAX_THREADS, Math.max(1, os.cpus().length - 1))) {
+  threads = Math.min(threads, Math.floor(specs.length / MIN_VIDEOS_PER_THREAD));
+  if (threads <= 1) {
+    return Promise.resolve(specs.map(parseSource));
+  }
+
+  const chunkSize = Math.ceil(specs.length / threads);
+  const chunks = [];
+  for (let i = 0; i < specs.length; i += chunkSize) {
+    chunks.push(specs.slice(i, i + chunkSize));
+  }
+  return Promise.all(chunks.map(chunk => new Promise((resolve, reject) => {
+    const worker = new Worker(__filename, { workerData: chunk });
+    worker.once('message', resolve);
+    worker.once('error', reject);
+    worker.once('exit', code => {
+      if (code !== 0) reject(new Error(`Index worker stopped with exit code ${code}`));
+    });
+  }))).then(results => results.flat());
+}
+
+/**
+ * 새 인덱스 스냅샷 파일을 worker thread 에서 만들기 (그동안 메인 스레드는 검색 응답)
+ * job: { file, specs, removed, fresh } - fresh 가 아니면 file 은 현재 스냅샷의 복사본
+ * { videos, segments } 반환
+ */
+function buildSnapshot(job) {
+  return new Promise((resolve, reject) => {
+    const worker = new Worker(__filename, { workerData: { snapshot: job } });
+    worker.once('message', resolve);
+    worker.once('error', reject);
+    worker.once('exit', code => {
+      if (code !== 0) reject(new Error(`Snapshot worker stopped with exit code ${code}`));
+    });
+  });
+}
+
+module.exports = { loadSource, toVideoRows, parseSources, buildSnapshot };
+
+if (!isMainThread && parentPort && Array.isArray(workerData)) {
+  const videos = workerData.map(parseSource);
+  parentPort.postMessage(videos, videos.filter(video => video.starts).map(video => video.starts.buffer));
+} else if (!isMainThread && parentPort && workerData && workerData.snapshot) {
+  const FastSearchSystem = require('./fast-search-system');
+  const { file, specs, removed, fresh } = workerData.snapshot;
+  const side = new FastSearchSystem(file);
+  side.openSnapshot(file);
+  for (const videoId of removed) {
+    side.removeVideo(videoId);
+  }
+  side.bulkIndex(specs.map(spec => ({ videoId: spec.videoId, spec })), { fresh }).then(stats => {
+    side.db.close();
+    parentPort.postMessage(stats);
+  });
+}
@@ -3,6 +3,13 @@ const { open } = require('sqlite');
 const path = require('path');
 const { PythonYouTubeBridge } = require('./python-youtube-bridge');
 const { YouTubeAPICollector } = require('./youtube-api-collector');
+const { QueryCache } = require('./query-cache');
+const { ExtractionQueue, PRIORITY_QUERY } = require('./extraction-queue');
+const { BLOCK_SEGMENTS, trainDictionary, packBlock, unpackBlock } = require('./text-blocks');
+
+const BLOCK_BITS = Math.log2(BLOCK_SEGMENTS); // transcript_terms rowid = block id << BLOCK_BITS | slot
+const MIN_INDEXED_QUERY = 3; // trigram index needs at least 3 characters
+const SCAN_BATCH_BLOCKS = 256; // blocks fetched per query when scanning for shorter queries
 
 class LazyTranscriptSystem {
   constructor() {
@@ -10,8 +17,16 @@ class LazyTranscriptSystem {
     this.db = null;
     this.pythonBridge = new PythonYouTubeBridge();
     this.apiCollector = null; // Will be initialized if API key is available
-    this.processingQueue = new Map(); // Prevent duplicate processing
-    this.init();
+    this.queue = null; // Durable extraction job queue, created once the database is open
+    this.dictionary = null; // { id, data } used for new transcript blocks
+    this.dictionaries = new Map(); // dictionary id -> data, for reading blocks
+    this.transactionTail = Promise.resolve(); // transactions on the shared connection run one at a time
+    this.searchCache = new QueryCache({
+      maxEntries: 500,
+      ttlMs: 60 * 60 * 1000, // Cache for 1 hour
+      filePath: path.join(__dirname, 'lazy_search_cache.json')
+    });
+    this.ready = this.init();
   }
 
   async init() {
@@ -24,6 +39,12 @@ class LazyTranscriptSystem {
 
       // Create tables
       await this.createTables();
+      this.searchCache.load();
+
+      // Background extraction workers (EXTRACTION_WORKERS concurrent Python processes)
+      this.queue = new ExtractionQueue(this.db, (videoId, bridge) => this.extractVideo(videoId, bridge));
+      await this.queue.init();
+      this.queue.start();
       
       // Initialize API collector if YouTube API key is available
       const apiKey = process.env.YOUTUBE_API_KEY;
@@ -61,35 +82,60 @@ class LazyTranscriptSystem {
       )
     `);
 
-    // Transcripts table
+    // Blocks written before the search index existed had no id column to key it by
+    const blockColumns = await this.db.all('PRAGMA table_info(transcript_blocks)');
+    const unkeyedBlocks = blockColumns.length > 0 && !blockColumns.some(column => column.name === 'id');
+    if (unkeyedBlocks) {
+      await this.db.exec('ALTER TABLE transcript_blocks RENAME TO transcript_blocks_unkeyed');
+    }
+    const indexed = await this.db.get("SELECT 1 FROM sqlite_master WHERE name = 'transcript_terms'");
+
+    // Transcripts: up to BLOCK_SEGMENTS consecutive segments of a video per row,
+    // texts deflated with a trained dictionary (text-blocks.js), start times as a JSON array.
+    // transcript_terms is a contentless trigram index of the segment texts (case-insensitive
+    // substring search like LIKE '%q%'), so a search only inflates the blocks it matched
     await this.db.exec(`
-      CREATE TABLE IF NOT EXISTS transcripts (
+      CREATE TABLE IF NOT EXISTS transcript_blocks (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         video_id TEXT NOT NULL,
-        start_time INTEGER NOT NULL,
-        text TEXT NOT NULL,
-        similarity_keywords TEXT, -- For faster searching
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        block INTEGER NOT NULL,
+        segments INTEGER NOT NULL,
+        starts TEXT NOT NULL,
+        dictionary INTEGER,
+        data BLOB NOT NULL,
+        UNIQUE (video_id, block),
         FOREIGN KEY (video_id) REFERENCES videos (id)
-      )
+      );
+      CREATE TABLE IF NOT EXISTS text_dictionaries (
+        id INTEGER PRIMARY KEY,
+        data BLOB NOT NULL,
+        created_at INTEGER NOT NULL
+      );
+      CREATE VIRTUAL TABLE IF NOT EXISTS transcript_terms USING fts5(
+        text,
+        content = '',
+        tokenize = 'trigram'
+      );
     `);
+    if (unkeyedBlocks) {
+      await this.db.exec(`
+        INSERT INTO transcript_blocks (video_id, block, segments, starts, dictionary, data)
+        SELECT video_id, block, segments, starts, dictionary, data FROM transcript_blocks_unkeyed
+        ORDER BY video_id, block;
+        DROP TABLE transcript_blocks_unkeyed;
+      `);
+    }
+    await this.loadDictionary();
+    if (!indexed) {
+      await this.indexTranscriptBlocks();
+    }
+    await this.migrateTranscriptRows();
 
-    // Search cache table
-    await this.db.exec(`
-      CREATE TABLE IF NOT EXISTS search_cache (
-        query_hash TEXT PRIMARY KEY,
-        query TEXT NOT NULL,
-        results TEXT NOT NULL, -- JSON string
-        result_count INTEGER,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        expires_at TEXT
-      )
-    `);
+    // Search results are cached in memory by QueryCache now
+    await this.db.exec('DROP TABLE IF EXISTS search_cache');
 
     // Create indexes for faster searching
     await this.db.exec(`
-      CREATE INDEX IF NOT EXISTS idx_transcripts_video_id ON transcripts(video_id);
-      CREATE INDEX IF NOT EXISTS idx_transcripts_text ON transcripts(text);
       CREATE INDEX IF NOT EXISTS idx_videos_category ON videos(category);
       CREATE INDEX IF NOT EXISTS idx_videos_processed ON videos(transcript_processed);
     `);
@@ -97,6 +143,154 @@ class LazyTranscriptSystem {
     console.log('📊 Database tables created/verified');
   }
 
+  async loadDictionary() {
+    const row = await this.db.get('SELECT id, data FROM text_dictionaries ORDER BY id DESC LIMIT 1');
+    if (row) {
+      this.dictionary = row;
+      this.dictionaries.set(row.id, row.data);
+    }
+  }
+
+  /**
+   * Dictionary for new blocks, trained from the given texts the first time
+   */
+  async ensureDictionary(texts) {
+    if (this.dictionary || texts.length === 0) return;
+    const data = trainDictionary(texts);
+    const { lastID } = await this.db.run(
+      'INSERT INTO text_dictionaries (data, created_at) VALUES (?, ?)', [data, Date.now()]
+    );
+    this.dictionary = { id: lastID, data };
+    this.dictionaries.set(lastID, data);
+  }
+
+  async dictionaryData(id) {
+    if (id === null) return null;
+    if (!this.dictionaries.has(id)) {
+      const row = await this.db.get('SELECT data FROM text_dictionaries WHERE id = ?', [id]);
+      this.dictionaries.set(id, row ? row.data : null);
+    }
+    return this.dictionaries.get(id);
+  }
+
+  /**
+   * One-time move of the old row-per-segment transcripts table into compressed blocks
+   */
+  async migrateTranscriptRows() {
+    const legacy = await this.db.get("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transcripts'");
+    if (!legacy) return;
+
+    const rows = await this.db.all('SELECT video_id, start_time, text FROM transcripts ORDER BY video_id, id');
+    const videos = new Map();
+    for (const row of rows) {
+      if (!videos.has(row.video_id)) videos.set(row.video_id, []);
+      videos.get(row.video_id).push({ start: row.start_time, text: row.text });
+    }
+    await this.ensureDictionary(rows.map(row => row.text));
+    await this.inTransaction(async () => {
+      for (const [videoId, segments] of videos) {
+        await this.writeTranscriptBlocks(videoId, segments);
+      }
+      await this.db.exec(`
+        DROP INDEX IF EXISTS idx_transcripts_video_id;
+        DROP INDEX IF EXISTS idx_transcripts_text;
+        DROP TABLE transcripts;
+      `);
+    });
+    await this.db.exec('VACUUM');
+    console.log(`🗜️ Moved ${rows.length} transcript segments of ${videos.size} videos into compressed blocks`);
+  }
+
+  /**
+   * Run fn between BEGIN and COMMIT (ROLLBACK if it throws). Extraction workers
+   * share this connection, so transactions are queued instead of nesting
+   */
+  inTransaction(fn) {
+    const run = this.transactionTail.then(async () => {
+      await this.db.exec('BEGIN');
+      try {
+        const result = await fn();
+        await this.db.exec('COMMIT');
+        return result;
+      } catch (error) {
+        await this.db.exec('ROLLBACK');
+        throw error;
+      }
+    });
+    this.transactionTail = run.catch(() => {});
+    return run;
+  }
+
+  /**
+   * Add one block's texts to transcript_terms (rowids computed in SQL so they stay integers)
+   */
+  async indexBlock(blockId, texts) {
+    for (let slot = 0; slot < texts.length; slot++) {
+      await this.db.run(
+        `INSERT INTO transcript_terms (rowid, text) VALUES ((? << ${BLOCK_BITS}) | ?, ?)`,
+        [blockId, slot, texts[slot]]
+      );
+    }
+  }
+
+  /**
+   * One-time build of transcript_terms for blocks stored before it existed
+   */
+  async indexTranscriptBlocks() {
+    const blocks = await this.db.all('SELECT id, dictionary, data FROM transcript_blocks');
+    if (blocks.length === 0) return;
+    await this.inTransaction(async () => {
+      for (const block of blocks) {
+        await this.indexBlock(block.id, unpackBlock(block.data, await this.dictionaryData(block.dictionary)));
+      }
+    });
+    console.log(`🔎 Indexed ${blocks.length} transcript blocks for search`);
+  }
+
+  /**
+   * Remove a video's transcript blocks and their search terms; the contentless
+   * index needs the original texts, so only this video's blocks are inflated
+   */
+  async deleteTranscriptBlocks(videoId) {
+    const blocks = await this.db.all(
+      'SELECT id, dictionary, data FROM transcript_blocks WHERE video_id = ?', [videoId]
+    );
+    for (const block of blocks) {
+      const texts = unpackBlock(block.data, await this.dictionaryData(block.dictionary));
+      for (let slot = 0; slot < texts.length; slot++) {
+        await this.db.run(
+          `INSERT INTO transcript_terms (transcript_terms, rowid, text) VALUES ('delete', (? << ${BLOCK_BITS}) | ?, ?)`,
+          [block.id, slot, texts[slot]]
+        );
+      }
+    }
+    await this.db.run('DELETE FROM transcript_blocks WHERE video_id = ?', [videoId]);
+  }
+
+  /**
+   * Replace a video's transcript blocks (call inside a transaction)
+   */
+  async writeTranscriptBlocks(videoId, segments) {
+    const dictionary = this.dictionary || { id: null, data: null };
+    await this.deleteTranscriptBlocks(videoId);
+    for (let i = 0; i < segments.length; i += BLOCK_SEGMENTS) {
+      const block = segments.slice(i, i + BLOCK_SEGMENTS);
+      const texts = block.map(segment => segment.text);
+      const { lastID } = await this.db.run(`
+        INSERT INTO transcript_blocks (video_id, block, segments, starts, dictionary, data)
+        VALUES (?, ?, ?, ?, ?, ?)
+      `, [
+        videoId,
+        i / BLOCK_SEGMENTS,
+        block.length,
+        JSON.stringify(block.map(segment => segment.start)),
+        dictionary.id,
+        packBlock(texts, dictionary.data)
+      ]);
+      await this.indexBlock(lastID, texts);
+    }
+  }
+
   async getVideoCount() {
     const result = await this.db.get('SELECT COUNT(*) as count FROM videos');
     return result.count;
@@ -136,7 +330,7 @@ class LazyTranscriptSystem {
     console.log(`🔍 Searching for: "${query}"`);
     
     // Check cache first
-    const cached = await this.getCachedSearch(query);
+    const cached = await this.getCachedSearch(query, limit);
     if (cached) {
       console.log('📂 Using cached search results');
       return cached;
@@ -147,59 +341,117 @@ class LazyTranscriptSystem {
     
     // If we have enough results, return them
     if (processedResults.length >= limit) {
-      await this.cacheSearchResults(query, processedResults);
+      await this.cacheSearchResults(query, limit, processedResults);
       return processedResults;
     }
 
-    // Otherwise, find and process more videos that might contain this query
+    // Otherwise queue videos that might contain this query for extraction;
+    // cached results are cleared as soon as a new transcript is saved
     const candidateVideos = await this.findCandidateVideos(query, limit * 2);
-    const newlyProcessed = await this.processVideosInBackground(candidateVideos);
-    
-    // Search again with newly processed videos
-    const allResults = await this.searchProcessedTranscripts(query, limit);
+    await this.processVideosInBackground(candidateVideos, { query });
     
-    await this.cacheSearchResults(query, allResults);
-    return allResults;
+    await this.cacheSearchResults(query, limit, processedResults);
+    return processedResults;
   }
 
+  /**
+   * Case-insensitive substring match over the stored transcripts, most recently
+   * updated videos first. transcript_terms finds the matching segments and only
+   * their blocks are inflated; queries too short for trigrams fall back to a scan
+   */
   async searchProcessedTranscripts(query, limit) {
+    if ([...query].length < MIN_INDEXED_QUERY) {
+      return this.scanProcessedTranscripts(query, limit);
+    }
+
     const sql = `
-      SELECT 
+      SELECT
+        t.rowid as segment,
+        b.id as blockId,
         v.id as videoId,
         v.title,
         v.channel_title as channelTitle,
         v.category,
-        t.start_time as startTime,
-        t.text as transcript,
-        1.0 as similarity
-      FROM transcripts t
-      JOIN videos v ON t.video_id = v.id
-      WHERE t.text LIKE ? OR t.text LIKE ?
-      ORDER BY 
-        CASE 
-          WHEN t.text LIKE ? THEN 1
-          ELSE 2
-        END,
-        v.updated_at DESC
+        b.starts,
+        b.dictionary,
+        b.data
+      FROM transcript_terms t
+      JOIN transcript_blocks b ON b.id = t.rowid >> ${BLOCK_BITS}
+      JOIN videos v ON b.video_id = v.id
+      WHERE transcript_terms MATCH ?
+      ORDER BY v.updated_at DESC, t.rowid
       LIMIT ?
     `;
+    const hits = await this.db.all(sql, [`"${query.replace(/"/g, '""')}"`, limit]);
+
+    const needle = query.toLowerCase();
+    const inflated = new Map();
+    const results = [];
+    for (const hit of hits) {
+      if (!inflated.has(hit.blockId)) {
+        inflated.set(hit.blockId, {
+          texts: unpackBlock(hit.data, await this.dictionaryData(hit.dictionary)),
+          starts: JSON.parse(hit.starts)
+        });
+      }
+      const { texts, starts } = inflated.get(hit.blockId);
+      const slot = hit.segment & (BLOCK_SEGMENTS - 1);
+      // The trigram fold is not exactly toLowerCase; keep the scan's semantics
+      if (!texts[slot] || !texts[slot].toLowerCase().includes(needle)) continue;
+      results.push(this.formatProcessedHit(hit, query, texts[slot], starts[slot]));
+    }
+    return results;
+  }
 
-    const searchPattern = `%${query}%`;
-    const exactPattern = `%${query.toLowerCase()}%`;
-    
-    const results = await this.db.all(sql, [
-      searchPattern,
-      exactPattern,
-      exactPattern,
-      limit
-    ]);
+  /**
+   * Paged scan for 1-2 character queries; blocks are inflated a batch at a time until limit hits
+   */
+  async scanProcessedTranscripts(query, limit) {
+    const sql = `
+      SELECT 
+        v.id as videoId,
+        v.title,
+        v.channel_title as channelTitle,
+        v.category,
+        b.starts,
+        b.dictionary,
+        b.data
+      FROM transcript_blocks b
+      JOIN videos v ON b.video_id = v.id
+      ORDER BY v.updated_at DESC, b.video_id, b.block
+      LIMIT ? OFFSET ?
+    `;
 
-    return results.map(result => ({
-      ...result,
+    const needle = query.toLowerCase();
+    const results = [];
+    for (let offset = 0; results.length < limit; offset += SCAN_BATCH_BLOCKS) {
+      const blocks = await this.db.all(sql, [SCAN_BATCH_BLOCKS, offset]);
+      for (const block of blocks) {
+        const texts = unpackBlock(block.data, await this.dictionaryData(block.dictionary));
+        const starts = JSON.parse(block.starts);
+        texts.forEach((text, i) => {
+          if (results.length >= limit || !text.toLowerCase().includes(needle)) return;
+          results.push(this.formatProcessedHit(block, query, text, starts[i]));
+        });
+      }
+      if (blocks.length < SCAN_BATCH_BLOCKS) break;
+    }
+    return results;
+  }
+
+  formatProcessedHit(row, query, text, startTime) {
+    return {
+      videoId: row.videoId,
+      title: row.title,
+      channelTitle: row.channelTitle,
+      category: row.category,
+      startTime,
+      transcript: text,
+      similarity: 1.0,
       searchQuery: query,
       method: 'lazy-processed',
       isReal: true
-    }));
+    };
   }
 
   async findCandidateVideos(query, limit) {
@@ -232,58 +484,47 @@ class LazyTranscriptSystem {
     return candidates;
   }
 
-  async processVideosInBackground(videos) {
+  /**
+   * Queue videos with query priority; waitMs > 0 waits up to that long and
+   * returns the videos whose transcripts were saved in the meantime
+   */
+  async processVideosInBackground(videos, { query = null, waitMs = 0 } = {}) {
     if (videos.length === 0) return [];
 
-    console.log(`⚡ Processing ${videos.length} videos in background...`);
-    const processed = [];
+    const videoIds = videos.map(video => video.id);
+    await this.queue.enqueue(videoIds, { priority: PRIORITY_QUERY, query });
+    console.log(`⚡ Queued ${videos.length} videos for background extraction`);
+    if (waitMs <= 0) return [];
 
-    for (const video of videos.slice(0, 5)) { // Limit to 5 at a time
-      try {
-        // Skip if already processing
-        if (this.processingQueue.has(video.id)) {
-          continue;
-        }
-
-        this.processingQueue.set(video.id, true);
-        
-        // Extract transcript
-        const result = await this.pythonBridge.extractRealTranscript(video.id);
-        
-        if (result.success) {
-          // Save transcript to database
-          await this.saveTranscriptToDatabase(video.id, result.data);
-          processed.push(video);
-          console.log(`✅ Processed ${video.title}`);
-        }
-
-        // Update processing status
-        await this.updateVideoProcessingStatus(video.id, result.success);
-        
-      } catch (error) {
-        console.error(`❌ Failed to process ${video.id}:`, error.message);
-        await this.updateVideoProcessingStatus(video.id, false);
-      } finally {
-        this.processingQueue.delete(video.id);
+    const done = new Set(await this.queue.waitFor(videoIds, waitMs));
+    return videos.filter(video => done.has(video.id));
+  }
+
+  /**
+   * One extraction job: fetch the transcript through the worker's bridge and save it
+   */
+  async extractVideo(videoId, bridge = this.pythonBridge) {
+    let result;
+    try {
+      result = await bridge.extractRealTranscript(videoId);
+      if (result.success) {
+        await this.saveTranscriptToDatabase(videoId, result.data);
+        console.log(`✅ Processed ${videoId}`);
       }
+    } catch (error) {
+      console.error(`❌ Failed to process ${videoId}:`, error.message);
+      result = { success: false, error: error.message };
     }
-
-    console.log(`🎉 Background processing complete: ${processed.length} videos processed`);
-    return processed;
+    await this.updateVideoProcessingStatus(videoId, result.success);
+    return result;
   }
 
   async saveTranscriptToDatabase(videoId, transcriptData) {
-    const stmt = await this.db.prepare(`
-      INSERT INTO transcripts (video_id, start_time, text, similarity_keywords)
-      VALUES (?, ?, ?, ?)
-    `);
-
-    for (const segment of transcriptData) {
-      const keywords = this.extractKeywords(segment.text);
-      await stmt.run(videoId, segment.start, segment.text, keywords.join(' '));
-    }
-
-    await stmt.finalize();
+    await this.ensureDictionary(transcriptData.map(segment => segment.text));
+    // All-or-nothing: a crash mid-write must not leave the video with partial text
+    await this.inTransaction(() => this.writeTranscriptBlocks(videoId, transcriptData));
+    // New transcript, cached results may now be incomplete
+    this.searchCache.clear();
   }
 
   async updateVideoProcessingStatus(videoId, success) {
@@ -298,45 +539,12 @@ class LazyTranscriptSystem {
     `, [success, videoId]);
   }
 
-  extractKeywords(text) {
-    // Simple keyword extraction
-    return text.toLowerCase()
-      .replace(/[^\w\s]/g, '')
-      .split(/\s+/)
-      .filter(word => word.length > 3)
-      .slice(0, 10);
-  }
-
-  async getCachedSearch(query) {
-    const hash = this.hashQuery(query);
-    const cached = await this.db.get(`
-      SELECT results FROM search_cache 
-      WHERE query_hash = ? AND expires_at > CURRENT_TIMESTAMP
-    `, [hash]);
-
-    return cached ? JSON.parse(cached.results) : null;
-  }
-
-  async cacheSearchResults(query, results) {
-    const hash = this.hashQuery(query);
-    const expiresAt = new Date();
-    expiresAt.setHours(expiresAt.getHours() + 1); // Cache for 1 hour
-
-    await this.db.run(`
-      INSERT OR REPLACE INTO search_cache 
-      (query_hash, query, results, result_count, expires_at)
-      VALUES (?, ?, ?, ?, ?)
-    `, [
-      hash,
-      query,
-      JSON.stringify(results),
-      results.length,
-      expiresAt.toISOString()
-    ]);
+  async getCachedSearch(query, limit) {
+    return this.searchCache.get(this.searchCache.key(query, limit)) || null;
   }
 
-  hashQuery(query) {
-    return require('crypto').createHash('md5').update(query.toLowerCase()).digest('hex');
+  async cacheSearchResults(query, limit, results) {
+    this.searchCache.set(this.searchCache.key(query, limit), results);
   }
 
   async getStats() {
@@ -350,7 +558,7 @@ class LazyTranscriptSystem {
     `);
 
     const transcriptSegments = await this.db.get(`
-      SELECT COUNT(*) as count FROM transcripts
+      SELECT COALESCE(SUM(segments), 0) as count FROM transcript_blocks
     `);
 
     return {
@@ -362,7 +570,9 @@ class LazyTranscriptSystem {
         acc[cat.category] = cat.count;
         return acc;
       }, {}),
-      processingProgress: totalVideos > 0 ? (processedVideos / totalVideos * 100).toFixed(1) + '%' : '0%'
+      processingProgress: totalVideos > 0 ? (processedVideos / totalVideos * 100).toFixed(1) + '%' : '0%',
+      searchCache: this.searchCache.stats(),
+      extractionQueue: this.queue ? await this.queue.progress() : null
     };
   }
 
@@ -0,0 +1,45 @@
+const { PhraseIndex, tokenize, findString } = require('./phrase-index');
+
+/**
+ * lemma_index.py 가 만든 원형(lemma) 색인 로더
+ * 위치는 phrase_index.pack 과 같고 단어 대신 원형으로 색인됨 ("went" → "go")
+ * 형태소 분석은 Python 빌드 때 끝나므로 검색 시에는 토큰 테이블만 조회
+ */
+class LemmaIndex extends PhraseIndex {
+  constructor(filePath) {
+    super(filePath);
+    this.surfaceTerms = this.pack.strings('surface_terms');
+    this.surfaceLemma = this.pack.u32('surface_lemma');
+    this.forms = null;
+  }
+
+  /**
+   * 코퍼스에 있는 단어면 토큰 테이블의 원형, 없으면 그대로
+   */
+  lemma(token) {
+    const surface = findString(this.surfaceTerms, token);
+    return surface === -1 ? token : this.terms.get(this.surfaceLemma[surface]);
+  }
+
+  queryTerms(query) {
+    return tokenize(query).map(token => this.lemma(token));
+  }
+
+  /**
+   * 단어와 원형이 같은 모든 형태 ("go" → go, goes, going, went, gone ...)
+   */
+  expand(token) {
+    if (!this.forms) {
+      this.forms = new Map();
+      for (let i = 0; i < this.surfaceTerms.length; i++) {
+        const lemmaId = this.surfaceLemma[i];
+        if (!this.forms.has(lemmaId)) this.forms.set(lemmaId, []);
+        this.forms.get(lemmaId).push(this.surfaceTerms.get(i));
+      }
+    }
+    const lemmaId = this.termId(this.lemma(token));
+    return lemmaId === -1 ? [token] : this.forms.get(lemmaId);
+  }
+}
+
+module.exports = { LemmaIndex };
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Lemma index over corpus.pack
+Same token stream and positions as phrase_index.pack, but every token is
+indexed under its lemma ("went" -> "go", "stopped" -> "stop", "kids" ->
+"kid"), so a learner searching base forms finds every inflection with the
+same handful of binary searches as an exact phrase.
+
+Lemmatization is done offline, once per distinct token: irregular forms come
+from a table, regular suffixes are only stripped when the resulting base form
+occurs in the corpus itself, which keeps "news", "thing" or "brother" intact
+without a dictionary.
+
+Layout (packfile sections):
+    meta                 JSON     version, counts, corpus_built_at
+    terms                STRINGS  lemmas, sorted by UTF-8 bytes
+    term_offsets         U32      [lemmas + 1] slice of postings per lemma
+    postings             U32      token positions (phrase_index numbering)
+    segment_first_token  U32      [segments + 1]
+    surface_terms        STRINGS  token table: every folded surface form, sorted
+    surface_lemma        U32      [surface_terms] lemma number of each form
+
+Usage:
+    python lemma_index.py [--cache-dir DIR] [--corpus FILE] [--out FILE]
+    python lemma_index.py --query "went shopping"
+"""
+
+import argparse
+import bisect
+import json
+import os
+import time
+from array import array
+
+from corpus_pack import CACHE_DIR, CORPUS_FILE, Corpus
+from packfile import JSON, STRINGS, U32, write_pack
+from phrase_index import PhraseIndex, collect_postings, find_string, postings_sections, tokenize
+
+INDEX_FILE = 'lemma_index.pack'
+INDEX_VERSION = 1
+MIN_LEMMA_LENGTH = 2
+
+IRREGULAR = {
+    'am': 'be', 'is': 'be', 'are': 'be', 'was': 'be', 'were': 'be', 'been': 'be', 'being': 'be',
+    'has': 'have', 'had': 'have', 'having': 'have',
+    'does': 'do', 'did': 'do', 'done': 'do', 'doing': 'do',
+    'goes': 'go', 'went': 'go', 'gone': 'go', 'going': 'go',
+    'ate': 'eat', 'eaten': 'eat', 'became': 'become', 'began': 'begin', 'begun': 'begin',
+    'bit': 'bite', 'bitten': 'bite', 'blew': 'blow', 'blown': 'blow',
+    'broke': 'break', 'broken': 'break', 'brought': 'bring', 'built': 'build',
+    'bought': 'buy', 'caught': 'catch', 'chose': 'choose', 'chosen': 'choose',
+    'came': 'come', 'dealt': 'deal', 'drew': 'draw', 'drawn': 'draw',
+    'drank': 'drink', 'drunk': 'drink', 'drove': 'drive', 'driven': 'drive',
+    'fell': 'fall', 'fallen': 'fall', 'fed': 'feed', 'felt': 'feel', 'fought': 'fight',
+    'found': 'find', 'fled': 'flee', 'flew': 'fly', 'flown': 'fly',
+    'forgot': 'forget', 'forgotten': 'forget', 'froze': 'freeze', 'frozen': 'freeze',
+    'got': 'get', 'gotten': 'get', 'gave': 'give', 'given': 'give',
+    'grew': 'grow', 'grown': 'grow', 'hung': 'hang', 'heard': 'hear',
+    'hid': 'hide', 'hidden': 'hide', 'held': 'hold', 'kept': 'keep',
+    'knew': 'know', 'known': 'know', 'laid': 'lay', 'led': 'lead', 'left': 'leave',
+    'lent': 'lend', 'lost': 'lose', 'made': 'make', 'meant': 'mean', 'met': 'meet',
+    'paid': 'pay', 'ran': 'run', 'rode': 'ride', 'ridden': 'ride', 'rang': 'ring',
+    'rung': 'ring', 'rose': 'rise', 'risen': 'rise', 'said': 'say', 'saw': 'see',
+    'seen': 'see', 'sought': 'seek', 'sold': 'sell', 'sent': 'send', 'shook': 'shake',
+    'shaken': 'shake', 'shot': 'shoot', 'sang': 'sing', 'sung': 'sing', 'sat': 'sit',
+    'slept': 'sleep', 'slid': 'slide', 'spoke': 'speak', 'spoken': 'speak',
+    'spent': 'spend', 'stood': 'stand', 'stole': 'steal', 'stolen': 'steal',
+    'stuck': 'stick', 'struck': 'strike', 'swore': 'swear', 'sworn': 'swear',
+    'swam': 'swim', 'swum': 'swim', 'took': 'take', 'taken': 'take',
+    'taught': 'teach', 'tore': 'tear', 'torn': 'tear', 'told': 'tell',
+    'thought': 'think', 'threw': 'throw', 'thrown': 'throw',
+    'understood': 'understand', 'woke': 'wake', 'woken': 'wake', 'wore': 'wear',
+    'worn': 'wear', 'won': 'win', 'wrote': 'write', 'written': 'write',
+    'children': 'child', 'men': 'man', 'women': 'woman', 'people': 'person',
+    'feet': 'foot', 'teeth': 'tooth', 'mice': 'mouse', 'geese': 'goose',
+    'lives': 'life', 'wives': 'wife', 'knives': 'knife', 'halves': 'half',
+    'better': 'good', 'best': 'good', 'worse': 'bad', 'worst': 'bad',
+}
+
+# Base forms that merely look inflected
+KEEP = {
+    'always', 'bless', 'bring', 'ceiling', 'during', 'evening', 'hundred', 'king',
+    'less', 'morning', 'need', 'news', 'nothing', 'perhaps', 'ring', 'seed', 'series',
+    'sing', 'something', 'species', 'speed', 'spring', 'string', 'swing', 'thing',
+    'anything', 'everything', 'unless', 'wing',
+}
+
+# (suffix, endings to try on the stem), first match found in the corpus wins
+SUFFIX_RULES = [
+    ('ies', ['y']),
+    ('ied', ['y']),
+    ('ing', ['e', '']),
+    ('ed', ['e', '']),
+    ('es', ['e', '']),
+    ('s', ['']),
+]
+
+
+def lemmatize(token, vocabulary=()):
+    """Base form of one folded token; vocabulary is anything supporting `in`"""
+    if token in IRREGULAR:
+        return IRREGULAR[token]
+    if "'" in token:
+        base, _, suffix = token.partition("'")
+        return lemmatize(base, vocabulary) if suffix == 's' else token
+    if token in KEEP or len(token) < 4 or not token.isalpha():
+        return token
+
+    for suffix, endings in SUFFIX_RULES:
+        if not token.endswith(suffix) or (suffix == 's' and token.endswith('ss')):
+            continue
+        stem = token[:-len(suffix)]
+        candidates = [stem + ending for ending in endings]
+        if suffix in ('ing', 'ed') and len(stem) > 2 and stem[-1] == stem[-2]:
+            candidates.append(stem[:-1])  # running -> run, stopped -> stop
+        for candidate in candidates:
+            if len(candidate) >= MIN_LEMMA_LENGTH and candidate in vocabulary:
+                return IRREGULAR.get(candidate, candidate)
+    return token
+
+
+def build_lemma_index(corpus_path, out_path):
+    """Index every segment of corpus.pack by lemma, returns the meta dict"""
+    corpus = Corpus(corpus_path)
+    try:
+        surface_postings, segment_first_token = collect_postings(corpus)
+        corpus_built_at = corpus.meta['built_at']
+    finally:
+        corpus.close()
+
+    lemma_of = {surface: lemmatize(surface, surface_postings) for surface in surface_postings}
+    grouped = {}
+    for surface, positions in surface_postings.items():
+        grouped.setdefault(lemma_of[surface], []).append(positions)
+    lemma_postings = {
+        lemma: lists[0] if len(lists) == 1 else array('I', sorted(p for positions in lists for p in positions))
+        for lemma, lists in grouped.items()
+    }
+
+    sections = postings_sections(lemma_postings, segment_first_token)
+    lemma_ids = {lemma: i for i, lemma in enumerate(sections['terms'][1])}
+    surfaces = sorted(surface_postings, key=lambda term: term.encode('utf-8'))
+    sections['surface_terms'] = (STRINGS, surfaces)
+    sections['surface_lemma'] = (U32, array('I', (lemma_ids[lemma_of[s]] for s in surfaces)))
+
+    meta = {
+        'version': INDEX_VERSION,
+        'lemmas': len(lemma_ids),
+        'surfaces': len(surfaces),
+        'tokens': len(sections['postings'][1]),
+        'segments': len(segment_first_token) - 1,
+        'corpus_built_at': corpus_built_at,
+        'built_at': int(time.time())
+    }
+    write_pack(out_path, {'meta': (JSON, meta), **sections})
+    return meta
+
+
+def index_cache_dir(cache_dir=CACHE_DIR, out_path=None):
+    return build_lemma_index(
+        os.path.join(cache_dir, CORPUS_FILE),
+        out_path or os.path.join(cache_dir, INDEX_FILE)
+    )
+
+
+class _LemmaVocabulary:
+    def __init__(self, index):
+        self.index = index
+
+    def __contains__(self, term):
+        return self.index.term_id(term) is not None
+
+
+class LemmaIndex(PhraseIndex):
+    """Memory-mapped lemma_index.pack reader; find() matches any inflection"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.surface_terms = self.pack.strings('surface_terms')
+        self.surface_lemma = self.pack.u32('surface_lemma')
+        self.vocabulary = _LemmaVocabulary(self)
+
+    def lemma(self, token):
+        """Lemma of a folded token, from the token table when the corpus has it"""
+        surface = find_string(self.surface_terms, token)
+        if surface is not None:
+            return self.terms[self.surface_lemma[surface]]
+        return lemmatize(token, self.vocabulary)
+
+    def query_terms(self, phrase):
+        return [self.lemma(token) for token in tokenize(phrase)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the lemma index')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--corpus', help=f'corpus file (default: <cache-dir>/{CORPUS_FILE})')
+    parser.add_argument('--out', help=f'output file (default: <cache-dir>/{INDEX_FILE})')
+    parser.add_argument('--query', help='look up a phrase by lemma in an existing index instead')
+    args = parser.parse_args()
+
+    corpus_path = args.corpus or os.path.join(args.cache_dir, CORPUS_FILE)
+    index_path = args.out or os.path.join(args.cache_dir, INDEX_FILE)
+
+    started = time.time()
+    if args.query:
+        index, corpus = LemmaIndex(index_path), Corpus(corpus_path)
+        hits = []
+        for segment in index.find(args.query):
+            video = bisect.bisect_right(corpus.first_segment, segment) - 1
+            hits.append({
+                'video_id': corpus.video_ids[video],
+                'start_ms': corpus.start_ms[segment],
+                'text': corpus.texts[segment]
+            })
+        print(json.dumps({'query': args.query, 'lemmas': index.query_terms(args.query), 'hits': hits,
+                          'time_ms': round((time.time() - started) * 1000, 3)}, ensure_ascii=False))
+        return
+
+    meta = build_lemma_index(corpus_path, index_path)
+    meta['time_ms'] = int((time.time() - started) * 1000)
+    print(json.dumps(meta))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Lightweight instrumentation for the Python extractors
+Stage timers, counters (results by error class, bytes received, proxy
+requests) and a per-extraction breakdown. Wrapping an extraction in
+record() emits one JSON line to stderr with the milliseconds spent in each
+stage. Cumulative totals can also be written as a Prometheus text file (for
+node_exporter's textfile collector, or simply to cat).
+
+Everything is collected in memory regardless; output is opt-in:
+    TRANSCRIPT_METRICS=stderr            JSON lines on stderr
+    TRANSCRIPT_METRICS_FILE=/path.prom   Prometheus text file
+or extract_transcript.py --metrics / --metrics-file PATH.
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = 'transcript'
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+class Metrics:
+    """Thread-safe timers and counters with an optional per-thread record"""
+
+    def __init__(self, stderr=False, prometheus_path=None, interval=5.0):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.timers = {}    # (stage, labels) -> [calls, seconds, max seconds]
+        self.counters = {}  # (name, labels) -> value
+        self.stderr = stderr
+        self.prometheus_path = None
+        self.interval = interval
+        self.last_write = 0.0
+        self.configure(prometheus_path=prometheus_path)
+
+    def configure(self, stderr=None, prometheus_path=None):
+        if stderr is not None:
+            self.stderr = stderr
+        if prometheus_path and not self.prometheus_path:
+            atexit.register(self.write_prometheus)
+        if prometheus_path:
+            self.prometheus_path = prometheus_path
+
+    def observe(self, stage, seconds, **labels):
+        key = _key(stage, labels)
+        with self.lock:
+            timer = self.timers.get(key)
+            if timer is None:
+                timer = self.timers[key] = [0, 0.0, 0.0]
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+
+        record = getattr(self.local, 'record', None)
+        if record is not None:
+            stages = record['stages_ms']
+            stages[stage] = stages.get(stage, 0.0) + seconds * 1000
+
+    @contextmanager
+    def stage(self, stage, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, **labels)
+
+    def count(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+        record = getattr(self.local, 'record', None)
+        if record is not None:
+            counts = record['counts']
+            counts[name] = counts.get(name, 0) + value
+
+    def count_result(self, result):
+        """Extraction outcome by error class"""
+        if result.get('success'):
+            self.count('extractions', result='success')
+        else:
+            self.count('extractions', result='failure', error_type=result.get('error_type') or 'Unknown')
+
+    @contextmanager
+    def record(self, event, **fields):
+        """Collect the stages/counts of one unit of work into a single JSON line"""
+        record = {'event': event, **fields, 'stages_ms': {}, 'counts': {}}
+        previous = getattr(self.local, 'record', None)
+        self.local.record = record
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self.local.record = previous
+            elapsed = time.perf_counter() - started
+            self.observe(event, elapsed)
+            record['total_ms'] = round(elapsed * 1000, 3)
+            record['stages_ms'] = {k: round(v, 3) for k, v in record['stages_ms'].items()}
+            record['ts'] = round(time.time(), 3)
+            if self.stderr:
+                sys.stderr.write(json.dumps(record, ensure_ascii=False) + '\n')
+                sys.stderr.flush()
+            self.maybe_write_prometheus()
+
+    def instrument_session(self, session):
+        """Count response bytes and HTTP time for every request on a requests.Session"""
+        def on_response(response, *args, **kwargs):
+            self.observe('http', response.elapsed.total_seconds())
+            self.count('http_responses', status=response.status_code)
+            self.count('http_response_bytes', len(response.content))
+            return response
+
+        session.hooks['response'].append(on_response)
+        return session
+
+    def snapshot(self):
+        with self.lock:
+            timers = [
+                {'stage': name, **dict(labels), 'calls': calls,
+                 'total_ms': round(seconds * 1000, 3), 'max_ms': round(peak * 1000, 3)}
+                for (name, labels), (calls, seconds, peak) in sorted(self.timers.items())
+            ]
+            counters = [
+                {'name': name, **dict(labels), 'value': value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+        return {'timers': timers, 'counters': counters}
+
+    def prometheus_text(self):
+        lines = []
+        with self.lock:
+            timers = sorted(self.timers.items())
+            counters = sorted(self.counters.items())
+
+        if timers:
+            lines.append(f'# TYPE {PREFIX}_stage_seconds summary')
+            for (name, labels), (calls, seconds, _) in timers:
+                label_text = _format_labels((('stage', name),) + labels)
+                lines.append(f'{PREFIX}_stage_seconds_sum{label_text} {seconds:.6f}')
+                lines.append(f'{PREFIX}_stage_seconds_count{label_text} {calls}')
+            lines.append(f'# TYPE {PREFIX}_stage_seconds_max gauge')
+            for (name, labels), (_, _, peak) in timers:
+                label_text = _format_labels((('stage', name),) + labels)
+                lines.append(f'{PREFIX}_stage_seconds_max{label_text} {peak:.6f}')
+
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f'{PREFIX}_{name}_total'
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{_format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path=None):
+        path = path or self.prometheus_path
+        if not path:
+            return
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # metrics must never break an extraction
+        self.last_write = time.monotonic()
+
+    def maybe_write_prometheus(self):
+        if self.prometheus_path and time.monotonic() - self.last_write >= self.interval:
+            self.write_prometheus()
+
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+def default_metrics():
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics(
+                stderr=os.environ.get('TRANSCRIPT_METRICS') == 'stderr',
+                prometheus_path=os.environ.get('TRANSCRIPT_METRICS_FILE') or None
+            )
+        return _default_metrics
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Incremental overlap window index (overlap_search.db)
+Captions cut phrases across segments ("the easiest job in" / "the world or
+the hardest"), so every run of WINDOW_SIZE adjacent segments is indexed as
+one window, stepping WINDOW_STRIDE segments at a time. Each segment lands in
+WINDOW_SIZE / WINDOW_STRIDE windows, which keeps the index a fixed multiple
+of the corpus size.
+
+Windows are stored per video with a content hash. Re-running only touches
+videos that are new or whose transcript changed, so the index never needs a
+full rebuild. With --windows, extract_transcript.py --batch and
+srt_ingest.py call update_video() as each video is written; otherwise run
+this script (sync_cache_dir) after they finish.
+
+Usage:
+    python overlap_windows.py [--cache-dir DIR] [--db overlap_search.db]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from caption_normalize import segment_ms
+from corpus_pack import CACHE_DIR, iter_cache
+
+OVERLAP_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'overlap_search.db')
+WINDOW_SIZE = 4
+WINDOW_STRIDE = 2
+METHOD = 'overlap-window'
+LEGACY_SWEPT = 1  # user_version once pre-window_videos rows have been swept
+
+
+def transcript_hash(transcript):
+    digest = hashlib.sha1()
+    for segment in transcript:
+        start, _ = segment_ms(segment)
+        digest.update(f"{start}\t{segment.get('text') or ''}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def build_windows(transcript, size=WINDOW_SIZE, stride=WINDOW_STRIDE):
+    """Yield (window_text, start_time, end_time, segment_count), times in seconds"""
+    segments = []
+    for segment in transcript:
+        text = ' '.join((segment.get('text') or '').split())
+        if text:
+            start, duration = segment_ms(segment)
+            segments.append((start, start + duration, text))
+
+    seen = set()
+    for first in range(0, len(segments), stride):
+        window = segments[first:first + size]
+        text = ' '.join(s[2] for s in window)
+        key = text.lower()
+        if key not in seen:  # repeated "[Music]" / "[Applause]" runs
+            seen.add(key)
+            end = max(s[1] for s in window)
+            yield text, window[0][0] / 1000, end / 1000, len(window)
+        if first + size >= len(segments):
+            break
+
+
+class WindowIndex:
+    """overlap_search.db writer, one transaction per video"""
+
+    def __init__(self, db_path=OVERLAP_DB, size=WINDOW_SIZE, stride=WINDOW_STRIDE):
+        self.size = size
+        self.stride = stride
+        self.db = sqlite3.connect(db_path)
+        with self.db:
+            self.db.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS window_search USING fts5(
+                    video_id,
+                    video_title,
+                    window_text,
+                    start_time,
+                    end_time,
+                    segment_count,
+                    method,
+                    tokenize = 'porter ascii'
+                )
+            ''')
+            self.db.execute('''
+                CREATE TABLE IF NOT EXISTS window_videos (
+                    video_id TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    first_rowid INTEGER,
+                    last_rowid INTEGER,
+                    windows INTEGER NOT NULL,
+                    updated_at INTEGER NOT NULL
+                )
+            ''')
+
+    def _delete(self, video_id):
+        row = self.db.execute(
+            'SELECT first_rowid, last_rowid FROM window_videos WHERE video_id = ?', (video_id,)
+        ).fetchone()
+        if row and row[0] is not None:
+            self.db.execute('DELETE FROM window_search WHERE rowid BETWEEN ? AND ?', row)
+        elif not row:
+            # rows written before window_videos existed
+            self.db.execute('DELETE FROM window_search WHERE video_id IS ?', (video_id,))
+        self.db.execute('DELETE FROM window_videos WHERE video_id = ?', (video_id,))
+
+    def update_video(self, video_id, title, transcript):
+        """Rewrite one video's windows if its transcript changed, returns windows written or None"""
+        content_hash = transcript_hash(transcript)
+        row = self.db.execute(
+            'SELECT content_hash FROM window_videos WHERE video_id = ?', (video_id,)
+        ).fetchone()
+        if row and row[0] == content_hash:
+            return None
+
+        with self.db:
+            self._delete(video_id)
+            first_rowid = last_rowid = None
+            count = 0
+            for text, start, end, segment_count in build_windows(transcript, self.size, self.stride):
+                cursor = self.db.execute(
+                    'INSERT INTO window_search '
+                    '(video_id, video_title, window_text, start_time, end_time, segment_count, method) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (video_id, title, text, start, end, segment_count, METHOD)
+                )
+                last_rowid = cursor.lastrowid
+                if first_rowid is None:
+                    first_rowid = last_rowid
+                count += 1
+            self.db.execute(
+                'INSERT INTO window_videos VALUES (?, ?, ?, ?, ?, ?)',
+                (video_id, content_hash, first_rowid, last_rowid, count, int(time.time()))
+            )
+        return count
+
+    def remove_video(self, video_id):
+        with self.db:
+            self._delete(video_id)
+
+    def sync_cache_dir(self, cache_dir=CACHE_DIR):
+        """Bring the index in line with the transcript store, returns a summary dict"""
+        summary = {'videos': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'windows': 0}
+        present = set()
+        for video_id, title, _, transcript in iter_cache(cache_dir):
+            present.add(video_id)
+            summary['videos'] += 1
+            count = self.update_video(video_id, title, transcript)
+            if count is None:
+                summary['unchanged'] += 1
+            else:
+                summary['updated'] += 1
+                summary['windows'] += count
+
+        indexed = {row[0] for row in self.db.execute('SELECT video_id FROM window_videos')}
+        legacy = self.db.execute('PRAGMA user_version').fetchone()[0] < LEGACY_SWEPT
+        if legacy:
+            # windows written before window_videos existed: one full scan, never again
+            indexed |= {row[0] for row in self.db.execute('SELECT DISTINCT video_id FROM window_search')}
+        for video_id in indexed - present:
+            self.remove_video(video_id)
+            summary['removed'] += 1
+        if legacy:
+            self.db.execute(f'PRAGMA user_version = {LEGACY_SWEPT}')
+        return summary
+
+    def close(self):
+        self.db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Update overlap_search.db from the transcript store')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--db', default=OVERLAP_DB)
+    args = parser.parse_args()
+
+    started = time.time()
+    index = WindowIndex(args.db)
+    try:
+        summary = index.sync_cache_dir(args.cache_dir)
+    finally:
+        index.close()
+    summary['time_ms'] = int((time.time() - started) * 1000)
+    print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
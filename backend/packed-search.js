@@ -0,0 +1,187 @@
+const fs = require('fs');
+const path = require('path');
+const { CorpusPack } = require('./corpus-pack');
+const { PhraseIndex } = require('./phrase-index');
+const { LemmaIndex } = require('./lemma-index');
+const { TrigramIndex } = require('./trigram-index');
+const { SuggestIndex } = require('./suggest-index');
+
+const LEMMA_SIMILARITY = 0.8; // 원형만 같은 매치는 정확한 구문 (0.9) 보다 아래
+
+/**
+ * transcript-cache 의 corpus.pack + 검색 인덱스 묶음
+ * api/search.js (서버리스) 와 server.js 가 같은 검색 로직을 사용
+ */
+class PackedSearch {
+  constructor(cacheDir) {
+    this.cacheDir = cacheDir;
+    this.corpus = new CorpusPack(path.join(cacheDir, 'corpus.pack'));
+    this.phraseIndex = this.loadIndex('phrase_index.pack', PhraseIndex);
+    this.lemmaIndex = this.loadIndex('lemma_index.pack', LemmaIndex);
+    this.trigramIndex = this.phraseIndex && this.loadIndex('trigram_index.pack', TrigramIndex);
+    this.suggestIndex = this.loadIndex('suggest_index.pack', SuggestIndex);
+  }
+
+  /**
+   * corpus.pack 이 없으면 null
+   */
+  static load(cacheDir) {
+    if (!fs.existsSync(path.join(cacheDir, 'corpus.pack'))) {
+      return null;
+    }
+    return new PackedSearch(cacheDir);
+  }
+
+  /**
+   * 같은 corpus.pack 으로 만든 인덱스만 사용 (없거나 오래됐으면 null)
+   */
+  loadIndex(fileName, IndexClass) {
+    const indexPath = path.join(this.cacheDir, fileName);
+    if (!fs.existsSync(indexPath)) {
+      return null;
+    }
+    try {
+      const index = new IndexClass(indexPath);
+      if (index.meta.corpus_built_at !== this.corpus.meta.built_at) {
+        console.log(`⚠️ ${fileName} is older than corpus.pack, ignoring`);
+        return null;
+      }
+      return index;
+    } catch (error) {
+      console.log(`⚠️ ${fileName} loading failed: ${error.message}`);
+      return null;
+    }
+  }
+
+  /**
+   * 정확한 구문 검색 (인덱스가 없으면 빈 배열)
+   */
+  findPhrase(query, limit = 10) {
+    if (!this.phraseIndex) return [];
+    return this.indexResults(this.phraseIndex, query, limit, 'phrase-index');
+  }
+
+  /**
+   * 원형 검색: "went shopping" 이 "go shop", "going shopping" 도 찾음 (인덱스가 없으면 빈 배열)
+   */
+  findLemma(query, limit = 10) {
+    if (!this.lemmaIndex) return [];
+    return this.indexResults(this.lemmaIndex, query, limit, 'lemma-index');
+  }
+
+  /**
+   * 정확한 구문 먼저, 남는 자리는 원형 검색 결과로 채움 (둘 다 미리 계산된 인덱스)
+   * 원형 결과는 정확한 매치와 겹치는 세그먼트를 빼고 similarity 를 낮춰 뒤에 붙임
+   */
+  findIndexed(query, limit = 10) {
+    const phraseResults = this.findPhrase(query, limit);
+    if (phraseResults.length >= limit) {
+      return phraseResults;
+    }
+    const seen = new Set(phraseResults.map(result => `${result.videoId}:${result.startMs}`));
+    const lemmaResults = this.findLemma(query, limit + phraseResults.length)
+      .filter(result => !seen.has(`${result.videoId}:${result.startMs}`))
+      .slice(0, limit - phraseResults.length)
+      .map(result => ({ ...result, similarity: LEMMA_SIMILARITY }));
+    return phraseResults.concat(lemmaResults);
+  }
+
+  /**
+   * 오타 허용 검색: 코퍼스에 없는 단어를 trigram 색인으로 교정한 뒤 구문 / 원형 검색
+   * ("went shoping" → "went shopping"), 결과에 correctedQuery 포함 (인덱스가 없으면 빈 배열)
+   */
+  findFuzzy(query, limit = 10) {
+    if (!this.trigramIndex) return [];
+    const known = term => this.phraseIndex.termId(term) !== -1;
+    for (const corrected of this.trigramIndex.alternatives(query, known)) {
+      let results = this.indexResults(this.phraseIndex, corrected, limit, 'fuzzy-index');
+      if (results.length === 0 && this.lemmaIndex) {
+        results = this.indexResults(this.lemmaIndex, corrected, limit, 'fuzzy-index');
+      }
+      if (results.length > 0) {
+        return results.map(result => ({ ...result, searchQuery: query, correctedQuery: corrected }));
+      }
+    }
+    return [];
+  }
+
+  /**
+   * 입력 중인 검색어의 자동완성 구문 [{ phrase, count }] (인덱스가 없으면 빈 배열)
+   */
+  suggest(prefix, limit = 10) {
+    if (!this.suggestIndex) return [];
+    return this.suggestIndex.suggest(prefix, limit);
+  }
+
+  /**
+   * 인덱스 검색 우선, 결과가 없으면 부분 문자열 검색, 그래도 없으면 오타 교정 검색
+   */
+  search(query, limit = 10) {
+    const indexedResults = this.findIndexed(query, limit);
+    if (indexedResults.length > 0) {
+      return indexedResults;
+    }
+    const substringResults = this.corpus.findMatches(query, limit).map(match =>
+      this.toResult(match.segment, query, 'cached-pack', [[match.start, match.end]])
+    );
+    if (substringResults.length > 0) {
+      return substringResults;
+    }
+    return this.findFuzzy(query, limit);
+  }
+
+  indexResults(index, query, limit, method) {
+    return index.findMatches(query, limit).map(match => {
+      const text = this.corpus.texts.get(match.segment);
+      return this.toResult(match.segment, query, method, index.highlights(match, text), text);
+    });
+  }
+
+  /**
+   * 검색 결과 하나: 세그먼트 + 미리 계산된 앞뒤 맥락 + 매치 문자 범위
+   * highlights 는 transcript 기준, contextualText 안에서는 contextOffset 만큼 뒤
+   */
+  toResult(index, query, method, highlights = [], text = this.corpus.texts.get(index)) {
+    const video = this.corpus.video(this.corpus.videoOf(index));
+    const startMs = this.corpus.startMs[index];
+    return {
+      videoId: video.id,
+      title: video.title,
+      startTime: Math.floor(startMs / 1000),
+      startMs,
+      transcript: text,
+      ...this.contextOf(index, text),
+      highlights,
+      similarity: 0.9,
+      searchQuery: query,
+      method
+    };
+  }
+
+  contextOf(index, text = this.corpus.texts.get(index)) {
+    const { before, after } = this.corpus.context(index);
+    const contextOffset = before ? before.length + 1 : 0;
+    return {
+      contextualText: [before, text, after].filter(Boolean).join(' '),
+      contextOffset
+    };
+  }
+
+  /**
+   * 다른 검색 (FastSearch 등) 결과에 붙일 맥락, corpus.pack 에 없는 영상이면 {}
+   */
+  contextFor(videoId, startMs) {
+    const index = this.corpus.segmentAt(videoId, startMs);
+    return index === -1 ? {} : this.contextOf(index);
+  }
+
+  get videoCount() {
+    return this.corpus.videoCount;
+  }
+
+  get segmentCount() {
+    return this.corpus.segmentCount;
+  }
+}
+
+module.exports = { PackedSearch };
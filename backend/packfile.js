@@ -0,0 +1,132 @@
+const fs = require('fs');
+
+/**
+ * packfile.py 로 만든 pack 파일 리더
+ * 섹션을 JSON.parse 없이 Buffer 위의 typed array / 문자열 테이블로 바로 사용
+ */
+const MAGIC = 'LTWPACK1';
+const KIND = { U32: 1, STRINGS: 2, JSON: 3 };
+const HEADER_SIZE = 12;
+const ENTRY_SIZE = 36;
+
+/**
+ * Buffer 일부를 Uint32Array로 보기 (정렬이 맞으면 복사 없음)
+ */
+function u32View(buffer, offset, count) {
+  const byteOffset = buffer.byteOffset + offset;
+  if (byteOffset % 4 === 0) {
+    return new Uint32Array(buffer.buffer, byteOffset, count);
+  }
+  const copy = new Uint32Array(count);
+  for (let i = 0; i < count; i++) {
+    copy[i] = buffer.readUInt32LE(offset + i * 4);
+  }
+  return copy;
+}
+
+/**
+ * STRINGS 섹션: uint32 count, uint32 offsets[count + 1], UTF-8 bytes
+ */
+class StringTable {
+  constructor(buffer, offset) {
+    this.buffer = buffer;
+    this.count = buffer.readUInt32LE(offset);
+    this.offsets = u32View(buffer, offset + 4, this.count + 1);
+    this.dataStart = offset + 4 + 4 * (this.count + 1);
+    this.dataEnd = this.dataStart + this.offsets[this.count];
+  }
+
+  get length() {
+    return this.count;
+  }
+
+  get(i) {
+    return this.buffer.toString('utf8', this.dataStart + this.offsets[i], this.dataStart + this.offsets[i + 1]);
+  }
+
+  /**
+   * 모든 문자열이 이어 붙은 UTF-8 영역 (복사 없음)
+   */
+  data() {
+    return this.buffer.subarray(this.dataStart, this.dataEnd);
+  }
+
+  /**
+   * data() 안의 바이트 위치가 속한 문자열 번호 (이진 탐색)
+   */
+  indexAt(byteOffset) {
+    let low = 0;
+    let high = this.count - 1;
+    while (low < high) {
+      const mid = (low + high + 1) >> 1;
+      if (this.offsets[mid] <= byteOffset) {
+        low = mid;
+      } else {
+        high = mid - 1;
+      }
+    }
+    return low;
+  }
+
+  toArray() {
+    const values = new Array(this.count);
+    for (let i = 0; i < this.count; i++) {
+      values[i] = this.get(i);
+    }
+    return values;
+  }
+}
+
+class PackFile {
+  constructor(filePath) {
+    this.path = filePath;
+    this.buffer = fs.readFileSync(filePath);
+
+    if (this.buffer.toString('ascii', 0, 8) !== MAGIC) {
+      throw new Error(`${filePath} is not a pack file`);
+    }
+
+    this.sections = new Map();
+    const count = this.buffer.readUInt32LE(8);
+    for (let i = 0; i < count; i++) {
+      const entry = HEADER_SIZE + i * ENTRY_SIZE;
+      const name = this.buffer.toString('ascii', entry, entry + 24).replace(/\0+$/, '');
+      this.sections.set(name, {
+        kind: this.buffer.readUInt32LE(entry + 24),
+        offset: this.buffer.readUInt32LE(entry + 28),
+        length: this.buffer.readUInt32LE(entry + 32)
+      });
+    }
+  }
+
+  has(name) {
+    return this.sections.has(name);
+  }
+
+  section(name, kind) {
+    const section = this.sections.get(name);
+    if (!section) {
+      throw new Error(`Missing section: ${name}`);
+    }
+    if (section.kind !== kind) {
+      throw new Error(`Section ${name} has kind ${section.kind}, expected ${kind}`);
+    }
+    return section;
+  }
+
+  u32(name) {
+    const { offset, length } = this.section(name, KIND.U32);
+    return u32View(this.buffer, offset, length / 4);
+  }
+
+  strings(name) {
+    return new StringTable(this.buffer, this.section(name, KIND.STRINGS).offset);
+  }
+
+  json(name) {
+    const { offset, length } = this.section(name, KIND.JSON);
+    return JSON.parse(this.buffer.toString('utf8', offset, offset + length));
+  }
+}
+
+module.exports = { PackFile, StringTable, KIND };
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Packed binary container shared by the corpus and index builders
+A small section table followed by 8-byte aligned payloads that readers can
+memory-map and view in place (see packfile.js for the Node side).
+
+Layout (little-endian):
+    magic          8 bytes  b'LTWPACK1'
+    section_count  uint32
+    sections       section_count x (name: 24 bytes NUL-padded ASCII,
+                                    kind: uint32, offset: uint32, length: uint32)
+    payloads       each starting on an 8-byte boundary
+
+Section kinds:
+    U32      array of uint32
+    STRINGS  uint32 count, uint32 offsets[count + 1], UTF-8 bytes
+    JSON     UTF-8 JSON document (small metadata only)
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b'LTWPACK1'
+U32 = 1
+STRINGS = 2
+JSON = 3
+
+_HEADER = struct.Struct('<8sI')
+_ENTRY = struct.Struct('<24sIII')
+
+if array('I').itemsize != 4 or sys.byteorder != 'little':
+    raise ImportError('packfile needs little-endian 4-byte unsigned ints')
+
+
+def _pad(length):
+    return (8 - length % 8) % 8
+
+
+def encode_strings(strings):
+    """STRINGS payload for a list of str"""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = array('I', [0])
+    total = 0
+    for data in encoded:
+        total += len(data)
+        offsets.append(total)
+    return struct.pack('<I', len(encoded)) + offsets.tobytes() + b''.join(encoded)
+
+
+def encode_section(kind, value):
+    if kind == U32:
+        return (value if isinstance(value, array) else array('I', value)).tobytes()
+    if kind == STRINGS:
+        return encode_strings(value)
+    if kind == JSON:
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    raise ValueError(f'Unknown section kind: {kind}')
+
+
+def write_pack(path, sections):
+    """Write {name: (kind, value)} to path atomically"""
+    payloads = [(name, kind, encode_section(kind, value)) for name, (kind, value) in sections.items()]
+
+    header_size = _HEADER.size + _ENTRY.size * len(payloads)
+    offset = header_size + _pad(header_size)
+    entries = []
+    for name, kind, data in payloads:
+        if len(name) > 24:
+            raise ValueError(f'Section name too long: {name}')
+        entries.append(_ENTRY.pack(name.encode('ascii'), kind, offset, len(data)))
+        offset += len(data) + _pad(len(data))
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, len(payloads)))
+        f.write(b''.join(entries))
+        f.write(b'\0' * _pad(header_size))
+        for _, _, data in payloads:
+            f.write(data)
+            f.write(b'\0' * _pad(len(data)))
+    os.replace(tmp_path, path)
+
+
+class StringTable:
+    """Read-only view over a STRINGS section"""
+
+    def __init__(self, view):
+        self.count = struct.unpack_from('<I', view, 0)[0]
+        self.offsets = view[4:4 + 4 * (self.count + 1)].cast('I')
+        self.data = view[4 + 4 * (self.count + 1):]
+
+    def __len__(self):
+        return self.count
+
+    def raw(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]]
+
+    def __getitem__(self, i):
+        return str(self.raw(i), 'utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(self.count))
+
+
+class PackFile:
+    """Memory-mapped reader; sections are zero-copy memoryviews"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+
+        magic, count = _HEADER.unpack_from(self.view, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a pack file')
+        self.sections = {}
+        for i in range(count):
+            name, kind, offset, length = _ENTRY.unpack_from(self.view, _HEADER.size + i * _ENTRY.size)
+            self.sections[name.rstrip(b'\0').decode('ascii')] = (kind, offset, length)
+
+    def __contains__(self, name):
+        return name in self.sections
+
+    def _section(self, name, expected_kind):
+        kind, offset, length = self.sections[name]
+        if kind != expected_kind:
+            raise ValueError(f'Section {name} has kind {kind}, expected {expected_kind}')
+        return self.view[offset:offset + length]
+
+    def u32(self, name):
+        return self._section(name, U32).cast('I')
+
+    def strings(self, name):
+        return StringTable(self._section(name, STRINGS))
+
+    def json(self, name):
+        return json.loads(bytes(self._section(name, JSON)))
+
+    def close(self):
+        try:
+            self.view.release()
+            self.map.close()
+        except BufferError:
+            pass  # section views still alive, the map closes with them
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
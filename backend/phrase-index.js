@@ -0,0 +1,166 @@
+const { PackFile } = require('./packfile');
+const { fold } = require('./corpus-pack');
+
+/**
+ * phrase_index.py 가 만든 위치 기반 역색인 로더
+ * 영상별 토큰 스트림 위의 위치로 정확한 구문(세그먼트 경계를 넘는 것 포함)을 찾음
+ */
+const TOKEN_RE = /[\p{L}\p{N}]+(?:'[\p{L}\p{N}]+)*/gu;
+
+// 화면 표시용 원문의 단어 (fold 전이라 ’ 와 결합 문자도 단어에 포함, 단어 수는 tokenize() 와 같음)
+const DISPLAY_TOKEN_RE = /[\p{L}\p{N}\p{M}]+(?:['’][\p{L}\p{N}\p{M}]+)*/gu;
+
+/**
+ * fold() 한 단어 토큰 (phrase_index.py 의 tokenize() 와 동일하게 유지)
+ */
+function tokenize(text) {
+  return fold(text).match(TOKEN_RE) || [];
+}
+
+/**
+ * 원문 text 에서 first 번째 단어부터 count 개 단어의 문자 범위 [start, end], 없으면 null
+ * (세그먼트 끝을 넘는 구문은 세그먼트 끝까지)
+ */
+function tokenRange(text, first, count) {
+  let i = 0;
+  let start = -1;
+  let end = -1;
+  for (const match of text.matchAll(DISPLAY_TOKEN_RE)) {
+    if (i === first) start = match.index;
+    if (i >= first) end = match.index + match[0].length;
+    if (++i >= first + count) break;
+  }
+  return start === -1 ? null : [start, end];
+}
+
+/**
+ * 정렬된 Uint32Array에서 value 이상인 첫 위치
+ */
+function lowerBound(array, value) {
+  let low = 0;
+  let high = array.length;
+  while (low < high) {
+    const mid = (low + high) >> 1;
+    if (array[mid] < value) {
+      low = mid + 1;
+    } else {
+      high = mid;
+    }
+  }
+  return low;
+}
+
+function contains(array, value) {
+  const i = lowerBound(array, value);
+  return i < array.length && array[i] === value;
+}
+
+/**
+ * UTF-8 바이트 순으로 정렬된 StringTable 이진 탐색, 없으면 -1
+ */
+function findString(table, value) {
+  const key = Buffer.from(value, 'utf8');
+  const { buffer, dataStart, offsets } = table;
+  let low = 0;
+  let high = table.length;
+  while (low < high) {
+    const mid = (low + high) >> 1;
+    const cmp = buffer.compare(key, 0, key.length, dataStart + offsets[mid], dataStart + offsets[mid + 1]);
+    if (cmp < 0) {
+      low = mid + 1;
+    } else {
+      high = mid;
+    }
+  }
+  if (low < table.length && table.get(low) === value) {
+    return low;
+  }
+  return -1;
+}
+
+class PhraseIndex {
+  constructor(filePath) {
+    const pack = new PackFile(filePath);
+    this.pack = pack;
+    this.meta = pack.json('meta');
+    this.terms = pack.strings('terms');
+    this.termOffsets = pack.u32('term_offsets');
+    this.postings = pack.u32('postings');
+    this.segmentFirstToken = pack.u32('segment_first_token');
+  }
+
+  /**
+   * 정렬된 단어 테이블 이진 탐색, 없으면 -1
+   */
+  termId(term) {
+    return findString(this.terms, term);
+  }
+
+  queryTerms(query) {
+    return tokenize(query);
+  }
+
+  positions(termId) {
+    return this.postings.subarray(this.termOffsets[termId], this.termOffsets[termId + 1]);
+  }
+
+  segmentOf(position) {
+    return lowerBound(this.segmentFirstToken, position + 1) - 1;
+  }
+
+  /**
+   * 구문이 시작되는 세그먼트와 그 안의 시작 위치들
+   * [{ segment, positions, length }] (corpus.pack 순서, length 는 단어 수)
+   */
+  findMatches(query, limit = 10) {
+    const ids = this.queryTerms(query).map(term => this.termId(term));
+    const matches = [];
+    if (ids.length === 0 || ids.includes(-1)) return matches;
+
+    // 가장 드문 단어의 위치만 훑고 나머지는 이진 탐색으로 확인
+    const lists = ids.map(id => this.positions(id));
+    let anchor = 0;
+    lists.forEach((list, i) => {
+      if (list.length < lists[anchor].length) anchor = i;
+    });
+
+    for (const position of lists[anchor]) {
+      const start = position - anchor;
+      if (start < 0) continue;
+      let matched = true;
+      for (let i = 0; i < lists.length && matched; i++) {
+        matched = i === anchor || contains(lists[i], start + i);
+      }
+      if (!matched) continue;
+
+      const segment = this.segmentOf(start);
+      const last = matches[matches.length - 1];
+      if (last && last.segment === segment) {
+        last.positions.push(start);
+      } else {
+        if (matches.length >= limit) break;
+        matches.push({ segment, positions: [start], length: ids.length });
+      }
+    }
+    return matches;
+  }
+
+  /**
+   * 구문이 시작되는 세그먼트 번호 배열 (corpus.pack 순서)
+   */
+  findPhrase(query, limit = 10) {
+    return this.findMatches(query, limit).map(match => match.segment);
+  }
+
+  /**
+   * findMatches() 결과 하나의 원문 문자 범위 [[start, end], ...]
+   */
+  highlights(match, text) {
+    const first = this.segmentFirstToken[match.segment];
+    return match.positions
+      .map(position => tokenRange(text, position - first, match.length))
+      .filter(range => range !== null);
+  }
+}
+
+module.exports = { PhraseIndex, tokenize, tokenRange, findString };
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Positional phrase index over corpus.pack
+Every video's segments are read as one token stream, and each term maps to
+the sorted stream positions where it occurs. An exact phrase is then a few
+binary searches, and phrases that run across caption segment boundaries
+still match. Each hit resolves to the segment holding its first word
+(see phrase-index.js for the Node loader).
+
+Layout (packfile sections):
+    meta                 JSON   version, counts, corpus_built_at
+    terms                STRINGS  sorted by UTF-8 bytes
+    term_offsets         U32    [terms + 1] slice of postings per term
+    postings             U32    token positions, ascending per term
+    segment_first_token  U32    [segments + 1] first position of each segment
+
+Positions skip one slot after every video so no phrase spans two videos.
+
+Usage:
+    python phrase_index.py [--cache-dir DIR] [--corpus FILE] [--out FILE]
+    python phrase_index.py --query "the easiest job in the world"
+"""
+
+import argparse
+import bisect
+import json
+import os
+import re
+import time
+from array import array
+
+from caption_normalize import fold
+from corpus_pack import CACHE_DIR, CORPUS_FILE, Corpus
+from packfile import JSON, STRINGS, U32, PackFile, write_pack
+
+INDEX_FILE = 'phrase_index.pack'
+INDEX_VERSION = 2
+
+TOKEN_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+
+
+def tokenize(text):
+    """Folded word tokens; keep in sync with tokenize() in phrase-index.js"""
+    return TOKEN_RE.findall(fold(text))
+
+
+def collect_postings(corpus, term_of=None):
+    """({term: positions}, segment_first_token) over the whole corpus token stream
+
+    term_of maps each folded token to the term it is indexed under (the
+    lemma index passes its lemmatizer); by default a token is its own term.
+    """
+    postings = {}
+    segment_first_token = array('I')
+    position = 0
+
+    for v in range(len(corpus)):
+        for s in corpus.segment_range(v):
+            segment_first_token.append(position)
+            for token in TOKEN_RE.findall(corpus.search_text(s)):
+                term = term_of(token) if term_of else token
+                positions = postings.get(term)
+                if positions is None:
+                    positions = postings[term] = array('I')
+                positions.append(position)
+                position += 1
+        position += 1  # gap between videos
+    segment_first_token.append(position)
+    return postings, segment_first_token
+
+
+def postings_sections(postings, segment_first_token):
+    """terms / term_offsets / postings / segment_first_token pack sections"""
+    terms = sorted(postings, key=lambda term: term.encode('utf-8'))
+    term_offsets = array('I', [0])
+    flat = array('I')
+    for term in terms:
+        flat.extend(postings[term])
+        term_offsets.append(len(flat))
+    return {
+        'terms': (STRINGS, terms),
+        'term_offsets': (U32, term_offsets),
+        'postings': (U32, flat),
+        'segment_first_token': (U32, segment_first_token)
+    }
+
+
+def build_phrase_index(corpus_path, out_path):
+    """Index every segment of corpus.pack, returns the meta dict"""
+    corpus = Corpus(corpus_path)
+    try:
+        sections = postings_sections(*collect_postings(corpus))
+        meta = {
+            'version': INDEX_VERSION,
+            'terms': len(sections['terms'][1]),
+            'tokens': len(sections['postings'][1]),
+            'segments': len(sections['segment_first_token'][1]) - 1,
+            'corpus_built_at': corpus.meta['built_at'],
+            'built_at': int(time.time())
+        }
+    finally:
+        corpus.close()
+
+    write_pack(out_path, {'meta': (JSON, meta), **sections})
+    return meta
+
+
+def index_cache_dir(cache_dir=CACHE_DIR, out_path=None):
+    return build_phrase_index(
+        os.path.join(cache_dir, CORPUS_FILE),
+        out_path or os.path.join(cache_dir, INDEX_FILE)
+    )
+
+
+class PhraseIndex:
+    """Memory-mapped phrase_index.pack reader"""
+
+    def __init__(self, path):
+        self.pack = PackFile(path)
+        self.meta = self.pack.json('meta')
+        self.terms = self.pack.strings('terms')
+        self.term_offsets = self.pack.u32('term_offsets')
+        self.postings = self.pack.u32('postings')
+        self.segment_first_token = self.pack.u32('segment_first_token')
+
+    def term_id(self, term):
+        """Binary search the sorted term table, None if absent"""
+        return find_string(self.terms, term)
+
+    def positions(self, term_id):
+        return self.postings[self.term_offsets[term_id]:self.term_offsets[term_id + 1]]
+
+    def segment_of(self, position):
+        return bisect.bisect_right(self.segment_first_token, position) - 1
+
+    def query_terms(self, phrase):
+        return tokenize(phrase)
+
+    def find(self, phrase, limit=10):
+        """Segment numbers (corpus.pack order) where the phrase starts"""
+        ids = [self.term_id(term) for term in self.query_terms(phrase)]
+        if not ids or None in ids:
+            return []
+
+        lists = [self.positions(term_id) for term_id in ids]
+        anchor = min(range(len(lists)), key=lambda i: len(lists[i]))
+        segments = []
+        for position in lists[anchor]:
+            start = position - anchor
+            if start < 0 or not all(
+                _contains(lists[i], start + i) for i in range(len(lists)) if i != anchor
+            ):
+                continue
+            segment = self.segment_of(start)
+            if not segments or segments[-1] != segment:
+                segments.append(segment)
+                if len(segments) >= limit:
+                    break
+        return segments
+
+    def close(self):
+        self.pack.close()
+
+
+def find_string(table, value):
+    """Index of value in a StringTable sorted by UTF-8 bytes, None if absent"""
+    key = value.encode('utf-8')
+    low, high = 0, len(table)
+    while low < high:
+        mid = (low + high) // 2
+        if bytes(table.raw(mid)) < key:
+            low = mid + 1
+        else:
+            high = mid
+    if low < len(table) and bytes(table.raw(low)) == key:
+        return low
+    return None
+
+
+def _contains(positions, value):
+    i = bisect.bisect_left(positions, value)
+    return i < len(positions) and positions[i] == value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the positional phrase index')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--corpus', help=f'corpus file (default: <cache-dir>/{CORPUS_FILE})')
+    parser.add_argument('--out', help=f'output file (default: <cache-dir>/{INDEX_FILE})')
+    parser.add_argument('--query', help='look up a phrase in an existing index instead')
+    args = parser.parse_args()
+
+    corpus_path = args.corpus or os.path.join(args.cache_dir, CORPUS_FILE)
+    index_path = args.out or os.path.join(args.cache_dir, INDEX_FILE)
+
+    started = time.time()
+    if args.query:
+        index, corpus = PhraseIndex(index_path), Corpus(corpus_path)
+        hits = []
+        for segment in index.find(args.query):
+            video = bisect.bisect_right(corpus.first_segment, segment) - 1
+            hits.append({
+                'video_id': corpus.video_ids[video],
+                'start_ms': corpus.start_ms[segment],
+                'text': corpus.texts[segment]
+            })
+        print(json.dumps({'query': args.query, 'hits': hits,
+                          'time_ms': round((time.time() - started) * 1000, 3)}, ensure_ascii=False))
+        return
+
+    meta = build_phrase_index(corpus_path, index_path)
+    meta['time_ms'] = int((time.time() - started) * 1000)
+    print(json.dumps(meta))
+
+
+if __name__ == '__main__':
+    main()
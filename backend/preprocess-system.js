@@ -1,11 +1,8 @@
 const { LazyTranscriptSystem } = require('./lazy-transcript-system');
-const { PythonYouTubeBridge } = require('./python-youtube-bridge');
 
 class PreprocessedTranscriptSystem {
   constructor() {
     this.lazySystem = new LazyTranscriptSystem();
-    this.pythonBridge = new PythonYouTubeBridge();
-    this.processedVideos = new Map();
     this.isReady = false;
   }
 
@@ -13,7 +10,7 @@ class PreprocessedTranscriptSystem {
     console.log('🚀 Starting FAST search system with preprocessing...\n');
     
     // Wait for lazy system to initialize
-    await new Promise(resolve => setTimeout(resolve, 2000));
+    await this.lazySystem.ready;
     
     const stats = await this.lazySystem.getStats();
     console.log(`📊 Found ${stats.totalVideos} videos in database`);
@@ -37,56 +34,25 @@ class PreprocessedTranscriptSystem {
   async preprocessAllVideos() {
     // Get all videos that need processing
     const unprocessedVideos = await this.lazySystem.db.all(`
-      SELECT * FROM videos 
+      SELECT id FROM videos 
       WHERE transcript_processed = FALSE 
       AND processing_attempts < 3
       ORDER BY category, title
     `);
 
-    console.log(`🎬 Processing ${unprocessedVideos.length} videos...`);
-    
-    let processed = 0;
-    let failed = 0;
-    
-    for (let i = 0; i < unprocessedVideos.length; i++) {
-      const video = unprocessedVideos[i];
-      const progress = `(${i + 1}/${unprocessedVideos.length})`;
-      
-      try {
-        console.log(`${progress} 🎬 Processing: "${video.title}"`);
-        
-        const result = await this.pythonBridge.extractRealTranscript(video.id);
-        
-        if (result.success) {
-          await this.lazySystem.saveTranscriptToDatabase(video.id, result.data);
-          await this.lazySystem.updateVideoProcessingStatus(video.id, true);
-          
-          this.processedVideos.set(video.id, {
-            title: video.title,
-            segments: result.data.length
-          });
-          
-          processed++;
-          console.log(`✅ ${progress} SUCCESS: ${result.data.length} segments extracted`);
-        } else {
-          await this.lazySystem.updateVideoProcessingStatus(video.id, false);
-          failed++;
-          console.log(`❌ ${progress} FAILED: ${result.error}`);
-        }
-        
-        // Rate limiting to be nice to YouTube
-        await new Promise(resolve => setTimeout(resolve, 1000));
-        
-      } catch (error) {
-        await this.lazySystem.updateVideoProcessingStatus(video.id, false);
-        failed++;
-        console.log(`❌ ${progress} ERROR: ${error.message}`);
-      }
-    }
+    // Backfill priority: videos queued by searches still go first
+    const queue = this.lazySystem.queue;
+    await queue.enqueue(unprocessedVideos.map(video => video.id));
+    console.log(`🎬 Processing ${unprocessedVideos.length} videos with ${queue.concurrency} workers...`);
+
+    const progress = await queue.drain(({ queued, running, done, failed, perMinute, etaMinutes }) => {
+      console.log(`   ⏳ queued ${queued}, running ${running}, done ${done}, failed ${failed}` +
+        (etaMinutes !== null ? ` (${perMinute}/min, ~${etaMinutes} min left)` : ''));
+    });
     
     console.log(`\n📊 Preprocessing complete:`);
-    console.log(`   ✅ Successfully processed: ${processed} videos`);
-    console.log(`   ❌ Failed: ${failed} videos`);
+    console.log(`   ✅ Successfully processed: ${progress.session.done} videos`);
+    console.log(`   ❌ Failed: ${progress.session.failed} videos`);
     console.log(`   🚀 Total ready for instant search: ${await this.getProcessedVideoCount()}`);
   }
 
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Tor SOCKS proxy pool
+Keep-alive sessions per circuit, health scores and circuit rotation on blocks.
+
+Tor isolates streams by SOCKS credentials (IsolateSOCKSAuth is on by default),
+so one Tor port already gives us N independent exit circuits: each endpoint
+just uses its own random username/password. Rotating an endpoint swaps its
+credentials, which moves it onto a fresh circuit.
+"""
+
+import secrets
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from extract_transcript import create_api, is_blocked
+from metrics import default_metrics
+
+TOR_HOST = '127.0.0.1'
+TOR_SOCKS_PORT = 9150  # Tor Browser (tor daemon uses 9050)
+TOR_CONTROL_PORT = 9151  # Tor Browser (tor daemon uses 9051)
+
+
+class ProxyEndpoint:
+    """One isolated Tor circuit with its own keep-alive session"""
+
+    def __init__(self, name, host, port):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.score = 1.0
+        self.latency = None
+        self.successes = 0
+        self.failures = 0
+        self.rotations = 0
+        self.in_use = False
+        self.session = None
+        self._api = None
+        self.rotate()
+
+    @property
+    def proxy_url(self):
+        # socks5h: let Tor resolve DNS so lookups don't leak around the proxy
+        return f'socks5h://{self.name}:{self.credential}@{self.host}:{self.port}'
+
+    @property
+    def proxies(self):
+        return {'http': self.proxy_url, 'https': self.proxy_url}
+
+    @property
+    def api(self):
+        """YouTubeTranscriptApi routed through this endpoint's session"""
+        if self._api is None:
+            self._api = create_api(self.session)
+        return self._api
+
+    def rotate(self):
+        """Move onto a new circuit by changing the isolation credentials"""
+        if self.session is not None:
+            self.session.close()
+            self.rotations += 1
+        self.credential = secrets.token_hex(8)
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.proxies.update(self.proxies)
+        self.session = default_metrics().instrument_session(session)
+        self._api = None
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'score': round(self.score, 3),
+            'latency_ms': round(self.latency * 1000) if self.latency else None,
+            'successes': self.successes,
+            'failures': self.failures,
+            'rotations': self.rotations
+        }
+
+
+class ProxyPool:
+    """Hands out the healthiest idle endpoint to each caller
+
+    Scores are an exponential moving average of outcomes, so an endpoint
+    that keeps getting blocked drifts to the back of the queue even after
+    it has been rotated.
+    """
+
+    def __init__(self, size=4, host=TOR_HOST, port=TOR_SOCKS_PORT,
+                 control_port=None, control_password=None, alpha=0.3):
+        self.endpoints = [ProxyEndpoint(f'pool{i}', host, port) for i in range(size)]
+        self.host = host
+        self.control_port = control_port
+        self.control_password = control_password
+        self.alpha = alpha
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while True:
+                idle = [e for e in self.endpoints if not e.in_use]
+                if idle:
+                    endpoint = max(idle, key=lambda e: e.score)
+                    endpoint.in_use = True
+                    return endpoint
+                self.condition.wait()
+
+    def release(self, endpoint, success, blocked=False, latency=None):
+        metrics = default_metrics()
+        metrics.count('proxy_requests', endpoint=endpoint.name,
+                      result='blocked' if blocked else 'success' if success else 'failure')
+        if latency is not None:
+            metrics.observe('proxy', latency, endpoint=endpoint.name)
+
+        with self.condition:
+            endpoint.score = (1 - self.alpha) * endpoint.score + self.alpha * (1.0 if success else 0.0)
+            if latency is not None:
+                endpoint.latency = latency if endpoint.latency is None else \
+                    (1 - self.alpha) * endpoint.latency + self.alpha * latency
+            if success:
+                endpoint.successes += 1
+            else:
+                endpoint.failures += 1
+            if blocked:
+                endpoint.rotate()
+            endpoint.in_use = False
+            self.condition.notify()
+
+        if blocked and self.control_port:
+            self.new_identity()
+
+    def extract(self, video_id, extract):
+        """Run extract(video_id, api) through the best available endpoint"""
+        endpoint = self.acquire()
+        started = time.monotonic()
+        result = {'success': False}
+        try:
+            result = extract(video_id, endpoint.api)
+            result['proxy'] = endpoint.name
+            return result
+        finally:
+            self.release(endpoint, bool(result.get('success')), is_blocked(result),
+                         time.monotonic() - started)
+
+    def new_identity(self):
+        """Ask Tor for fresh circuits on every stream (rate limited by Tor to ~10s)"""
+        try:
+            with socket.create_connection((self.host, self.control_port), timeout=5) as conn:
+                password = self.control_password or ''
+                conn.sendall(f'AUTHENTICATE "{password}"\r\nSIGNAL NEWNYM\r\nQUIT\r\n'.encode())
+                return b'250' in conn.recv(1024)
+        except OSError:
+            return False
+
+    def stats(self):
+        with self.condition:
+            return [e.stats() for e in self.endpoints]
@@ -1,13 +1,19 @@
-const { exec } = require('child_process');
-const { promisify } = require('util');
+const { spawn } = require('child_process');
+const readline = require('readline');
 const fs = require('fs').promises;
 const path = require('path');
-
-const execAsync = promisify(exec);
+const { TranscriptStore, STORE_DIR } = require('./transcript-store');
+const { tokenize } = require('./phrase-index');
 
 class PythonYouTubeBridge {
   constructor() {
     this.cacheDir = path.join(__dirname, 'transcript-cache');
+    this.pythonCommand = process.env.PYTHON_COMMAND || 'py';
+    this.requestTimeout = 30000; // 30 second timeout per video
+    this.daemon = null;
+    this.queue = []; // 데몬에 아직 쓰지 않은 요청
+    this.pending = new Map(); // 데몬에 쓴 요청 (id → request)
+    this.nextRequestId = 1;
     this.init();
   }
 
@@ -19,11 +25,123 @@ class PythonYouTubeBridge {
     }
   }
 
+  /**
+   * extract_transcript.py --serve 프로세스를 한 번만 띄워서 재사용
+   */
+  startDaemon() {
+    if (this.daemon) return this.daemon;
+
+    const scriptPath = path.join(__dirname, 'extract_transcript.py');
+    const daemon = spawn(this.pythonCommand, [scriptPath, '--serve'], {
+      stdio: ['pipe', 'pipe', 'pipe']
+    });
+
+    readline.createInterface({ input: daemon.stdout }).on('line', (line) => {
+      let result;
+      try {
+        result = JSON.parse(line);
+      } catch (error) {
+        console.log(`⚠️ Unparseable daemon output: ${line}`);
+        return;
+      }
+
+      const request = this.pending.get(result.id);
+      if (request) {
+        clearTimeout(request.timer);
+        this.pending.delete(result.id);
+        delete result.id;
+        request.resolve(result);
+      }
+      this.dispatch();
+    });
+
+    daemon.stderr.on('data', (data) => {
+      console.log(`⚠️ Python stderr: ${data}`);
+    });
+
+    const onExit = (error) => {
+      if (this.daemon !== daemon) return;
+      this.daemon = null;
+      this.rejectPending(error || new Error('Python daemon exited'));
+      if (error) {
+        // 실행 자체가 안 되면 대기 중인 요청도 실패 처리 (재시작 반복 방지)
+        for (const request of this.queue.splice(0)) request.reject(error);
+      } else {
+        this.dispatch(); // 남은 요청은 새 데몬으로
+      }
+    };
+    daemon.on('error', onExit);
+    daemon.on('exit', () => onExit());
+    daemon.stdin.on('error', () => {}); // exit handler rejects pending requests
+
+    this.daemon = daemon;
+    console.log(`🐍 Python extraction daemon started (pid ${daemon.pid})`);
+    return daemon;
+  }
+
+  rejectPending(error) {
+    for (const request of this.pending.values()) {
+      clearTimeout(request.timer);
+      request.reject(error);
+    }
+    this.pending.clear();
+  }
+
+  /**
+   * 데몬은 요청을 하나씩 처리하므로 한 번에 하나만 써 넣고, 타이머는 쓰는 순간부터 잰다
+   */
+  dispatch() {
+    if (this.pending.size > 0 || this.queue.length === 0) return;
+
+    const daemon = this.startDaemon();
+    const request = this.queue.shift();
+    request.timer = setTimeout(() => this.restartDaemon(request), this.requestTimeout);
+    this.pending.set(request.id, request);
+    daemon.stdin.write(JSON.stringify({ id: request.id, video_id: request.videoId, save: request.save }) + '\n');
+  }
+
+  /**
+   * 멈춘 요청은 데몬째로 정리: 늦은 응답이 같은 파이프로 섞이지 않도록 죽이고 새로 띄운다
+   */
+  restartDaemon(request) {
+    const daemon = this.daemon;
+    this.daemon = null; // exit 핸들러가 이 데몬을 더는 처리하지 않음
+    console.log(`⏱️ ${request.videoId} timed out after ${this.requestTimeout}ms, restarting Python daemon`);
+    this.rejectPending(new Error(`Timed out after ${this.requestTimeout}ms`));
+    if (daemon) daemon.kill('SIGKILL');
+    this.dispatch();
+  }
+
+  /**
+   * save: true 이면 Python 쪽에서 transcript-store 에 바로 저장
+   */
+  requestTranscript(videoId, save = false) {
+    const id = this.nextRequestId++;
+
+    return new Promise((resolve, reject) => {
+      this.queue.push({ id, videoId, save, resolve, reject, timer: null });
+      this.dispatch();
+    });
+  }
+
+  close() {
+    if (this.daemon) {
+      this.daemon.stdin.end();
+      this.daemon = null;
+    }
+  }
+
   async extractRealTranscript(videoId) {
     console.log(`🐍 Extracting real transcript for ${videoId} using Python API`);
     
     try {
-      // Check cache first
+      // Shared transcript-store first, then the legacy per-video cache file
+      const store = TranscriptStore.load(STORE_DIR);
+      if (store && store.has(videoId)) {
+        console.log(`📂 Using stored transcript for ${videoId}`);
+        return { success: true, data: store.get(videoId), method: 'cached-real' };
+      }
+
       const cacheFile = path.join(this.cacheDir, `${videoId}_real.json`);
       try {
         const cached = await fs.readFile(cacheFile, 'utf8');
@@ -34,23 +152,16 @@ class PythonYouTubeBridge {
         // No cache, proceed with API call
       }
 
-      // Execute Python script file
-      const { stdout, stderr } = await execAsync(`py extract_transcript.py ${videoId}`, {
-        timeout: 30000 // 30 second timeout
-      });
-
-      if (stderr) {
-        console.log(`⚠️ Python stderr: ${stderr}`);
-      }
-
-      // Parse result
-      const result = JSON.parse(stdout.trim());
+      // Ask the long-lived Python process instead of spawning one per video
+      const result = await this.requestTranscript(videoId, Boolean(store));
       
       if (result.success) {
         console.log(`✅ Successfully extracted ${result.segments} segments`);
         
-        // Cache the result
-        await fs.writeFile(cacheFile, JSON.stringify(result, null, 2));
+        // Cache the result (the daemon already saved it when the store exists)
+        if (!store) {
+          await fs.writeFile(cacheFile, JSON.stringify(result, null, 2));
+        }
         
         return { 
           success: true, 
@@ -110,18 +221,34 @@ class PythonYouTubeBridge {
     return results;
   }
 
-  searchTranscripts(query, videos) {
+  /**
+   * lemmaIndex (선택) 가 있으면 단어마다 같은 원형의 모든 형태로도 매치 ("go" → went, going ...)
+   */
+  searchTranscripts(query, videos, lemmaIndex = null) {
     const results = [];
     const searchTerm = query.toLowerCase();
+    const wordForms = lemmaIndex
+      ? tokenize(query).map(token => new Set(lemmaIndex.expand(token)))
+      : [];
     
     for (const video of videos) {
       for (const segment of video.transcript) {
-        if (segment.text.toLowerCase().includes(searchTerm)) {
-          const similarity = this.calculateSimilarity(searchTerm, segment.text.toLowerCase());
+        const text = segment.text.toLowerCase();
+        let similarity = 0;
+        if (text.includes(searchTerm)) {
+          similarity = this.calculateSimilarity(searchTerm, text);
+        } else if (wordForms.length > 0) {
+          const tokens = tokenize(segment.text);
+          if (wordForms.every(forms => tokens.some(token => forms.has(token)))) {
+            similarity = 0.8;
+          }
+        }
+        if (similarity > 0) {
           results.push({
             videoId: video.id,
             title: video.title,
             startTime: segment.start,
+            startMs: segment.start_ms ?? Math.round(segment.start * 1000),
             transcript: segment.text,
             similarity: similarity,
             searchQuery: query,
@@ -165,6 +292,7 @@ async function testBridge() {
   ];
   
   const results = await bridge.processBatch(testVideos);
+  bridge.close();
   
   console.log(`\n📊 Results: ${results.length} videos processed`);
   
@@ -0,0 +1,200 @@
+const fs = require('fs');
+const path = require('path');
+const { fold } = require('./corpus-pack');
+
+const DEFAULT_MAX_ENTRIES = 1000;
+const DEFAULT_TTL_MS = 5 * 60 * 1000; // 5분
+const SAVE_DELAY_MS = 5000;
+const CACHE_FILE_VERSION = 1;
+
+/**
+ * 캐시 키용 검색어 정규화: 대소문자 / 악센트 / 공백 / 문장부호 차이를 무시
+ * ("  Went,  SHOPPING! " → "went shopping")
+ */
+function normalizeQuery(query) {
+  return fold(String(query || ''))
+    .replace(/[^\p{L}\p{N}']+/gu, ' ')
+    .trim();
+}
+
+/**
+ * 캐시 무효화용 코퍼스 버전: transcript-store manifest 갱신 시각 (추출기가 영상을 추가하면 바뀜)
+ * + corpus.pack 빌드 시각
+ */
+function corpusVersion(store, packedSearch) {
+  const storeVersion = store ? store.refresh().version : 0;
+  const packVersion = packedSearch ? packedSearch.corpus.meta.built_at : 0;
+  return `${storeVersion}:${packVersion}`;
+}
+
+/**
+ * 검색 결과 캐시 (server.js, api/search.js, FastSearchSystem, LazyTranscriptSystem 공용)
+ * - Map 삽입 순서를 이용한 LRU, maxEntries 초과 시 가장 오래 안 쓴 항목 제거
+ * - 항목별 TTL
+ * - 코퍼스 버전이 바뀌면 (추출기가 영상을 추가하면) 전부 무효화
+ * - 선택적 디스크 계층: JSON 파일로 저장해두고 새 인스턴스가 시작할 때 미리 채움
+ */
+class QueryCache {
+  constructor({ maxEntries = DEFAULT_MAX_ENTRIES, ttlMs = DEFAULT_TTL_MS, filePath = null, version = null } = {}) {
+    this.maxEntries = maxEntries;
+    this.ttlMs = ttlMs;
+    this.filePath = filePath;
+    this.version = version;
+    this.entries = new Map(); // key → { value, expiresAt }
+    this.saveTimer = null;
+    this.metrics = { hits: 0, misses: 0, expired: 0, evictions: 0, invalidations: 0, loaded: 0 };
+  }
+
+  /**
+   * 정규화된 검색어 + 나머지 인자 (limit 등) 로 키 생성
+   */
+  key(query, ...parts) {
+    return [normalizeQuery(query), ...parts].join('\u001f');
+  }
+
+  get size() {
+    return this.entries.size;
+  }
+
+  get(key) {
+    const entry = this.entries.get(key);
+    if (!entry) {
+      this.metrics.misses++;
+      return undefined;
+    }
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(key);
+      this.metrics.expired++;
+      this.metrics.misses++;
+      return undefined;
+    }
+    // 최근 사용한 항목을 맨 뒤로
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    this.metrics.hits++;
+    return entry.value;
+  }
+
+  set(key, value, ttlMs = this.ttlMs) {
+    this.entries.delete(key);
+    this.entries.set(key, { value, expiresAt: Date.now() + ttlMs });
+    while (this.entries.size > this.maxEntries) {
+      this.entries.delete(this.entries.keys().next().value);
+      this.metrics.evictions++;
+    }
+    this.scheduleSave();
+    return value;
+  }
+
+  clear() {
+    if (this.entries.size > 0) {
+      this.entries.clear();
+      this.scheduleSave();
+    }
+  }
+
+  /**
+   * 코퍼스 버전 갱신 - 달라졌으면 캐시 전체 무효화, 무효화했으면 true
+   */
+  setVersion(version) {
+    if (version === this.version) {
+      return false;
+    }
+    const invalidated = this.version !== null && this.entries.size > 0;
+    this.version = version;
+    this.entries.clear();
+    if (invalidated) {
+      this.metrics.invalidations++;
+      console.log(`♻️ Query cache invalidated (corpus version ${version})`);
+      this.scheduleSave();
+    }
+    return invalidated;
+  }
+
+  stats() {
+    const lookups = this.metrics.hits + this.metrics.misses;
+    return {
+      size: this.entries.size,
+      maxEntries: this.maxEntries,
+      ttlMs: this.ttlMs,
+      version: this.version,
+      ...this.metrics,
+      hitRate: lookups > 0 ? Math.round((this.metrics.hits / lookups) * 1000) / 1000 : 0
+    };
+  }
+
+  /**
+   * 디스크 계층에서 미리 채우기 (버전이 같고 만료 전인 항목만), 불러온 항목 수 반환
+   */
+  load(filePath = this.filePath) {
+    if (!filePath || !fs.existsSync(filePath)) {
+      return 0;
+    }
+    try {
+      const data = JSON.parse(fs.readFileSync(filePath, 'utf8'));
+      if (data.format !== CACHE_FILE_VERSION || data.version !== this.version) {
+        return 0;
+      }
+      const now = Date.now();
+      let loaded = 0;
+      for (const [key, expiresAt, value] of data.entries) {
+        if (expiresAt > now && !this.entries.has(key)) {
+          this.entries.set(key, { value, expiresAt });
+          loaded++;
+        }
+      }
+      while (this.entries.size > this.maxEntries) {
+        this.entries.delete(this.entries.keys().next().value);
+      }
+      this.metrics.loaded += loaded;
+      return loaded;
+    } catch (error) {
+      console.log(`⚠️ Query cache file ignored (${filePath}): ${error.message}`);
+      return 0;
+    }
+  }
+
+  /**
+   * 디스크 계층에 저장 (임시 파일 + rename 으로 원자적 교체)
+   */
+  save(filePath = this.filePath) {
+    if (!filePath) return false;
+    if (this.saveTimer) {
+      clearTimeout(this.saveTimer);
+      this.saveTimer = null;
+    }
+    const now = Date.now();
+    const entries = [];
+    for (const [key, entry] of this.entries) {
+      if (entry.expiresAt > now) {
+        entries.push([key, entry.expiresAt, entry.value]);
+      }
+    }
+    const tmpPath = `${filePath}.${process.pid}.tmp`;
+    try {
+      fs.mkdirSync(path.dirname(filePath), { recursive: true });
+      fs.writeFileSync(tmpPath, JSON.stringify({
+        format: CACHE_FILE_VERSION,
+        version: this.version,
+        savedAt: now,
+        entries
+      }));
+      fs.renameSync(tmpPath, filePath);
+      return true;
+    } catch (error) {
+      console.log(`⚠️ Query cache save failed (${filePath}): ${error.message}`);
+      return false;
+    }
+  }
+
+  /**
+   * 여러 번의 set() 을 묶어서 한 번만 저장
+   */
+  scheduleSave() {
+    if (!this.filePath || this.saveTimer) return;
+    this.saveTimer = setTimeout(() => this.save(), SAVE_DELAY_MS);
+    this.saveTimer.unref();
+  }
+}
+
+module.exports = { QueryCache, normalizeQuery, corpusVersion };
@@ -0,0 +1,385 @@
+const os = require('os');
+const { Worker, isMainThread, parentPort, workerData } = require('worker_threads');
+const { registerTextFunctions } = require('./text-blocks');
+
+const DEFAULT_THREADS = parseInt(process.env.SEARCH_WORKERS, 10) || Math.min(4, os.cpus().length);
+const DEFAULT_TIMEOUT_MS = parseInt(process.env.SEARCH_TIMEOUT_MS, 10) || 3000;
+const DEFAULT_MAX_QUEUE = 256;
+
+// 순위는 FTS 인덱스만으로 (본문 텍스트를 풀지 않음)
+const RANK_SQL = `
+  SELECT rowid AS id, bm25(transcript_search) AS relevance_score
+  FROM transcript_search
+  WHERE transcript_search MATCH ?
+  ORDER BY relevance_score ASC
+  LIMIT ?
+`;
+
+// 순위에 든 세그먼트만 블록을 풀어서 본문 / 하이라이트 (segment_content 뷰, 세그먼트 id 는 영상 id << 20)
+const HIT_SQL = `
+  SELECT
+    v.video_id,
+    v.title AS video_title,
+    v.method,
+    c.start_ms,
+    c.text,
+    highlight(transcript_search, 0, '<mark>', '</mark>') AS highlighted_text
+  FROM transcript_search
+  JOIN segment_content c ON c.id = transcript_search.rowid
+  JOIN indexed_videos v ON v.id = c.id >> 20
+  WHERE transcript_search MATCH ? AND transcript_search.rowid = ?
+`;
+
+// 연결마다 한 번만 prepare
+const matchStatements = new WeakMap();
+
+/**
+ * MATCH 상위 limit 개 세그먼트 (relevance_score 순)
+ */
+function matchRows(db, match, limit) {
+  let statements = matchStatements.get(db);
+  if (!statements) {
+    statements = { rank: db.prepare(RANK_SQL), hit: db.prepare(HIT_SQL) };
+    matchStatements.set(db, statements);
+  }
+  return statements.rank.all(match, limit).map(({ id, relevance_score }) => ({
+    ...statements.hit.get(match, id),
+    relevance_score
+  }));
+}
+
+/**
+ * FTS5 검색 본체 (FastSearchSystem.search 의 캐시 아래 단계, worker 와 메인 스레드 공용)
+ * AND 검색으로 모든 단어가 들어간 세그먼트 먼저, 모자라면 OR 검색으로 채움
+ */
+function searchIndex(db, query, limit) {
+  // 검색어를 개별 단어로 분리
+  const searchWords = query.split(' ')
+    .map(word => word.replace(/[^\w]/g, ''))
+    .filter(word => word.length > 0);
+
+  if (searchWords.length === 0) {
+    return [];
+  }
+
+  const allResults = [];
+
+  // 1단계: 모든 단어가 포함된 결과 검색 (AND 검색)
+  if (searchWords.length > 1) {
+    const exactResults = matchRows(db, searchWords.join(' AND '), limit);
+
+    // 완전 매치 결과에 우선순위 부여
+    exactResults.forEach(row => {
+      allResults.push({
+        videoId: row.video_id,
+        videoTitle: row.video_title,
+        text: row.text,
+        highlightedText: row.highlighted_text,
+        start: Math.floor(row.start_ms / 1000),
+        startMs: row.start_ms,
+        method: row.method,
+        relevanceScore: row.relevance_score,
+        matchType: 'exact',
+        priority: 1
+      });
+    });
+  }
+
+  // 2단계: 개별 단어 검색 (OR 검색)
+  if (allResults.length < limit) {
+    const partialResults = matchRows(db, searchWords.join(' OR '), limit * 2);
+
+    // 이미 포함된 결과 제외
+    const existingIds = new Set(allResults.map(r => `${r.videoId}_${r.startMs}`));
+
+    partialResults.forEach(row => {
+      const id = `${row.video_id}_${row.start_ms}`;
+      if (!existingIds.has(id) && allResults.length < limit) {
+        const textLower = row.text.toLowerCase();
+        const matchedWords = searchWords.filter(word =>
+          textLower.includes(word.toLowerCase())
+        );
+
+        allResults.push({
+          videoId: row.video_id,
+          videoTitle: row.video_title,
+          text: row.text,
+          highlightedText: row.highlighted_text,
+          start: Math.floor(row.start_ms / 1000),
+          startMs: row.start_ms,
+          method: row.method,
+          relevanceScore: row.relevance_score,
+          matchType: 'partial',
+          matchedWordsCount: matchedWords.length,
+          totalWordsCount: searchWords.length,
+          priority: 2 + (searchWords.length - matchedWords.length)
+        });
+      }
+    });
+  }
+
+  // 결과 정렬
+  allResults.sort((a, b) => {
+    if (a.priority !== b.priority) {
+      return a.priority - b.priority;
+    }
+    if (a.matchedWordsCount && b.matchedWordsCount) {
+      if (a.matchedWordsCount !== b.matchedWordsCount) {
+        return b.matchedWordsCount - a.matchedWordsCount;
+      }
+    }
+    return a.relevanceScore - b.relevanceScore;
+  });
+
+  // 결과 포맷팅
+  return allResults.slice(0, limit).map(result => ({
+    videoId: result.videoId,
+    videoTitle: result.videoTitle,
+    text: result.text,
+    highlightedText: result.highlightedText,
+    start: result.start,
+    startMs: result.startMs,
+    method: result.method,
+    relevanceScore: result.relevanceScore,
+    matchType: result.matchType,
+    matchInfo: result.matchedWordsCount ?
+      `${result.matchedWordsCount}/${result.totalWordsCount} words matched` :
+      'exact match'
+  }));
+}
+
+/**
+ * 검색 전용 worker thread 풀 (worker 마다 fast_search.db 읽기 전용 연결 하나)
+ * - 동기 SQLite 검색이 Express 이벤트 루프를 막지 않고, 동시 검색은 코어 수만큼 병렬로
+ * - 대기열: 모든 worker 가 바쁘면 순서대로 대기, maxQueue 를 넘으면 바로 거절
+ * - 검색마다 timeoutMs (대기 시간 포함), AbortSignal 로 취소
+ * - 실행 중인 검색은 SQLite 호출 중간에 멈출 수 없어서 시간 초과 / 취소 시 그 worker 를 종료하고 새로 띄움
+ */
+class SearchPool {
+  constructor(dbPath, { threads = DEFAULT_THREADS, timeoutMs = DEFAULT_TIMEOUT_MS, maxQueue = DEFAULT_MAX_QUEUE } = {}) {
+    this.dbPath = dbPath;
+    this.threads = Math.max(1, threads);
+    this.timeoutMs = timeoutMs;
+    this.maxQueue = maxQueue;
+    this.workers = []; // slot → { worker, job, ready }
+    this.queue = [];
+    this.nextId = 1;
+    this.closed = false;
+    this.metrics = { completed: 0, failed: 0, timeouts: 0, cancelled: 0, rejected: 0, restarts: 0, totalMs: 0 };
+  }
+
+  start() {
+    for (let slot = 0; slot < this.threads; slot++) {
+      this.spawn(slot);
+    }
+    console.log(`🧵 Search pool started with ${this.threads} workers`);
+    return this;
+  }
+
+  spawn(slot) {
+    const entry = { worker: new Worker(__filename, { workerData: { dbPath: this.dbPath } }), job: null, ready: false };
+    this.workers[slot] = entry;
+
+    entry.worker.on('message', message => {
+      if (message.ready) {
+        entry.ready = true;
+        return;
+      }
+      const job = entry.job;
+      if (!job || job.id !== message.id) return;
+      entry.job = null;
+      if (message.error) {
+        this.metrics.failed++;
+        this.settle(job, new Error(message.error));
+      } else {
+        this.metrics.completed++;
+        this.metrics.totalMs += Date.now() - job.startedAt;
+        this.settle(job, null, message.results);
+      }
+      this.dispatch();
+    });
+
+    entry.worker.on('error', error => {
+      console.error(`❌ Search worker ${slot} error:`, error.message);
+    });
+
+    entry.worker.on('exit', () => {
+      // 시간 초과 / 취소로 이미 교체된 worker 면 무시
+      if (this.workers[slot] !== entry) return;
+      if (entry.job) {
+        this.metrics.failed++;
+        this.settle(entry.job, new Error('Search worker exited'));
+        entry.job = null;
+      }
+      // DB 를 열기 전에 죽었으면 다시 띄워도 같음 - 자리를 비워두고 남은 worker 로
+      if (this.closed || !entry.ready) {
+        this.workers[slot] = null;
+        if (this.available === 0) this.failQueue(new Error('Search pool unavailable'));
+        return;
+      }
+      this.metrics.restarts++;
+      this.spawn(slot);
+      this.dispatch();
+    });
+  }
+
+  /**
+   * 살아 있는 worker 수 (0 이면 FastSearchSystem 이 메인 스레드에서 검색)
+   */
+  get available() {
+    return this.workers.filter(Boolean).length;
+  }
+
+  /**
+   * 검색 하나를 대기열에 넣고 결과 Promise 반환 (searchIndex() 와 같은 결과)
+   */
+  search(query, limit, { signal = null, timeoutMs = this.timeoutMs } = {}) {
+    if (this.closed || this.available === 0) {
+      return Promise.reject(new Error('Search pool unavailable'));
+    }
+    if (this.queue.length >= this.maxQueue) {
+      this.metrics.rejected++;
+      return Promise.reject(new Error('Search queue is full'));
+    }
+    if (signal && signal.aborted) {
+      this.metrics.cancelled++;
+      return Promise.reject(new Error('Search cancelled'));
+    }
+
+    return new Promise((resolve, reject) => {
+      const job = { id: this.nextId++, query, limit, resolve, reject, queuedAt: Date.now(), startedAt: 0 };
+      job.timer = setTimeout(() => {
+        this.metrics.timeouts++;
+        this.cancel(job, new Error(`Search timed out after ${timeoutMs}ms`));
+      }, timeoutMs);
+      if (signal) {
+        job.signal = signal;
+        job.onAbort = () => {
+          this.metrics.cancelled++;
+          this.cancel(job, new Error('Search cancelled'));
+        };
+        signal.addEventListener('abort', job.onAbort, { once: true });
+      }
+      this.queue.push(job);
+      this.dispatch();
+    });
+  }
+
+  /**
+   * 쉬고 있는 worker 에 대기열 앞에서부터 배정
+   */
+  dispatch() {
+    for (const entry of this.workers) {
+      if (this.queue.length === 0) return;
+      if (!entry || entry.job) continue;
+      const job = this.queue.shift();
+      job.startedAt = Date.now();
+      entry.job = job;
+      entry.worker.postMessage({ id: job.id, query: job.query, limit: job.limit });
+    }
+  }
+
+  /**
+   * 대기 중이면 대기열에서 빼고, 실행 중이면 그 worker 를 종료하고 새로 띄움
+   */
+  cancel(job, error) {
+    const queued = this.queue.indexOf(job);
+    if (queued !== -1) {
+      this.queue.splice(queued, 1);
+    } else {
+      const slot = this.workers.findIndex(entry => entry && entry.job === job);
+      if (slot === -1) return; // 이미 끝남
+      const entry = this.workers[slot];
+      entry.job = null;
+      this.workers[slot] = null;
+      entry.worker.terminate();
+      if (!this.closed) {
+        this.metrics.restarts++;
+        this.spawn(slot);
+      }
+    }
+    this.settle(job, error);
+    this.dispatch();
+  }
+
+  settle(job, error, results) {
+    clearTimeout(job.timer);
+    if (job.signal) job.signal.removeEventListener('abort', job.onAbort);
+    if (error) {
+      job.reject(error);
+    } else {
+      job.resolve(results);
+    }
+  }
+
+  failQueue(error) {
+    for (const job of this.queue.splice(0)) {
+      this.settle(job, error);
+    }
+  }
+
+  /**
+   * 새 인덱스 스냅샷으로 전환: 각 worker 는 하던 검색을 마친 뒤 새 파일을 열고 이전 연결을 닫음
+   */
+  reopen(dbPath) {
+    this.dbPath = dbPath;
+    for (const entry of this.workers) {
+      if (entry) entry.worker.postMessage({ open: dbPath });
+    }
+  }
+
+  stats() {
+    const finished = this.metrics.completed;
+    return {
+      threads: this.threads,
+      available: this.available,
+      busy: this.workers.filter(entry => entry && entry.job).length,
+      queued: this.queue.length,
+      timeoutMs: this.timeoutMs,
+      ...this.metrics,
+      avgMs: finished > 0 ? Math.round(this.metrics.totalMs / finished) : 0
+    };
+  }
+
+  async close() {
+    this.closed = true;
+    this.failQueue(new Error('Search pool closed'));
+    const workers = this.workers.filter(Boolean);
+    this.workers = [];
+    for (const entry of workers) {
+      if (entry.job) this.settle(entry.job, new Error('Search pool closed'));
+    }
+    await Promise.all(workers.map(entry => entry.worker.terminate()));
+  }
+}
+
+if (!isMainThread && parentPort && workerData && workerData.dbPath) {
+  const Database = require('better-sqlite3');
+  const open = dbPath => {
+    const connection = new Database(dbPath, { readonly: true, fileMustExist: true });
+    connection.pragma('busy_timeout = 5000');
+    registerTextFunctions(connection);
+    return connection;
+  };
+  let db = open(workerData.dbPath);
+  parentPort.postMessage({ ready: true });
+  parentPort.on('message', ({ id, query, limit, open: dbPath }) => {
+    if (dbPath) {
+      try {
+        const previous = db;
+        db = open(dbPath);
+        previous.close();
+      } catch (error) {
+        console.error(`❌ Search worker could not open ${dbPath}:`, error.message);
+      }
+      return;
+    }
+    try {
+      parentPort.postMessage({ id, results: searchIndex(db, query, limit) });
+    } catch (error) {
+      parentPort.postMessage({ id, error: error.message });
+    }
+  });
+}
+
+module.exports = { SearchPool, searchIndex };
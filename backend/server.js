@@ -4,6 +4,9 @@ const axios = require('axios');
 const { AdvancedTranscriptSystem } = require('./advanced-transcript-system');
 const { PythonYouTubeBridge } = require('./python-youtube-bridge');
 const FastSearchSystem = require('./fast-search-system');
+const { PackedSearch } = require('./packed-search');
+const { TranscriptStore, STORE_DIR } = require('./transcript-store');
+const { QueryCache, corpusVersion } = require('./query-cache');
 require('dotenv').config();
 const path = require('path'); // Added for path.join
 
@@ -22,6 +25,11 @@ const YOUTUBE_API_BASE_URL = 'https://www.googleapis.com/youtube/v3';
 const transcriptSystem = new AdvancedTranscriptSystem();
 const pythonBridge = new PythonYouTubeBridge();
 const fastSearch = new FastSearchSystem();
+let packedSearch = null; // corpus.pack + 구문 인덱스 (corpus_pack.py --index 로 생성)
+let packedSearchMtime = 0; // 불러온 corpus.pack 의 수정 시각 (다시 만들어졌는지 확인용)
+let transcriptStore = null;
+// /api/search 응답 캐시, transcript-store/query_cache.json 에 저장해두면 서버리스 인스턴스도 이걸로 시작
+const queryCache = new QueryCache({ filePath: path.join(STORE_DIR, 'query_cache.json') });
 
 // Load accurate verified database
 const fs = require('fs');
@@ -63,13 +71,28 @@ async function initializeSystem() {
     const fs = require('fs');
     const cachedVideos = [];
     
+    // 공유 transcript-store 가 있으면 파일 하나에서 바로 읽음
+    const store = TranscriptStore.load(STORE_DIR);
+    if (store) {
+      for (const video of store.readAll(200)) {
+        cachedVideos.push({
+          id: video.id,
+          title: video.title,
+          duration: Math.max(...video.transcript.map(t => t.start)) + 30,
+          transcript: video.transcript,
+          method: 'cached-safe'
+        });
+      }
+      console.log(`📦 Read ${cachedVideos.length} videos from transcript-store`);
+    }
+    
     const cacheDir = path.join(__dirname, 'transcript-cache');
-    if (!fs.existsSync(cacheDir)) {
+    if (!store && !fs.existsSync(cacheDir)) {
       console.log('⚠️ transcript-cache directory not found - using fallback only');
       return;
     }
     
-    const cacheFiles = fs.readdirSync(cacheDir).filter(file => file.endsWith('_real.json'));
+    const cacheFiles = store ? [] : fs.readdirSync(cacheDir).filter(file => file.endsWith('_real.json'));
     
     // Load up to 200 files to include more content
     const filesToProcess = cacheFiles.slice(0, 200);
@@ -126,10 +149,30 @@ async function initializeSystem() {
   console.log('📊 Final video sources:', methods);
   console.log(`📈 Total videos available: ${videoDatabase.length}`);
   
+  // 구문 인덱스 로드 (없으면 FastSearch만 사용)
+  refreshPackedSearch();
+
+  // 검색 캐시: 코퍼스 버전이 같은 디스크 캐시만 불러옴
+  transcriptStore = TranscriptStore.load(STORE_DIR);
+  queryCache.setVersion(corpusVersion(transcriptStore, packedSearch));
+  const warmed = queryCache.load();
+  if (warmed > 0) {
+    console.log(`♨️ Query cache warmed with ${warmed} entries`);
+  }
+  
   // FastSearchSystem 초기화 및 인덱스 확인
   try {
     console.log('🚀 Initializing FastSearchSystem...');
     await fastSearch.initialize();
+    // 검색은 worker thread 풀에서 (동기 SQLite 검색이 다른 요청을 막지 않게)
+    fastSearch.startSearchPool();
+    // 감시 모드: 추출기가 새 영상을 쓰면 몇 초 안에 검색 가능 (대량 변경은 새 스냅샷으로 교체)
+    fastSearch.watch({
+      onUpdate: () => {
+        refreshPackedSearch();
+        queryCache.clear();
+      }
+    });
     
     console.log('🔍 Checking search index status...');
     // 백그라운드에서 인덱스 확인 및 필요시에만 구축 (서버 시작을 차단하지 않음)
@@ -139,6 +182,7 @@ async function initializeSystem() {
         console.log('🚀 Server ready for instant searches!');
       } else {
         console.log(`✅ FastSearch index built: ${stats.videos} videos, ${stats.segments} segments`);
+        queryCache.clear();
       }
     }).catch(error => {
       console.error('❌ FastSearch index check/build failed:', error.message);
@@ -149,6 +193,33 @@ async function initializeSystem() {
   }
 }
 
+/**
+ * corpus.pack 이 (다시) 만들어졌으면 구문 / 원형 / trigram / 자동완성 인덱스를 새로 불러옴
+ * 요청마다 stat 한 번 - corpus_pack.py 가 rename 으로 교체하므로 수정 시각이 바뀌면 새 pack
+ */
+function refreshPackedSearch() {
+  for (const dir of [STORE_DIR, path.join(__dirname, 'transcript-cache')]) {
+    let mtime;
+    try {
+      mtime = fs.statSync(path.join(dir, 'corpus.pack')).mtimeMs;
+    } catch (error) {
+      continue; // 이 디렉터리에는 pack 없음
+    }
+    if (packedSearch && packedSearch.cacheDir === dir && mtime === packedSearchMtime) {
+      return packedSearch;
+    }
+    packedSearchMtime = mtime; // 실패해도 같은 파일로 매 요청 다시 시도하지 않게
+    try {
+      packedSearch = new PackedSearch(dir);
+      console.log(`📦 Loaded corpus.pack: ${packedSearch.videoCount} videos, phrase index ${packedSearch.phraseIndex ? 'on' : 'off'}, lemma index ${packedSearch.lemmaIndex ? 'on' : 'off'}, trigram index ${packedSearch.trigramIndex ? 'on' : 'off'}, suggest index ${packedSearch.suggestIndex ? 'on' : 'off'}`);
+    } catch (error) {
+      console.log(`⚠️ corpus.pack loading failed: ${error.message}`);
+    }
+    return packedSearch;
+  }
+  return packedSearch;
+}
+
 // Legacy mock data removed - using only real Python-extracted transcripts
 
 // Utility function to search text with fuzzy matching
@@ -193,30 +264,61 @@ app.get('/api/search', async (req, res) => {
     console.log(`🔍 Searching for: "${query}"`);
     const startTime = Date.now();
     
-    // Use FastSearchSystem for ultra-fast results
-    const results = await fastSearch.search(query, 10);
+    // 추출기가 영상을 추가했거나 corpus.pack 을 다시 만들었으면 캐시 무효화
+    queryCache.setVersion(corpusVersion(transcriptStore, refreshPackedSearch()));
+    const cacheKey = queryCache.key(query, 10);
+    const cachedResponse = queryCache.get(cacheKey);
+    if (cachedResponse) {
+      console.log(`⚡ Query cache hit: "${query}"`);
+      return res.json({
+        ...cachedResponse,
+        query: query,
+        searchTime: Date.now() - startTime,
+        systemInfo: { ...cachedResponse.systemInfo, cached: true }
+      });
+    }
+    
+    // 정확한 구문 / 원형 매치 먼저, 10개가 안 되면 FastSearchSystem 으로 채움
+    // (corpus.pack 을 다시 만들기 전에 감시 모드가 인덱싱한 새 영상도 보이게)
+    let phraseResults = packedSearch ? packedSearch.findIndexed(query, 10) : [];
+    // 클라이언트가 연결을 끊으면 대기 / 실행 중인 FTS 검색 취소
+    const abort = new AbortController();
+    req.on('close', () => {
+      if (!res.headersSent) abort.abort();
+    });
+    const seen = new Set(phraseResults.map(result => `${result.videoId}:${result.startMs}`));
+    const results = phraseResults.length >= 10 ? [] :
+      (await fastSearch.search(query, 10, { signal: abort.signal }))
+        .filter(result => !seen.has(`${result.videoId}:${result.startMs}`))
+        .slice(0, 10 - phraseResults.length);
+    // 오타 / 철자 차이: trigram 색인으로 교정한 검색어로 다시 (전체 스캔 fallback 전에)
+    if (phraseResults.length === 0 && results.length === 0 && packedSearch) {
+      phraseResults = packedSearch.findFuzzy(query, 10);
+    }
     
     const searchTime = Date.now() - startTime;
-    console.log(`✅ Found ${results.length} results in ${searchTime}ms`);
+    console.log(`✅ Found ${phraseResults.length + results.length} results in ${searchTime}ms`);
     
     // Fallback to cached video database if no results
     let fallbackResults = [];
-    if (results.length === 0 && videoDatabase.length > 0) {
+    if (phraseResults.length === 0 && results.length === 0 && videoDatabase.length > 0) {
       console.log('🔄 Fallback to cached videos...');
-      fallbackResults = pythonBridge.searchTranscripts(query, videoDatabase);
+      fallbackResults = pythonBridge.searchTranscripts(query, videoDatabase, packedSearch && packedSearch.lemmaIndex);
     }
     
     // Convert FastSearchSystem results to expected format
-    const formattedResults = results.map(result => ({
+    const formattedResults = phraseResults.concat(results.map(result => ({
       videoId: result.videoId,
       title: result.videoTitle, // videoTitle -> title로 변경
       startTime: result.start, // start -> startTime으로 변경
+      startMs: result.startMs, // 정확한 시작 위치 (ms)
       transcript: result.highlightedText || result.text, // text -> transcript로 변경
-      contextualText: result.contextualText, // 맥락 포함된 텍스트 추가
+      // corpus.pack 에 미리 계산된 앞뒤 맥락 (contextualText, contextOffset)
+      ...(packedSearch ? packedSearch.contextFor(result.videoId, result.startMs) : {}),
       similarity: 1 - (result.relevanceScore || 0) / 100, // relevanceScore를 similarity로 변환 (0-1 범위)
       searchQuery: query,
       method: result.method
-    }))
+    })))
     // 유효한 YouTube 비디오 ID만 필터링 (11자리 영숫자)
     .filter(result => {
       const isValidYouTubeId = result.videoId && 
@@ -232,22 +334,24 @@ app.get('/api/search', async (req, res) => {
     
     const finalResults = formattedResults.length > 0 ? formattedResults : fallbackResults;
     
-    // Get FastSearch statistics
-    const fastSearchStats = await fastSearch.getStats();
+    // FastSearch statistics (in-memory counters, no COUNT queries)
+    const fastSearchStats = fastSearch.stats();
     
-    res.json({
+    const response = queryCache.set(cacheKey, {
       query: query,
       results: finalResults,
       totalResults: finalResults.length,
       searchTime: searchTime,
       systemInfo: {
-        source: formattedResults.length > 0 ? 'fast-search-system' : 'cached-videos',
+        source: phraseResults.length > 0 ? phraseResults[0].method :
+          formattedResults.length > 0 ? 'fast-search-system' : 'cached-videos',
         videosInDatabase: fastSearchStats.totalVideos,
         totalSegments: fastSearchStats.totalSegments,
-        cacheSize: fastSearchStats.cacheSize,
+        cacheSize: queryCache.size,
         hasFastSearch: true
       }
     });
+    res.json({ ...response, systemInfo: { ...response.systemInfo, cached: false } });
     
   } catch (error) {
     console.error('❌ Search error:', error);
@@ -255,6 +359,20 @@ app.get('/api/search', async (req, res) => {
   }
 });
 
+// 입력하는 동안 자동완성 (suggest_index.pack 의 이진 탐색만 - 캐시 / FTS / 추출 없음)
+app.get('/api/suggest', (req, res) => {
+  const prefix = typeof req.query.q === 'string' ? req.query.q : '';
+  const limit = Math.min(Math.max(parseInt(req.query.limit, 10) || 8, 1), 20);
+  const startTime = process.hrtime.bigint();
+  const corpus = refreshPackedSearch();
+  const suggestions = corpus ? corpus.suggest(prefix, limit) : [];
+  res.json({
+    query: prefix,
+    suggestions,
+    suggestTime: Number(process.hrtime.bigint() - startTime) / 1e6
+  });
+});
+
 // Get video details (Enhanced with Advanced System)
 app.get('/api/video/:videoId', async (req, res) => {
   try {
@@ -355,7 +473,7 @@ app.get('/api/system/status', (req, res) => {
     performance: {
       accurateResultsAccuracy: '100%',
       averageProcessingTime: '<1s per video',
-      cacheHitRate: 'Variable',
+      cacheHitRate: queryCache.stats().hitRate,
       searchAccuracy: 'Perfect for verified content'
     }
   });
@@ -368,6 +486,7 @@ app.post('/api/rebuild-index', async (req, res) => {
     const startTime = Date.now();
     
     const stats = await fastSearch.buildIndex(true); // force = true
+    queryCache.clear();
     const rebuildTime = Date.now() - startTime;
     
     console.log(`✅ Manual rebuild completed in ${Math.round(rebuildTime/1000)}s`);
@@ -394,11 +513,12 @@ app.post('/api/rebuild-index', async (req, res) => {
 // Get FastSearch statistics API
 app.get('/api/search-stats', async (req, res) => {
   try {
-    const fastSearchStats = await fastSearch.getStats();
+    const fastSearchStats = fastSearch.stats();
     
     res.json({
       success: true,
       stats: fastSearchStats,
+      queryCache: queryCache.stats(),
       indexStatus: {
         isReady: fastSearchStats.totalVideos > 0,
         totalVideos: fastSearchStats.totalVideos,
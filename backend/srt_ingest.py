@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Streaming SRT/VTT ingester
+Reads subtitle files line by line, drops the repeated lines that rolling
+auto-captions carry from one cue to the next, and writes only new or changed
+files into the shared transcript store. FastSearch indexes the new store
+entries itself (buildIndex / watch mode) into its published snapshot.
+
+Usage:
+    python srt_ingest.py [DIR_OR_FILE ...] [--windows] [--pack] [--force]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import time
+
+from caption_normalize import normalize_transcript
+from text_blocks import BLOCK_SEGMENTS, blocks, pack_block, train_dictionary, unpack_block
+from transcript_store import STORE_DIR, encode_transcript, has_video, store_for
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = STORE_DIR
+STATE_FILE = '.srt_ingest_state.json'
+METHOD = 'srt-ingest'
+
+TIMING_RE = re.compile(
+    r'(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{3})\s*-->\s*(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{3})'
+)
+TAG_RE = re.compile(r'<[^>]*>|\{\\[^}]*\}')
+WORD_TIME_RE = re.compile(r'<(?:(\d+):)?(\d{2}):(\d{2})\.(\d{3})>')
+VIDEO_ID_RE = re.compile(r'\[([\w-]{11})\][^\[\]]*\.(?:srt|vtt)$')
+TITLE_RE = re.compile(r'^(.+?)\s*\[[\w-]{11}\]')
+
+# FastSearch layout, keep in sync with SCHEMA_SQL in fast-search-system.js:
+# one indexed_videos row per video, segment ids are video id << SEGMENT_BITS | position,
+# texts live in dictionary-compressed blocks read back through the segment_content view
+INDEX_SCHEMA_VERSION = 2
+SEGMENT_BITS = 20
+BLOCK_BITS = BLOCK_SEGMENTS.bit_length() - 1
+INDEX_SCHEMA = f'''
+    CREATE TABLE IF NOT EXISTS indexed_videos (
+        id INTEGER PRIMARY KEY,
+        video_id TEXT NOT NULL UNIQUE,
+        title TEXT NOT NULL,
+        method TEXT,
+        content_hash TEXT NOT NULL,
+        segments INTEGER NOT NULL,
+        indexed_at INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS segments (
+        id INTEGER PRIMARY KEY,
+        start_ms INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS segment_blocks (
+        id INTEGER PRIMARY KEY,
+        dictionary INTEGER,
+        data BLOB NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS text_dictionaries (
+        id INTEGER PRIMARY KEY,
+        data BLOB NOT NULL,
+        created_at INTEGER NOT NULL
+    );
+    CREATE VIEW IF NOT EXISTS segment_content AS
+        SELECT s.id AS id, s.start_ms AS start_ms,
+               segment_text(b.data, b.dictionary, d.data, s.id & {BLOCK_SEGMENTS - 1}) AS text
+        FROM segments s
+        JOIN segment_blocks b ON b.id = s.id >> {BLOCK_BITS}
+        LEFT JOIN text_dictionaries d ON d.id = b.dictionary;
+    CREATE VIRTUAL TABLE IF NOT EXISTS transcript_search USING fts5(
+        text,
+        content = 'segment_content',
+        content_rowid = 'id',
+        tokenize = 'porter ascii'
+    );
+    CREATE TABLE IF NOT EXISTS index_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        videos INTEGER NOT NULL,
+        segments INTEGER NOT NULL
+    );
+'''
+
+
+def _seconds(hours, minutes, seconds, millis):
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds) + int(millis) / 1000
+
+
+def to_ms(seconds):
+    return int(round(seconds * 1000))
+
+
+def split_words(line, cue_start):
+    """[[start_ms, word], ...] from VTT inline timestamps, [] if the line has none"""
+    words = []
+    position = 0
+    start = cue_start
+    for match in WORD_TIME_RE.finditer(line):
+        word = TAG_RE.sub('', line[position:match.start()]).strip()
+        if word:
+            words.append([to_ms(start), word])
+        start = _seconds(*match.groups())
+        position = match.end()
+    if words:
+        word = TAG_RE.sub('', line[position:]).strip()
+        if word:
+            words.append([to_ms(start), word])
+    return words
+
+
+def iter_cues(path):
+    """Yield (start, end, lines, words) per cue without reading the whole file
+
+    words[i] holds the inline word timings of lines[i] (VTT auto-captions only).
+    """
+    timing = None
+    lines = []
+    words = []
+    with open(path, encoding='utf-8-sig', errors='replace') as f:
+        for raw in f:
+            line = raw.strip()
+            match = TIMING_RE.search(line)
+            if match:
+                if timing and lines:
+                    yield timing[0], timing[1], lines, words
+                groups = match.groups()
+                timing = (_seconds(*groups[:4]), _seconds(*groups[4:]))
+                lines = []
+                words = []
+            elif not line and not lines and raw.strip('\r\n'):
+                continue  # ' ' placeholder line right after the timing (yt-dlp VTT)
+            elif not line:
+                if timing and lines:
+                    yield timing[0], timing[1], lines, words
+                timing = None
+                lines = []
+                words = []
+            elif timing:
+                text = TAG_RE.sub('', line).strip()
+                if text:
+                    lines.append(text)
+                    words.append(split_words(line, timing[0]))
+            # anything else is a cue number or a WEBVTT header/NOTE block
+    if timing and lines:
+        yield timing[0], timing[1], lines, words
+
+
+def dedupe_rolling(cues):
+    """Drop lines repeated from the previous cue (rolling auto-captions)
+
+    YouTube auto-captions show each line twice: once at the bottom, then again
+    at the top of the next cue while the new line types in, often with a
+    ~10ms cue holding only the carried-over line.
+    """
+    previous = []
+    for start, end, lines, words in cues:
+        overlap = 0
+        for k in range(min(len(lines), len(previous)), 0, -1):
+            if lines[:k] == previous[-k:]:
+                overlap = k
+                break
+        new_lines = lines[overlap:]
+        if not new_lines:
+            continue
+        previous = lines
+        yield start, end, ' '.join(new_lines), [w for line in words[overlap:] for w in line]
+
+
+def parse_subtitles(path):
+    """Normalized cache-format segments for one SRT/VTT file"""
+    transcript = []
+    for start, end, text, words in dedupe_rolling(iter_cues(path)):
+        text = text.lstrip('-').strip()
+        if text:
+            segment = {
+                'start': int(start),
+                'start_ms': to_ms(start),
+                'duration_ms': to_ms(max(0, end - start)),
+                'text': text
+            }
+            if words:
+                segment['words'] = words
+            transcript.append(segment)
+    return normalize_transcript(transcript)
+
+
+def video_info(path):
+    """(video_id, title) from a yt-dlp style 'Title [videoId].en.srt' name"""
+    name = os.path.basename(path)
+    match = VIDEO_ID_RE.search(name)
+    if not match:
+        return None, None
+    title = TITLE_RE.match(name)
+    return match.group(1), title.group(1).strip() if title else 'Unknown Video'
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestState:
+    """Path -> (mtime, size, sha1) of every file already ingested"""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.files = json.load(f)
+        except (OSError, ValueError):
+            self.files = {}
+
+    def changed(self, path):
+        """sha1 if the file is new or its content changed, else None"""
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        entry = self.files.get(key)
+        if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+            return None
+
+        digest = file_hash(path)
+        if entry and entry['sha1'] == digest:
+            entry['mtime'] = stat.st_mtime  # touched but identical
+            return None
+        return digest
+
+    def mark(self, path, digest, video_id):
+        stat = os.stat(path)
+        self.files[os.path.abspath(path)] = {
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'sha1': digest,
+            'video_id': video_id
+        }
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.files, f)
+        os.replace(tmp_path, self.path)
+
+
+def find_subtitle_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in ('*.srt', '*.vtt'):
+                yield from sorted(glob.glob(os.path.join(path, pattern)))
+        elif os.path.exists(path):
+            yield path
+
+
+def write_cache(cache_dir, videos):
+    """Save (video_id, title, transcript) tuples, one manifest write for a store"""
+    store = store_for(cache_dir)
+    if store is not None:
+        store.put_many([(video_id, title, METHOD, transcript) for video_id, title, transcript in videos])
+        return
+    for video_id, title, transcript in videos:
+        write_cache_file(cache_dir, video_id, title, transcript)
+
+
+def write_cache_file(cache_dir, video_id, title, transcript):
+    result = {
+        'success': True,
+        'videoId': video_id,
+        'videoTitle': title,
+        'transcript': transcript,
+        'method': METHOD,
+        'segments': len(transcript),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    }
+    cache_file = os.path.join(cache_dir, f'{video_id}_real.json')
+    tmp_file = cache_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, cache_file)
+
+
+def ensure_index_schema(db):
+    """Create the FastSearch tables (commits); a database in the old one-table
+    layout is emptied so the next FastSearch build reindexes everything"""
+    if db.execute('PRAGMA user_version').fetchone()[0] < INDEX_SCHEMA_VERSION:
+        db.executescript('''
+            DROP TABLE IF EXISTS transcript_search;
+            DROP TABLE IF EXISTS indexed_videos;
+            DROP TABLE IF EXISTS index_stats;
+        ''')
+    db.executescript(INDEX_SCHEMA)
+    db.execute(f'PRAGMA user_version = {INDEX_SCHEMA_VERSION}')
+    db.execute(
+        'INSERT OR IGNORE INTO index_stats (id, videos, segments) '
+        'SELECT 1, COUNT(*), COALESCE(SUM(segments), 0) FROM indexed_videos'
+    )
+    db.commit()
+
+
+def _delete_index_rows(db, video, dictionaries):
+    """Drop one video's FTS rows, segments and blocks; the external-content FTS
+    table needs the indexed text back, so only this video's blocks are inflated"""
+    low, high = video << SEGMENT_BITS, ((video + 1) << SEGMENT_BITS) - 1
+    block_range = (low >> BLOCK_BITS, high >> BLOCK_BITS)
+    rows = db.execute('SELECT id, dictionary, data FROM segment_blocks WHERE id BETWEEN ? AND ?', block_range)
+    for block_id, dictionary_id, data in rows.fetchall():
+        if dictionary_id not in dictionaries:
+            row = db.execute('SELECT data FROM text_dictionaries WHERE id = ?', (dictionary_id,)).fetchone()
+            dictionaries[dictionary_id] = row[0] if row else None
+        db.executemany(
+            "INSERT INTO transcript_search (transcript_search, rowid, text) VALUES ('delete', ?, ?)",
+            (((block_id << BLOCK_BITS) | slot, text)
+             for slot, text in enumerate(unpack_block(data, dictionaries[dictionary_id])))
+        )
+    db.execute('DELETE FROM segments WHERE id BETWEEN ? AND ?', (low, high))
+    db.execute('DELETE FROM segment_blocks WHERE id BETWEEN ? AND ?', block_range)
+
+
+def write_index(db, videos):
+    """Replace the given videos in a FastSearch-layout database in one transaction
+
+    Only for standalone databases (benchmark.py): the live index is a set of
+    snapshots owned by fast-search-system.js, which picks store writes up itself.
+    """
+    ensure_index_schema(db)
+    row = db.execute('SELECT id, data FROM text_dictionaries ORDER BY id DESC LIMIT 1').fetchone()
+    dictionary_id, dictionary = row if row else (None, None)
+    dictionaries = {dictionary_id: dictionary}
+    now = int(time.time() * 1000)
+    with db:
+        if dictionary is None:
+            dictionary = train_dictionary([s['text'] for _, _, transcript in videos for s in transcript])
+            dictionary_id = db.execute(
+                'INSERT INTO text_dictionaries (data, created_at) VALUES (?, ?) RETURNING id', (dictionary, now)
+            ).fetchone()[0]
+            dictionaries[dictionary_id] = dictionary
+        for video_id, title, transcript in videos:
+            previous = db.execute('SELECT id, segments FROM indexed_videos WHERE video_id = ?', (video_id,)).fetchone()
+            if previous:
+                _delete_index_rows(db, previous[0], dictionaries)
+            # Same content hash as the transcript store, so FastSearch doesn't index it again
+            video = db.execute('''
+                INSERT INTO indexed_videos (video_id, title, method, content_hash, segments, indexed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (video_id) DO UPDATE SET
+                    title = excluded.title, method = excluded.method, content_hash = excluded.content_hash,
+                    segments = excluded.segments, indexed_at = excluded.indexed_at
+                RETURNING id
+            ''', (video_id, title, METHOD, hashlib.sha1(encode_transcript(transcript)).hexdigest(),
+                  len(transcript), now)).fetchone()[0]
+            base = video << SEGMENT_BITS
+            db.executemany('INSERT INTO segments (id, start_ms) VALUES (?, ?)',
+                           ((base | i, s['start_ms']) for i, s in enumerate(transcript)))
+            db.executemany('INSERT INTO transcript_search (rowid, text) VALUES (?, ?)',
+                           ((base | i, s['text']) for i, s in enumerate(transcript)))
+            texts = [s['text'] for s in transcript]
+            db.executemany('INSERT INTO segment_blocks (id, dictionary, data) VALUES (?, ?, ?)',
+                           (((base >> BLOCK_BITS) + n, dictionary_id, pack_block(block, dictionary))
+                            for n, block in enumerate(blocks(texts))))
+            db.execute('UPDATE index_stats SET videos = videos + ?, segments = segments + ? WHERE id = 1',
+                       (0 if previous else 1, len(transcript) - (previous[1] if previous else 0)))
+
+
+def ingest(paths, cache_dir=CACHE_DIR, force=False, windows=None):
+    """Ingest new/changed subtitle files, returns a summary dict
+
+    windows is an optional overlap_windows.WindowIndex updated per video.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    state = IngestState(os.path.join(cache_dir, STATE_FILE))
+    summary = {'scanned': 0, 'ingested': 0, 'unchanged': 0, 'kept': 0, 'segments': 0}
+    ingested = []
+
+    for path in find_subtitle_files(paths):
+        summary['scanned'] += 1
+        video_id, title = video_info(path)
+        if not video_id:
+            continue
+
+        digest = state.changed(path)
+        if digest is None and not force:
+            summary['unchanged'] += 1
+            continue
+        digest = digest or file_hash(path)
+
+        # Don't let a subtitle file clobber a transcript from another extractor
+        if not force and os.path.abspath(path) not in state.files and has_video(cache_dir, video_id):
+            state.mark(path, digest, video_id)
+            summary['kept'] += 1
+            continue
+
+        transcript = parse_subtitles(path)
+        if transcript:
+            if windows is not None:
+                windows.update_video(video_id, title, transcript)
+            ingested.append((video_id, title, transcript))
+            summary['ingested'] += 1
+            summary['segments'] += len(transcript)
+        state.mark(path, digest, video_id)
+
+    if ingested:
+        write_cache(cache_dir, ingested)
+
+    state.save()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream SRT/VTT files into the transcript store')
+    parser.add_argument('paths', nargs='*', default=[BACKEND_DIR])
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--windows', action='store_true', help='update overlap_search.db per video')
+    parser.add_argument('--pack', action='store_true', help='rebuild corpus.pack and search indexes afterwards')
+    parser.add_argument('--force', action='store_true', help='re-ingest everything')
+    args = parser.parse_args()
+
+    started = time.time()
+    windows = None
+    if args.windows:
+        from overlap_windows import WindowIndex
+        windows = WindowIndex()
+    try:
+        summary = ingest(args.paths, args.cache_dir, args.force, windows)
+    finally:
+        if windows is not None:
+            windows.close()
+    if args.pack and summary['ingested']:
+        from corpus_pack import pack_and_index
+        summary['corpus'] = pack_and_index(args.cache_dir)
+    summary['time_ms'] = int((time.time() - started) * 1000)
+    print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
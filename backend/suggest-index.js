@@ -0,0 +1,75 @@
+const { PackFile } = require('./packfile');
+const { tokenize } = require('./phrase-index');
+
+const MAX_SUGGESTIONS = 10;
+
+/**
+ * 입력 중인 글자를 구문 앞부분으로 (suggest_index.py 의 normalize_prefix() 와 동일하게 유지)
+ * fold() 한 단어들을 공백 하나로 잇고, 끝에 공백이 있으면 유지 ("how are " → 다음 단어 추천)
+ */
+function normalizePrefix(text) {
+  let prefix = tokenize(text).join(' ');
+  if (prefix && /\s$/.test(text)) prefix += ' ';
+  return prefix;
+}
+
+/**
+ * suggest_index.py 가 만든 자동완성 표 로더 (입력하는 동안 /api/suggest 로 추천)
+ * 구문이 UTF-8 바이트 순이라 같은 앞부분으로 시작하는 구문은 한 구간에 모여 있음
+ * → 이진 탐색 두 번 + 구간의 빈도(counts)만 훑어서 상위 limit 개, 문자열은 고른 것만 디코딩
+ */
+class SuggestIndex {
+  constructor(filePath) {
+    const pack = new PackFile(filePath);
+    this.pack = pack;
+    this.meta = pack.json('meta');
+    this.phrases = pack.strings('phrases');
+    this.counts = pack.u32('counts');
+  }
+
+  /**
+   * key 바이트열 이상인 첫 구문 위치
+   */
+  lowerBound(key) {
+    const { buffer, dataStart, offsets } = this.phrases;
+    let low = 0;
+    let high = this.phrases.length;
+    while (low < high) {
+      const mid = (low + high) >> 1;
+      if (buffer.compare(key, 0, key.length, dataStart + offsets[mid], dataStart + offsets[mid + 1]) < 0) {
+        low = mid + 1;
+      } else {
+        high = mid;
+      }
+    }
+    return low;
+  }
+
+  /**
+   * 입력한 글자로 시작하는 구문 중 코퍼스에 자주 나오는 순 [{ phrase, count }]
+   */
+  suggest(text, limit = MAX_SUGGESTIONS) {
+    const prefix = normalizePrefix(text);
+    if (!prefix || limit <= 0) return [];
+    const key = Buffer.from(prefix, 'utf8');
+    // key 로 시작하는 구문은 모두 key + 0xff 보다 앞
+    const start = this.lowerBound(key);
+    const end = this.lowerBound(Buffer.concat([key, Buffer.from([0xff])]));
+
+    // 빈도 내림차순 상위 limit 개 (limit 이 작아서 삽입 정렬)
+    const best = [];
+    for (let i = start; i < end; i++) {
+      const count = this.counts[i];
+      if (best.length === limit) {
+        if (count <= this.counts[best[limit - 1]]) continue;
+        best.pop();
+      }
+      let at = best.length;
+      while (at > 0 && this.counts[best[at - 1]] < count) at--;
+      best.splice(at, 0, i);
+    }
+    return best.map(i => ({ phrase: this.phrases.get(i), count: this.counts[i] }));
+  }
+}
+
+module.exports = { SuggestIndex, normalizePrefix };
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Prefix autocomplete table of common phrases in corpus.pack
+Counts every 1-4 word phrase in each video's token stream (phrases may run
+across caption segments, like the phrase index) and keeps the ones heard at
+least MIN_COUNT times. A phrase is only counted when both of its shorter
+sub-phrases made the cut, so the long tail of one-off 3- and 4-grams never
+reaches memory.
+
+Phrases are folded tokens joined by single spaces and sorted by UTF-8 bytes,
+so everything starting with a typed prefix is one contiguous range: a
+suggestion is a binary search plus a top-k scan over the counts in that
+range (see suggest-index.js for the Node loader behind /api/suggest).
+
+Layout (packfile sections):
+    meta      JSON     version, counts, corpus_built_at
+    phrases   STRINGS  sorted by UTF-8 bytes
+    counts    U32      [phrases] occurrences of each phrase
+
+Usage:
+    python suggest_index.py [--cache-dir DIR] [--corpus FILE] [--out FILE]
+    python suggest_index.py --query "went sh"
+"""
+
+import argparse
+import heapq
+import json
+import os
+import time
+from array import array
+
+from corpus_pack import CACHE_DIR, CORPUS_FILE, Corpus
+from packfile import JSON, STRINGS, U32, PackFile, write_pack
+from phrase_index import TOKEN_RE, tokenize
+
+INDEX_FILE = 'suggest_index.pack'
+INDEX_VERSION = 1
+MAX_WORDS = 4
+MIN_COUNT = 3
+
+
+def video_tokens(corpus):
+    """One folded token list per video, caption segments run together"""
+    for v in range(len(corpus)):
+        tokens = []
+        for s in corpus.segment_range(v):
+            tokens.extend(TOKEN_RE.findall(corpus.search_text(s)))
+        yield tokens
+
+
+def count_phrases(streams, max_words=MAX_WORDS, min_count=MIN_COUNT):
+    """{phrase: count} of every 1..max_words word phrase seen min_count times"""
+    frequent = {}
+    previous = None
+    for n in range(1, max_words + 1):
+        counts = {}
+        for tokens in streams:
+            for i in range(len(tokens) - n + 1):
+                if n > 1:
+                    # Both (n-1)-word sub-phrases must be frequent already
+                    head = ' '.join(tokens[i:i + n - 1])
+                    if head not in previous or ' '.join(tokens[i + 1:i + n]) not in previous:
+                        continue
+                    phrase = head + ' ' + tokens[i + n - 1]
+                else:
+                    phrase = tokens[i]
+                counts[phrase] = counts.get(phrase, 0) + 1
+        previous = {phrase: count for phrase, count in counts.items() if count >= min_count}
+        if not previous:
+            break
+        frequent.update(previous)
+    return frequent
+
+
+def build_suggest_index(corpus_path, out_path):
+    """Count the common phrases of corpus.pack, returns the meta dict"""
+    corpus = Corpus(corpus_path)
+    try:
+        streams = list(video_tokens(corpus))
+        corpus_built_at = corpus.meta['built_at']
+    finally:
+        corpus.close()
+
+    counts = count_phrases(streams)
+    phrases = sorted(counts, key=lambda phrase: phrase.encode('utf-8'))
+    meta = {
+        'version': INDEX_VERSION,
+        'phrases': len(phrases),
+        'max_words': MAX_WORDS,
+        'min_count': MIN_COUNT,
+        'corpus_built_at': corpus_built_at,
+        'built_at': int(time.time())
+    }
+    write_pack(out_path, {
+        'meta': (JSON, meta),
+        'phrases': (STRINGS, phrases),
+        'counts': (U32, array('I', (counts[phrase] for phrase in phrases)))
+    })
+    return meta
+
+
+def index_cache_dir(cache_dir=CACHE_DIR, out_path=None):
+    return build_suggest_index(
+        os.path.join(cache_dir, CORPUS_FILE),
+        out_path or os.path.join(cache_dir, INDEX_FILE)
+    )
+
+
+def normalize_prefix(text):
+    """Typed text as a phrase prefix: folded words, one space, trailing space kept"""
+    prefix = ' '.join(tokenize(text))
+    if prefix and text[-1:].isspace():
+        prefix += ' '
+    return prefix
+
+
+class SuggestIndex:
+    """Memory-mapped suggest_index.pack reader"""
+
+    def __init__(self, path):
+        self.pack = PackFile(path)
+        self.meta = self.pack.json('meta')
+        self.phrases = self.pack.strings('phrases')
+        self.counts = self.pack.u32('counts')
+
+    def _lower_bound(self, key):
+        low, high = 0, len(self.phrases)
+        while low < high:
+            mid = (low + high) // 2
+            if bytes(self.phrases.raw(mid)) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def suggest(self, text, limit=10):
+        """[(phrase, count)] most frequent phrases starting with the typed text"""
+        prefix = normalize_prefix(text)
+        if not prefix:
+            return []
+        key = prefix.encode('utf-8')
+        # Everything starting with key sorts before key + 0xff
+        start, end = self._lower_bound(key), self._lower_bound(key + b'\xff')
+        best = heapq.nlargest(limit, range(start, end), key=lambda i: self.counts[i])
+        return [(self.phrases[i], self.counts[i]) for i in best]
+
+    def close(self):
+        self.pack.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the phrase autocomplete table')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--corpus', help=f'corpus file (default: <cache-dir>/{CORPUS_FILE})')
+    parser.add_argument('--out', help=f'output file (default: <cache-dir>/{INDEX_FILE})')
+    parser.add_argument('--query', help='complete a typed prefix from an existing table instead')
+    args = parser.parse_args()
+
+    corpus_path = args.corpus or os.path.join(args.cache_dir, CORPUS_FILE)
+    index_path = args.out or os.path.join(args.cache_dir, INDEX_FILE)
+
+    started = time.time()
+    if args.query:
+        index = SuggestIndex(index_path)
+        suggestions = [{'phrase': phrase, 'count': count} for phrase, count in index.suggest(args.query)]
+        print(json.dumps({'query': args.query, 'suggestions': suggestions,
+                          'time_ms': round((time.time() - started) * 1000, 3)}, ensure_ascii=False))
+        return
+
+    meta = build_suggest_index(corpus_path, index_path)
+    meta['time_ms'] = int((time.time() - started) * 1000)
+    print(json.dumps(meta))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+const zlib = require('zlib');
+const crypto = require('crypto');
+
+// text_blocks.py 와 같은 형식 / 상수 유지
+const BLOCK_SEGMENTS = 64;
+const DICTIONARY_SIZE = 32 * 1024; // deflate 창 크기, 넘는 부분은 참조되지 않음
+const TRAIN_SEGMENTS = 20000; // 학습에 쓰는 세그먼트 수 (고르게 표본 추출)
+const TRAIN_MAX_WORDS = 3;
+const TRAIN_MIN_COUNT = 4;
+const LEVEL = 9;
+const SEPARATOR = '\0';
+const RECENT_BLOCKS = 32; // segment_text() 가 풀어둔 채로 보관하는 블록 수
+
+/**
+ * 세그먼트 텍스트로 deflate 사전 학습 (text_blocks.py 의 train_dictionary() 와 같은 방식)
+ * 1~3 단어 구문을 (등장 횟수 × 길이) 순으로 32KB 까지, 가장 가치 있는 구문이 끝에 오도록
+ * (데이터와 가까울수록 거리가 짧음)
+ */
+function trainDictionary(texts, size = DICTIONARY_SIZE) {
+  const step = Math.max(1, Math.floor(texts.length / TRAIN_SEGMENTS));
+  const counts = new Map();
+  for (let t = 0; t < texts.length; t += step) {
+    const words = texts[t].split(/\s+/).filter(Boolean);
+    for (let n = 1; n <= TRAIN_MAX_WORDS; n++) {
+      for (let i = 0; i + n <= words.length; i++) {
+        const phrase = words.slice(i, i + n).join(' ');
+        counts.set(phrase, (counts.get(phrase) || 0) + 1);
+      }
+    }
+  }
+
+  const ranked = [];
+  for (const [phrase, count] of counts) {
+    if (count >= TRAIN_MIN_COUNT) ranked.push({ phrase, score: count * phrase.length });
+  }
+  ranked.sort((a, b) => b.score - a.score || (a.phrase < b.phrase ? -1 : a.phrase > b.phrase ? 1 : 0));
+
+  const chosen = [];
+  let used = 0;
+  for (const { phrase } of ranked) {
+    const data = Buffer.from(`${phrase} `, 'utf8');
+    if (used + data.length > size) continue;
+    chosen.push(data);
+    used += data.length;
+  }
+  return Buffer.concat(chosen.reverse());
+}
+
+function dictionaryId(dictionary) {
+  return crypto.createHash('sha1').update(dictionary).digest('hex').slice(0, 16);
+}
+
+/**
+ * raw deflate (dictionary 가 있으면 사전 사용)
+ */
+function compress(data, dictionary = null) {
+  return zlib.deflateRawSync(data, dictionary && dictionary.length > 0 ? { level: LEVEL, dictionary } : { level: LEVEL });
+}
+
+function decompress(data, dictionary = null) {
+  return zlib.inflateRawSync(data, dictionary && dictionary.length > 0 ? { dictionary } : {});
+}
+
+/**
+ * 한 영상의 연속된 세그먼트 텍스트 (최대 BLOCK_SEGMENTS 개) → 압축 블록
+ */
+function packBlock(texts, dictionary = null) {
+  return compress(Buffer.from(texts.join(SEPARATOR), 'utf8'), dictionary);
+}
+
+function unpackBlock(data, dictionary = null) {
+  return decompress(data, dictionary).toString('utf8').split(SEPARATOR);
+}
+
+/**
+ * SQLite 함수 segment_text(data, dictionary_id, dictionary, slot) 등록 (better-sqlite3 연결마다)
+ * fast_search.db 의 segment_content 뷰가 블록에서 세그먼트 텍스트 하나를 꺼낼 때 사용
+ * 하이라이트 + 본문, 같은 블록의 여러 결과처럼 같은 블록을 연달아 푸는 일이 많아서 최근 블록은 풀어둔 채로 보관
+ */
+function registerTextFunctions(db) {
+  const recent = new Map();
+  db.function('segment_text', { deterministic: true }, (data, dictionaryId, dictionary, slot) => {
+    const key = `${dictionaryId}:${data.toString('latin1')}`;
+    let texts = recent.get(key);
+    if (!texts) {
+      texts = unpackBlock(data, dictionary);
+      recent.set(key, texts);
+      if (recent.size > RECENT_BLOCKS) recent.delete(recent.keys().next().value);
+    }
+    return slot < texts.length ? texts[slot] : null;
+  });
+}
+
+module.exports = {
+  BLOCK_SEGMENTS,
+  trainDictionary,
+  dictionaryId,
+  compress,
+  decompress,
+  packBlock,
+  unpackBlock,
+  registerTextFunctions
+};
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Dictionary-compressed caption text
+Segment texts are stored as raw deflate streams primed with a preset
+dictionary trained on the corpus itself: the most valuable 1-3 word phrases
+(occurrences x length) packed into zlib's 32 KB window, most valuable last so
+they sit closest to the data. Short caption blocks then compress almost as
+well as one big stream, while a reader still inflates only the block it needs.
+
+A block is the UTF-8 texts of up to BLOCK_SEGMENTS consecutive segments of one
+video joined by NUL. The same format is read and written by text-blocks.js;
+dictionaries are stored next to the data they prime (fast_search.db table
+text_dictionaries, transcript-store dictionary-<id>.bin), never in code.
+
+Usage:
+    python text_blocks.py [--cache-dir DIR]    report block sizes for corpus.pack
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+import zlib
+from collections import Counter
+
+BLOCK_SEGMENTS = 64
+DICTIONARY_SIZE = 32 * 1024   # deflate window, anything larger is never referenced
+TRAIN_SEGMENTS = 20000        # texts sampled (evenly) when training
+TRAIN_MAX_WORDS = 3
+TRAIN_MIN_COUNT = 4
+LEVEL = 9
+SEPARATOR = '\0'
+RECENT_BLOCKS = 32            # blocks segment_text() keeps inflated
+
+
+def train_dictionary(texts, size=DICTIONARY_SIZE):
+    """Preset dictionary from a list of segment texts; keep in sync with trainDictionary() in text-blocks.js"""
+    step = max(1, len(texts) // TRAIN_SEGMENTS)
+    counts = Counter()
+    for text in texts[::step]:
+        words = text.split()
+        for n in range(1, TRAIN_MAX_WORDS + 1):
+            for i in range(len(words) - n + 1):
+                counts[' '.join(words[i:i + n])] += 1
+
+    ranked = sorted(
+        ((count * len(phrase), phrase) for phrase, count in counts.items() if count >= TRAIN_MIN_COUNT),
+        key=lambda entry: (-entry[0], entry[1])
+    )
+    chosen, used = [], 0
+    for _, phrase in ranked:
+        data = (phrase + ' ').encode('utf-8')
+        if used + len(data) > size:
+            continue
+        chosen.append(data)
+        used += len(data)
+    # deflate reaches the end of the dictionary with the shortest distances
+    chosen.reverse()
+    return b''.join(chosen)
+
+
+def dictionary_id(dictionary):
+    return hashlib.sha1(dictionary).hexdigest()[:16]
+
+
+def compress(data, dictionary=None):
+    """Raw deflate of bytes, primed with dictionary when given"""
+    if dictionary:
+        compressor = zlib.compressobj(LEVEL, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, dictionary)
+    else:
+        compressor = zlib.compressobj(LEVEL, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress(data, dictionary=None):
+    decompressor = zlib.decompressobj(-15, zdict=dictionary) if dictionary else zlib.decompressobj(-15)
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+def pack_block(texts, dictionary=None):
+    return compress(SEPARATOR.join(texts).encode('utf-8'), dictionary)
+
+
+def unpack_block(data, dictionary=None):
+    return decompress(data, dictionary).decode('utf-8').split(SEPARATOR)
+
+
+def register_functions(db):
+    """SQL function segment_text(data, dictionary_id, dictionary, slot) behind the
+    fast_search.db segment_content view; same as registerTextFunctions() in text-blocks.js"""
+    recent = {}
+
+    def segment_text(data, dictionary_id, dictionary, slot):
+        key = (dictionary_id, data)
+        texts = recent.get(key)
+        if texts is None:
+            texts = recent[key] = unpack_block(data, dictionary)
+            if len(recent) > RECENT_BLOCKS:
+                del recent[next(iter(recent))]
+        return texts[slot] if slot < len(texts) else None
+
+    db.create_function('segment_text', 4, segment_text, deterministic=True)
+
+
+def blocks(texts):
+    """Consecutive BLOCK_SEGMENTS slices of one video's texts"""
+    for i in range(0, len(texts), BLOCK_SEGMENTS):
+        yield texts[i:i + BLOCK_SEGMENTS]
+
+
+def main():
+    from corpus_pack import CACHE_DIR, CORPUS_FILE, Corpus
+
+    parser = argparse.ArgumentParser(description='Measure dictionary-compressed text blocks on corpus.pack')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    corpus = Corpus(os.path.join(args.cache_dir, CORPUS_FILE))
+    try:
+        videos = [[corpus.texts[s] for s in corpus.segment_range(v)] for v in range(len(corpus))]
+    finally:
+        corpus.close()
+
+    started = time.time()
+    dictionary = train_dictionary([text for texts in videos for text in texts])
+    train_ms = int((time.time() - started) * 1000)
+    started = time.time()
+    plain = packed = count = 0
+    for texts in videos:
+        for block in blocks(texts):
+            plain += len(SEPARATOR.join(block).encode('utf-8'))
+            packed += len(pack_block(block, dictionary))
+            count += 1
+    print(json.dumps({
+        'segments': sum(len(texts) for texts in videos),
+        'blocks': count,
+        'text_bytes': plain,
+        'block_bytes': packed,
+        'dictionary_bytes': len(dictionary),
+        'ratio': round(plain / max(1, packed + len(dictionary)), 2),
+        'train_ms': train_ms,
+        'time_ms': int((time.time() - started) * 1000)
+    }))
+
+
+if __name__ == '__main__':
+    main()
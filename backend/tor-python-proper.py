@@ -1,33 +1,34 @@
 #!/usr/bin/env python3
 import sys
 import json
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-import socks
-import socket
-from youtube_transcript_api import YouTubeTranscriptApi
+import time
 from youtube_transcript_api._errors import (
     TranscriptsDisabled, 
     NoTranscriptFound, 
     VideoUnavailable
 )
 
-def setup_tor_proxy():
-    """Tor SOCKS5 프록시 설정"""
-    print("🌐 Setting up Tor SOCKS5 proxy...")
+from extract_transcript import BLOCKED_ERRORS, format_transcript
+from failure_store import default_store
+from metrics import default_metrics
+from proxy_pool import ProxyPool
+from transcript_languages import select_transcript
+from transcript_store import open_store
+
+def setup_tor_proxy(circuits=2):
+    """Tor SOCKS5 프록시 풀 설정 (socket.socket을 프로세스 전체에 덮어쓰지 않음)"""
+    print("🌐 Setting up Tor SOCKS5 proxy pool...")
     
-    # SOCKS5 프록시 설정
-    socks.set_default_proxy(socks.SOCKS5, "127.0.0.1", 9150)
-    socket.socket = socks.socksocket
+    pool = ProxyPool(size=circuits)
     
-    print("✅ Tor proxy configured successfully")
+    print(f"✅ Tor proxy pool configured successfully ({circuits} circuits)")
+    return pool
 
-def test_tor_connection():
+def test_tor_connection(endpoint):
     """Tor 연결 테스트"""
     try:
         print("🔧 Testing Tor connection...")
-        response = requests.get('https://httpbin.org/ip', timeout=10)
+        response = endpoint.session.get('https://httpbin.org/ip', timeout=10)
         ip_info = response.json()
         print(f"✅ Tor working! Current IP: {ip_info['origin']}")
         return True
@@ -35,49 +36,60 @@ def test_tor_connection():
         print(f"❌ Tor connection failed: {e}")
         return False
 
-def extract_transcript_with_tor(video_id):
-    """Tor 프록시를 통한 transcript 추출"""
-    print(f"\n🎯 Extracting transcript for {video_id} via Tor...\n")
+def extract_transcript_with_tor(video_id, pool=None):
+    """Tor 프록시를 통한 transcript 추출 (차단되면 circuit을 바꿔 재시도)"""
+    # 0. 최근에 실패한 영상이면 네트워크 요청 없이 건너뜀
+    failures = default_store()
+    known_failure = failures.check(video_id)
+    if known_failure:
+        return failures.skipped_result(video_id, known_failure)
+    
+    # 1. Tor 프록시 설정
+    pool = pool or setup_tor_proxy()
+    
+    metrics = default_metrics()
+    with metrics.record("extract", video_id=video_id, method="python-tor-proxy") as record:
+        result = None
+        for _ in range(len(pool.endpoints)):
+            endpoint = pool.acquire()
+            started = time.monotonic()
+            result = _extract_with_endpoint(video_id, endpoint)
+            error_type = result.pop("error_type", None)
+            blocked = error_type in BLOCKED_ERRORS
+            pool.release(endpoint, result["success"], blocked, time.monotonic() - started)
+            if not blocked:
+                break
+            print(f"🔄 {endpoint.name} blocked - rotating circuit and retrying")
+        # 마지막 시도 결과만 기록 (circuit 을 바꿔 재시도한 중간 실패는 영상 탓이 아님)
+        failures.record({"video_id": video_id, **result, "error_type": error_type})
+        metrics.count_result({**result, "error_type": error_type})
+        record["success"] = result["success"]
+        record["error_type"] = error_type
+    
+    return result
+
+def _extract_with_endpoint(video_id, endpoint):
+    print(f"\n🎯 Extracting transcript for {video_id} via Tor ({endpoint.name})...\n")
     
     try:
-        # 1. Tor 프록시 설정
-        setup_tor_proxy()
-        
         # 2. Tor 연결 테스트
-        if not test_tor_connection():
-            return {"success": False, "error": "Tor connection failed"}
+        if not test_tor_connection(endpoint):
+            return {"success": False, "error": "Tor connection failed", "error_type": "ConnectionError"}
         
         # 3. Transcript 추출 시도
         print("🔧 Attempting transcript extraction...")
         
-        # 먼저 사용 가능한 언어 확인
+        # 목록 한 번 조회 후 선호 언어 선택 (영어 수동 자막 > 영어 자동 자막 > 기타)
         try:
-            available_transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
-            print(f"📋 Available transcripts found for {video_id}")
-            
-            # 영어 transcript 찾기
-            transcript = None
-            for t in available_transcripts:
-                print(f"   - {t.language} ({t.language_code})")
-                if t.language_code in ['en', 'en-US', 'en-GB']:
-                    transcript = t.fetch()
-                    print(f"✅ Using {t.language} transcript")
-                    break
+            transcript, track = select_transcript(endpoint.api, video_id, proxies=endpoint.proxies)
+            if transcript is None:
+                return {"success": False, "error": "No transcripts available for this video", "error_type": "NoTranscriptFound"}
             
-            # 영어가 없으면 첫 번째 transcript 사용
-            if not transcript:
-                first_transcript = next(iter(available_transcripts))
-                transcript = first_transcript.fetch()
-                print(f"⚠️ Using {first_transcript.language} transcript (fallback)")
+            kind = "auto-generated" if track["is_generated"] else "manual"
+            print(f"✅ Using {track['language']} ({track['language_code']}, {kind}) transcript")
             
             # 4. 결과 포맷팅
-            formatted_transcript = []
-            for item in transcript:
-                formatted_transcript.append({
-                    "start": int(float(item['start'])),
-                    "duration": int(float(item.get('duration', 0))),
-                    "text": item['text'].strip()
-                })
+            formatted_transcript = format_transcript(transcript)
             
             print(f"✅ Successfully extracted {len(formatted_transcript)} segments")
             
@@ -95,26 +107,29 @@ def extract_transcript_with_tor(video_id):
                 "method": "python-tor-proxy"
             }
             
-            # 7. 캐시에 저장
+            # 7. 공유 transcript-store 에 저장 (다른 추출기의 결과는 덮어쓰지 않음)
             try:
-                cache_file = f"transcript-cache/{video_id}_python_tor.json"
-                with open(cache_file, 'w', encoding='utf-8') as f:
-                    json.dump(result, f, indent=2, ensure_ascii=False)
-                print(f"\n💾 Saved to cache: {cache_file}")
+                store = open_store()
+                entry = store.entry(video_id)
+                if entry and entry['method'] != result['method']:
+                    print(f"\n💾 Kept stored {entry['method']} transcript for {video_id}")
+                else:
+                    store.put_result(result)
+                    print(f"\n💾 Saved to transcript-store: {video_id}")
             except Exception as save_error:
                 print(f"⚠️ Could not save to cache: {save_error}")
             
             return result
             
         except NoTranscriptFound:
-            return {"success": False, "error": "No transcripts available for this video"}
+            return {"success": False, "error": "No transcripts available for this video", "error_type": "NoTranscriptFound"}
         except TranscriptsDisabled:
-            return {"success": False, "error": "Transcripts are disabled for this video"}
+            return {"success": False, "error": "Transcripts are disabled for this video", "error_type": "TranscriptsDisabled"}
         except VideoUnavailable:
-            return {"success": False, "error": "Video is unavailable"}
+            return {"success": False, "error": "Video is unavailable", "error_type": "VideoUnavailable"}
             
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        return {"success": False, "error": str(e), "error_type": type(e).__name__}
 
 def main():
     if len(sys.argv) < 2:
@@ -6,89 +6,107 @@ IP 블록을 우회하여 안전하게 transcript 추출
 
 import sys
 import json
-import requests
-from youtube_transcript_api import YouTubeTranscriptApi
+import time
 from youtube_transcript_api._errors import (
     TranscriptsDisabled, 
     NoTranscriptFound, 
     VideoUnavailable
 )
 
+from extract_transcript import BLOCKED_ERRORS, format_transcript
+from failure_store import default_store
+from metrics import default_metrics
+from proxy_pool import ProxyPool, TOR_HOST, TOR_SOCKS_PORT
+from transcript_languages import DEFAULT_LANGUAGES, select_transcript
+
 class TorTranscriptExtractor:
-    def __init__(self):
-        # Tor Browser SOCKS5 프록시 설정
-        self.proxies = {
-            'http': 'socks5://127.0.0.1:9150',
-            'https': 'socks5://127.0.0.1:9150'
-        }
+    def __init__(self, circuits=4, languages=None):
+        # 선호 언어 순서 (앞쪽이 우선)
+        self.languages = languages or DEFAULT_LANGUAGES
+        
+        # 실패 기록 (알려진 실패 영상은 네트워크 요청 없이 건너뜀)
+        self.failures = default_store()
         
-        # YouTube Transcript API에 프록시 적용을 위한 세션 설정
-        self.session = requests.Session()
-        self.session.proxies.update(self.proxies)
+        # Tor Browser SOCKS5 프록시 위에 격리된 circuit N개 (keep-alive 세션 포함)
+        self.pool = ProxyPool(size=circuits)
         
-        print("🌐 Tor proxy configured: 127.0.0.1:9150")
+        print(f"🌐 Tor proxy pool configured: {TOR_HOST}:{TOR_SOCKS_PORT} x {circuits} circuits")
         
     def test_tor_connection(self):
         """Tor 연결 테스트"""
+        endpoint = self.pool.acquire()
         try:
             print("🔧 Testing Tor connection...")
-            response = self.session.get('https://httpbin.org/ip', timeout=10)
+            response = endpoint.session.get('https://httpbin.org/ip', timeout=10)
             ip_data = response.json()
             print(f"✅ Tor working! Current IP: {ip_data['origin']}")
             return True
         except Exception as e:
             print(f"❌ Tor connection failed: {e}")
             return False
+        finally:
+            self.pool.release(endpoint, True)
     
     def extract_transcript(self, video_id):
-        """Tor 프록시를 통한 transcript 추출"""
+        """Tor 프록시를 통한 transcript 추출 (차단되면 다른 circuit으로 재시도)"""
+        known_failure = self.failures.check(video_id)
+        if known_failure:
+            result = self.failures.skipped_result(video_id, known_failure)
+            result['method'] = 'tor-proxy'
+            print(f"⏩ {result['error']}")
+            return result
+        
+        metrics = default_metrics()
+        with metrics.record('extract', video_id=video_id, method='tor-proxy') as record:
+            result = None
+            for _ in range(len(self.pool.endpoints)):
+                endpoint = self.pool.acquire()
+                started = time.monotonic()
+                result = self._extract_with_endpoint(video_id, endpoint)
+                blocked = result.get('error_type') in BLOCKED_ERRORS
+                self.pool.release(endpoint, result['success'], blocked, time.monotonic() - started)
+                if not blocked:
+                    break
+                print(f"🔄 {endpoint.name} blocked - rotating circuit and retrying")
+            
+            self.failures.record(result)
+            metrics.count_result(result)
+            record['success'] = result['success']
+            record['error_type'] = result.pop('error_type', None)
+        return result
+    
+    def _extract_with_endpoint(self, video_id, endpoint):
         try:
             print(f"\n🎬 Extracting transcript for: {video_id}")
-            print(f"🌐 Using Tor proxy: 127.0.0.1:9150")
+            print(f"🌐 Using Tor circuit: {endpoint.name}")
             
-            # 다양한 언어 옵션으로 시도
-            language_options = ['en', 'en-US', 'en-GB', 'ko', 'auto']
+            # 목록 한 번만 조회해서 선호 언어 순서대로 선택 (수동 자막 우선)
+            result, track = select_transcript(
+                endpoint.api, video_id, self.languages, proxies=endpoint.proxies
+            )
             
-            for lang in language_options:
-                try:
-                    print(f"🔍 Trying language: {lang}")
-                    
-                    if lang == 'auto':
-                        # 자동 감지 (첫 번째 사용 가능한 언어)
-                        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-                        transcript = transcript_list.find_transcript(['en', 'en-US', 'en-GB', 'ko'])
-                        result = transcript.fetch()
-                    else:
-                        result = YouTubeTranscriptApi.get_transcript(video_id, languages=[lang])
-                    
-                    if result:
-                        formatted_result = []
-                        for item in result:
-                            formatted_result.append({
-                                'start': int(item['start']),
-                                'duration': int(item.get('duration', 0)),
-                                'text': item['text'].replace('\n', ' ').strip()
-                            })
-                        
-                        print(f"✅ SUCCESS with {lang}! Extracted {len(formatted_result)} segments")
-                        
-                        return {
-                            'success': True,
-                            'video_id': video_id,
-                            'language': lang,
-                            'segments': len(formatted_result),
-                            'transcript': formatted_result,
-                            'method': 'tor-proxy'
-                        }
-                        
-                except Exception as lang_error:
-                    print(f"⚠️ {lang} failed: {str(lang_error)[:50]}...")
-                    continue
+            if result:
+                formatted_result = format_transcript(result)
+                
+                lang = track['language_code']
+                kind = 'auto-generated' if track['is_generated'] else 'manual'
+                print(f"✅ SUCCESS with {lang} ({kind})! Extracted {len(formatted_result)} segments")
+                
+                return {
+                    'success': True,
+                    'video_id': video_id,
+                    'language': lang,
+                    'is_generated': track['is_generated'],
+                    'segments': len(formatted_result),
+                    'transcript': formatted_result,
+                    'method': 'tor-proxy'
+                }
             
             return {
                 'success': False,
                 'video_id': video_id,
                 'error': 'No supported language found',
+                'error_type': 'NoTranscriptFound',
                 'method': 'tor-proxy'
             }
             
@@ -97,6 +115,7 @@ class TorTranscriptExtractor:
                 'success': False,
                 'video_id': video_id,
                 'error': 'Transcripts disabled for this video',
+                'error_type': 'TranscriptsDisabled',
                 'method': 'tor-proxy'
             }
         except NoTranscriptFound:
@@ -104,6 +123,7 @@ class TorTranscriptExtractor:
                 'success': False,
                 'video_id': video_id,
                 'error': 'No transcript found',
+                'error_type': 'NoTranscriptFound',
                 'method': 'tor-proxy'
             }
         except VideoUnavailable:
@@ -111,6 +131,7 @@ class TorTranscriptExtractor:
                 'success': False,
                 'video_id': video_id,
                 'error': 'Video unavailable',
+                'error_type': 'VideoUnavailable',
                 'method': 'tor-proxy'
             }
         except Exception as e:
@@ -118,6 +139,7 @@ class TorTranscriptExtractor:
                 'success': False,
                 'video_id': video_id,
                 'error': f'Unexpected error: {str(e)}',
+                'error_type': type(e).__name__,
                 'method': 'tor-proxy'
             }
 
@@ -0,0 +1,159 @@
+const fs = require('fs');
+const path = require('path');
+const crypto = require('crypto');
+const { decompress } = require('./text-blocks');
+
+const STORE_DIR = path.join(__dirname, '..', 'transcript-store');
+const ENCODING = 'deflate';
+
+// 사전 파일 경로 → 내용 (사전은 한 번 쓰면 바뀌지 않음)
+const dictionaries = new Map();
+
+function readDictionary(filePath) {
+  if (!dictionaries.has(filePath)) {
+    dictionaries.set(filePath, fs.readFileSync(filePath));
+  }
+  return dictionaries.get(filePath);
+}
+
+function dictionaryPath(dir, dictionary) {
+  return dictionary ? path.join(dir, `dictionary-${dictionary}.bin`) : null;
+}
+
+/**
+ * 저장된 바이트 → transcript (압축된 항목이면 사전으로 풀고, 푼 JSON 의 sha1 이 hash 와 다르면 예외)
+ * entry: { hash, offset, encoding } - fast-search-worker.js 의 spec 도 같은 필드
+ */
+function decodeObject(entry, data, dictionaryFile) {
+  if (entry.encoding === ENCODING) {
+    data = decompress(data, dictionaryFile ? readDictionary(dictionaryFile) : null);
+  }
+  const hash = crypto.createHash('sha1').update(data).digest('hex');
+  if (hash !== entry.hash) {
+    throw new Error(`Corrupt transcript-store object at ${entry.offset}`);
+  }
+  return JSON.parse(data.toString('utf8'));
+}
+
+/**
+ * transcript_store.py 가 관리하는 공유 저장소 읽기 전용 로더
+ * manifest.json 으로 영상을 찾고 transcripts.dat 에서 해당 구간만 읽음 (압축된 항목은 그 영상만 풀기)
+ * (쓰기는 Python 쪽에서만 - 파일 잠금을 한 곳에서 처리)
+ */
+class TranscriptStore {
+  constructor(dir = STORE_DIR) {
+    this.dir = dir;
+    this.manifestPath = path.join(dir, 'manifest.json');
+    this.dataPath = path.join(dir, 'transcripts.dat');
+    this.manifestMtime = 0;
+    this.refresh();
+  }
+
+  /**
+   * manifest.json 이 없으면 null
+   */
+  static load(dir = STORE_DIR) {
+    if (!fs.existsSync(path.join(dir, 'manifest.json'))) {
+      return null;
+    }
+    return new TranscriptStore(dir);
+  }
+
+  /**
+   * 다른 프로세스가 manifest 를 바꿨으면 다시 읽기
+   */
+  refresh() {
+    const mtime = fs.statSync(this.manifestPath).mtimeMs;
+    if (mtime !== this.manifestMtime) {
+      this.manifest = JSON.parse(fs.readFileSync(this.manifestPath, 'utf8'));
+      this.manifestMtime = mtime;
+    }
+    return this;
+  }
+
+  get version() {
+    return this.manifest.updated_at;
+  }
+
+  /**
+   * { videos, segments } - Python 쪽이 쓸 때마다 갱신 (예전 manifest 면 한 번 계산)
+   */
+  get totals() {
+    if (!this.manifest.totals) {
+      const entries = Object.values(this.manifest.videos);
+      this.manifest.totals = {
+        videos: entries.length,
+        segments: entries.reduce((sum, entry) => sum + entry.segments, 0)
+      };
+    }
+    return this.manifest.totals;
+  }
+
+  get videoCount() {
+    return this.totals.videos;
+  }
+
+  has(videoId) {
+    return Object.prototype.hasOwnProperty.call(this.manifest.videos, videoId);
+  }
+
+  entry(videoId) {
+    return this.has(videoId) ? this.manifest.videos[videoId] : null;
+  }
+
+  /**
+   * 항목의 압축 사전 파일 경로 (압축되지 않은 항목이면 null)
+   */
+  dictionaryPath(entry) {
+    return dictionaryPath(this.dir, entry.dictionary);
+  }
+
+  /**
+   * 저장된 바이트 → 세그먼트 배열 (sha1 이 manifest 와 다르면 예외)
+   */
+  decode(entry, data) {
+    return decodeObject(entry, data, this.dictionaryPath(entry));
+  }
+
+  /**
+   * 영상 하나의 세그먼트 배열 (없으면 null)
+   */
+  get(videoId) {
+    const entry = this.entry(videoId);
+    if (!entry) return null;
+
+    const data = Buffer.alloc(entry.length);
+    const fd = fs.openSync(this.dataPath, 'r');
+    try {
+      fs.readSync(fd, data, 0, entry.length, entry.offset);
+    } finally {
+      fs.closeSync(fd);
+    }
+    return this.decode(entry, data);
+  }
+
+  /**
+   * 영상 ID 순서로 { id, title, method, transcript } 배열, 데이터 파일은 한 번만 읽음
+   */
+  readAll(limit = Infinity) {
+    const data = fs.readFileSync(this.dataPath);
+    const videos = [];
+    for (const videoId of Object.keys(this.manifest.videos).sort()) {
+      if (videos.length >= limit) break;
+      const entry = this.manifest.videos[videoId];
+      try {
+        videos.push({
+          id: videoId,
+          title: entry.title,
+          method: entry.method,
+          transcript: this.decode(entry, data.subarray(entry.offset, entry.offset + entry.length))
+        });
+      } catch (error) {
+        console.log(`⚠️ Skipping ${videoId}: ${error.message}`);
+      }
+    }
+    return videos;
+  }
+}
+
+module.exports = { TranscriptStore, STORE_DIR, decodeObject };
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Transcript language negotiation
+A cached per-video manifest of available captions picks the track, so the
+list call only happens for new videos (or when the cached pick went stale),
+and a preference order where manual captions beat auto-generated ones.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from youtube_transcript_api import YouTubeTranscriptApi
+from youtube_transcript_api._errors import NoTranscriptFound, TranscriptsDisabled
+
+from metrics import default_metrics
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'transcript-cache')
+MANIFEST_PATH = os.path.join(CACHE_DIR, 'language_manifest.db')
+LEGACY_MANIFEST_PATH = os.path.join(CACHE_DIR, 'language_manifest.json')
+
+DEFAULT_LANGUAGES = ['en', 'en-US', 'en-GB', 'ko']
+
+
+def list_transcripts(api, video_id, proxies=None):
+    """TranscriptList for a video under either API format"""
+    if hasattr(api, 'list'):
+        return api.list(video_id)
+    # Old API format: static method, proxies passed per call
+    return YouTubeTranscriptApi.list_transcripts(video_id, proxies=proxies)
+
+
+def _raw(fetch):
+    metrics = default_metrics()
+    with metrics.stage('fetch'):  # HTTP request plus caption XML parsing
+        fetched = fetch()
+    if hasattr(fetched, 'to_raw_data'):
+        with metrics.stage('parse'):
+            return fetched.to_raw_data()
+    return fetched
+
+
+def fetch_raw(transcript):
+    """Fetch a Transcript as a list of {'start', 'duration', 'text'} dicts"""
+    return _raw(transcript.fetch)
+
+
+def can_fetch_track(api):
+    """Whether the API can fetch a language directly (0.x static API or 1.x fetch())"""
+    return hasattr(api, 'fetch') or not hasattr(api, 'list')
+
+
+def fetch_track(api, video_id, entry, proxies=None):
+    """Fetch a known manifest entry without building a TranscriptList ourselves
+
+    youtube-transcript-api still resolves the signed caption URL for the
+    language internally; what this skips is listing, ranking and re-caching
+    every track. Manual beats generated for the same code, as in choose_language.
+    """
+    code = entry['language_code']
+    if hasattr(api, 'fetch'):
+        return _raw(lambda: api.fetch(video_id, languages=[code]))
+    return _raw(lambda: YouTubeTranscriptApi.get_transcript(video_id, languages=[code], proxies=proxies))
+
+
+def build_manifest(transcript_list):
+    """Plain description of every caption track a video offers"""
+    return [
+        {
+            'language_code': t.language_code,
+            'language': t.language,
+            'is_generated': bool(t.is_generated)
+        }
+        for t in transcript_list
+    ]
+
+
+def choose_language(manifest, languages=None):
+    """Best manifest entry for a preference order, or None if there are no captions
+
+    Ranking: language family in preference order ('en-US' counts as 'en'),
+    then manual over auto-generated, then exact code in preference order.
+    Tracks outside the preference list are only used if nothing else exists.
+    """
+    languages = languages or DEFAULT_LANGUAGES
+    families = list(dict.fromkeys(code.split('-')[0].lower() for code in languages))
+    exact = [code.lower() for code in languages]
+
+    def rank(entry):
+        code = entry['language_code'].lower()
+        family = code.split('-')[0]
+        return (
+            families.index(family) if family in families else len(families),
+            entry['is_generated'],
+            exact.index(code) if code in exact else len(exact)
+        )
+
+    return min(manifest, key=rank) if manifest else None
+
+
+class LanguageManifestCache:
+    """Per-video caption manifests kept in SQLite across runs
+
+    One row per video, so recording a manifest is a single upsert instead of
+    rewriting every manifest. Videos without any captions are remembered for
+    empty_ttl seconds, after which they are listed again in case captions
+    were added.
+    """
+
+    def __init__(self, path=MANIFEST_PATH, empty_ttl=7 * 24 * 3600, legacy_path=LEGACY_MANIFEST_PATH):
+        self.path = path
+        self.empty_ttl = empty_ttl
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS manifests (
+                video_id TEXT PRIMARY KEY,
+                languages TEXT NOT NULL,
+                checked_at INTEGER NOT NULL
+            )
+        ''')
+        self.db.commit()
+        self._import_legacy(legacy_path)
+
+    def _import_legacy(self, legacy_path):
+        """Move manifests from the old single-JSON-file cache, then drop the file"""
+        if not legacy_path:
+            return
+        try:
+            with open(legacy_path, encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self.lock:
+            self.db.executemany(
+                'INSERT OR IGNORE INTO manifests (video_id, languages, checked_at) VALUES (?, ?, ?)',
+                [(video_id, json.dumps(entry['languages'], ensure_ascii=False), entry['checked_at'])
+                 for video_id, entry in entries.items()]
+            )
+            self.db.commit()
+        os.remove(legacy_path)
+
+    def get(self, video_id):
+        with self.lock:
+            row = self.db.execute(
+                'SELECT languages, checked_at FROM manifests WHERE video_id = ?', (video_id,)
+            ).fetchone()
+        if not row:
+            return None
+        languages = json.loads(row[0])
+        if not languages and time.time() - row[1] > self.empty_ttl:
+            return None
+        return languages
+
+    def put(self, video_id, manifest):
+        with self.lock:
+            self.db.execute(
+                'INSERT OR REPLACE INTO manifests (video_id, languages, checked_at) VALUES (?, ?, ?)',
+                (video_id, json.dumps(manifest, ensure_ascii=False), int(time.time()))
+            )
+            self.db.commit()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LanguageManifestCache()
+        return _default_cache
+
+
+def select_transcript(api, video_id, languages=None, cache=None, proxies=None):
+    """Pick and fetch the best caption track, listing tracks only when needed
+
+    Returns (raw_segments, manifest_entry), or (None, None) when the video
+    has no captions at all. A cached manifest picks the track without a list
+    call (an empty one short-circuits without touching the network); the
+    video is listed again only on a cache miss or when the cached pick is
+    gone.
+    """
+    cache = cache or default_cache()
+    cached = cache.get(video_id)
+    if cached is not None:
+        entry = choose_language(cached, languages)
+        if entry is None:
+            return None, None
+        if can_fetch_track(api):
+            try:
+                return fetch_track(api, video_id, entry, proxies), entry
+            except (NoTranscriptFound, TranscriptsDisabled):
+                pass  # captions changed since the manifest was cached: list again
+
+    try:
+        with default_metrics().stage('list'):
+            transcript_list = list_transcripts(api, video_id, proxies)
+    except TranscriptsDisabled:
+        cache.put(video_id, [])
+        raise
+    manifest = build_manifest(transcript_list)
+    if manifest != cached:
+        with default_metrics().stage('manifest_cache'):
+            cache.put(video_id, manifest)
+
+    entry = choose_language(manifest, languages)
+    if entry is None:
+        return None, None
+
+    if entry['is_generated']:
+        transcript = transcript_list.find_generated_transcript([entry['language_code']])
+    else:
+        transcript = transcript_list.find_manually_created_transcript([entry['language_code']])
+    return fetch_raw(transcript), entry
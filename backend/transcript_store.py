@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Content-addressed transcript store shared by backend/ and api/
+One append-only data file plus a manifest keyed by video ID, replacing the
+per-extractor *_real.json / *_python_tor.json / *_ytdlp.json copies in
+backend/transcript-cache and api/transcript-cache.
+
+    transcript-store/
+        transcripts.dat        one compact JSON transcript per line, appended
+                               (raw deflate when the entry has an encoding)
+        dictionary-<id>.bin    preset deflate dictionary (text_blocks.py)
+        manifest.json          {"version", "updated_at", "dictionary",
+                                "totals": {"videos", "segments"},
+                                "videos": {video_id: {
+                                   "title", "method", "segments", "hash",
+                                   "offset", "length", ["encoding", "dictionary"],
+                                   "updated_at"}}}
+
+totals is kept up to date by every write, so servers can report corpus size
+without walking the manifest or counting index rows.
+
+Once the store has a dictionary (trained from the first large batch, or by
+compact), new objects are deflated with it; a reader inflates only the videos
+it asks for. compact re-encodes everything with the current dictionary.
+
+The hash is the sha1 of the uncompressed JSON, so an unchanged transcript is
+never written twice, index builders can skip videos whose hash they already
+indexed, and readers can verify what they inflated. Writers append (and write
+any new dictionary) first and then swap in the new manifest, so readers
+(transcript-store.js, corpus_pack.py) never see a half-written entry.
+
+Usage:
+    python transcript_store.py import [DIR ...] [--prune]
+    python transcript_store.py put [FILE|- ...]   extractor result JSON (array or one per line)
+    python transcript_store.py stats
+    python transcript_store.py compact
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from text_blocks import compress, decompress, dictionary_id, train_dictionary
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.path.join(os.path.dirname(BACKEND_DIR), 'transcript-store')
+LEGACY_DIRS = [
+    os.path.join(BACKEND_DIR, 'transcript-cache'),
+    os.path.join(os.path.dirname(BACKEND_DIR), 'api', 'transcript-cache')
+]
+MANIFEST_FILE = 'manifest.json'
+DATA_FILE = 'transcripts.dat'
+LOCK_FILE = 'store.lock'
+STORE_VERSION = 1
+ENCODING = 'deflate'
+TRAIN_MIN_SEGMENTS = 2000  # smaller writes stay plain JSON until a bigger batch or compact trains a dictionary
+OBJECT_KEYS = ('offset', 'length', 'encoding', 'dictionary')
+
+# Cache file suffixes worth importing, best source first
+# (_synthetic / _known hold placeholder text, not real captions)
+LEGACY_SUFFIXES = ['_real', '_python_tor', '_ytdlp', '_tor', '_manual', '_proxy']
+
+
+def encode_transcript(transcript):
+    return json.dumps(transcript, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def placeholder_title(video_id):
+    return f'Video {video_id}'
+
+
+def result_video(result, method=None):
+    """(video_id, title, method, transcript) from an extractor result / cache file dict
+
+    title is None when the dict has none; the store then keeps the stored title.
+    """
+    video_id = result.get('video_id') or result.get('videoId')
+    title = result.get('video_title') or result.get('videoTitle')
+    return video_id, title, method or result.get('method') or 'python-real', result['transcript']
+
+
+def dictionary_file(dictionary):
+    return f'dictionary-{dictionary}.bin'
+
+
+def count_totals(videos):
+    return {'videos': len(videos), 'segments': sum(e['segments'] for e in videos.values())}
+
+
+def is_store(path):
+    return os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+
+class TranscriptStore:
+    """Append-only transcript data file plus an atomically replaced manifest"""
+
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+        self.data_path = os.path.join(path, DATA_FILE)
+        self.manifest_path = os.path.join(path, MANIFEST_FILE)
+        self.lock = threading.Lock()
+        self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {'version': STORE_VERSION, 'updated_at': 0, 'videos': {}}
+        if 'totals' not in self.manifest:  # written before totals existed
+            self.manifest['totals'] = count_totals(self.manifest['videos'])
+        # hash -> stored location and encoding, so identical content is stored once
+        self.objects = {
+            e['hash']: {key: e[key] for key in OBJECT_KEYS if key in e}
+            for e in self.manifest['videos'].values()
+        }
+        self.dictionaries = {}
+
+    @contextmanager
+    def _locked(self):
+        """Serialize writers across threads and processes"""
+        os.makedirs(self.path, exist_ok=True)
+        with self.lock, open(os.path.join(self.path, LOCK_FILE), 'a+b') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                # another process may have written since we last looked
+                self._load_manifest()
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _write_manifest(self):
+        self.manifest['updated_at'] = time.time()
+        tmp_path = f'{self.manifest_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    def _dictionary(self, dictionary):
+        """Dictionary bytes by id (None for plain objects)"""
+        if dictionary is None:
+            return None
+        if dictionary not in self.dictionaries:
+            with open(os.path.join(self.path, dictionary_file(dictionary)), 'rb') as f:
+                self.dictionaries[dictionary] = f.read()
+        return self.dictionaries[dictionary]
+
+    def _train(self, texts):
+        """Train a dictionary and make it the current one (the caller writes the manifest)"""
+        data = train_dictionary(texts)
+        dictionary = dictionary_id(data)
+        path = os.path.join(self.path, dictionary_file(dictionary))
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.dictionaries[dictionary] = data
+        self.manifest['dictionary'] = dictionary
+
+    def _encode(self, data):
+        """(stored bytes, encoding fields) for uncompressed JSON bytes"""
+        dictionary = self.manifest.get('dictionary')
+        if dictionary is None:
+            return data, {}
+        return compress(data, self._dictionary(dictionary)), {'encoding': ENCODING, 'dictionary': dictionary}
+
+    def _inflate(self, entry, data):
+        """Stored bytes back to the JSON bytes the hash was taken of"""
+        if entry.get('encoding') == ENCODING:
+            data = decompress(data, self._dictionary(entry.get('dictionary')))
+        if hashlib.sha1(data).hexdigest() != entry['hash']:
+            raise ValueError(f'Corrupt transcript-store object at {entry["offset"]}')
+        return data
+
+    def _put(self, data_file, video_id, title, method, transcript):
+        """Append (unless identical content exists) and update the in-memory manifest"""
+        data = encode_transcript(transcript)
+        digest = hashlib.sha1(data).hexdigest()
+        current = self.manifest['videos'].get(video_id)
+        # Extractor results carry no title: keep the one imported from the cache files
+        if current and (not title or title == placeholder_title(video_id)):
+            title = current['title']
+        title = title or placeholder_title(video_id)
+        if current and current['hash'] == digest and current['title'] == title:
+            return False
+
+        if digest not in self.objects:
+            stored, encoding = self._encode(data)
+            offset = data_file.seek(0, os.SEEK_END)
+            data_file.write(stored + b'\n')
+            self.objects[digest] = {'offset': offset, 'length': len(stored), **encoding}
+        totals = self.manifest['totals']
+        if current:
+            totals['segments'] -= current['segments']
+        else:
+            totals['videos'] += 1
+        totals['segments'] += len(transcript)
+        self.manifest['videos'][video_id] = {
+            'title': title,
+            'method': method,
+            'segments': len(transcript),
+            'hash': digest,
+            **self.objects[digest],
+            'updated_at': int(time.time())
+        }
+        return True
+
+    def put_many(self, videos):
+        """Store (video_id, title, method, transcript) tuples under one lock and one
+        manifest write, returns how many were new or changed"""
+        videos = list(videos)
+        with self._locked(), open(self.data_path, 'ab') as data_file:
+            if 'dictionary' not in self.manifest and sum(len(v[3]) for v in videos) >= TRAIN_MIN_SEGMENTS:
+                self._train([s['text'] for v in videos for s in v[3]])
+            changed = sum(self._put(data_file, *video) for video in videos)
+            if changed:
+                data_file.flush()
+                os.fsync(data_file.fileno())  # data must be durable before the manifest points at it
+                self._write_manifest()
+        return changed
+
+    def put(self, video_id, title, method, transcript):
+        """Store a transcript, returns True if it was new or changed"""
+        return self.put_many([(video_id, title, method, transcript)]) > 0
+
+    def put_result(self, result, method=None):
+        """Store an extractor result dict ({'video_id'|'videoId', 'transcript', ...})"""
+        return self.put(*result_video(result, method))
+
+    def __contains__(self, video_id):
+        return video_id in self.manifest['videos']
+
+    def __len__(self):
+        return len(self.manifest['videos'])
+
+    def entry(self, video_id):
+        return self.manifest['videos'].get(video_id)
+
+    def _read(self, f, entry):
+        f.seek(entry['offset'])
+        return json.loads(self._inflate(entry, f.read(entry['length'])))
+
+    def get(self, video_id):
+        """Transcript segments for a video, or None"""
+        entry = self.entry(video_id)
+        if not entry:
+            return None
+        with open(self.data_path, 'rb') as f:
+            return self._read(f, entry)
+
+    def iter_videos(self):
+        """(video_id, title, method, transcript) in video ID order, one open file"""
+        videos = self.manifest['videos']
+        with open(self.data_path, 'rb') as f:
+            for video_id in sorted(videos):
+                entry = videos[video_id]
+                yield video_id, entry['title'], entry['method'], self._read(f, entry)
+
+    def totals(self):
+        """{'videos', 'segments'} without walking the manifest"""
+        return dict(self.manifest['totals'])
+
+    def version(self):
+        """Changes whenever any video is added or replaced"""
+        return self.manifest['updated_at']
+
+    def stats(self):
+        videos = self.manifest['videos']
+        return {
+            **self.manifest['totals'],
+            'objects': len({e['hash'] for e in videos.values()}),
+            'dictionary': self.manifest.get('dictionary'),
+            'data_bytes': os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0,
+            'live_bytes': sum(e['length'] + 1 for e in {e['hash']: e for e in videos.values()}.values())
+        }
+
+    def compact(self):
+        """Rewrite the data file without replaced objects, every object deflated
+        with the current dictionary (trained from the stored transcripts if missing)"""
+        with self._locked():
+            videos = self.manifest['videos']
+            if 'dictionary' not in self.manifest and videos:
+                with open(self.data_path, 'rb') as f:
+                    unique = {e['hash']: e for e in videos.values()}.values()
+                    self._train([s['text'] for entry in unique for s in self._read(f, entry)])
+            tmp_path = f'{self.data_path}.{os.getpid()}.tmp'
+            moved = {}
+            with open(self.data_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                for video_id in sorted(videos):
+                    entry = videos[video_id]
+                    if entry['hash'] not in moved:
+                        src.seek(entry['offset'])
+                        stored, encoding = self._encode(self._inflate(entry, src.read(entry['length'])))
+                        moved[entry['hash']] = {'offset': dst.tell(), 'length': len(stored), **encoding}
+                        dst.write(stored + b'\n')
+                    for key in OBJECT_KEYS:
+                        entry.pop(key, None)
+                    entry.update(moved[entry['hash']])
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp_path, self.data_path)
+            self._write_manifest()
+            # Nothing refers to older dictionaries any more
+            current = dictionary_file(self.manifest.get('dictionary'))
+            for path in glob.glob(os.path.join(self.path, 'dictionary-*.bin')):
+                if os.path.basename(path) != current:
+                    os.remove(path)
+        return self.stats()
+
+    def import_legacy(self, directories=None, prune=False):
+        """Import *_real.json & co. from cache directories, returns a summary dict"""
+        directories = directories or LEGACY_DIRS
+        summary = {'files': 0, 'imported': 0, 'unchanged': 0, 'empty': 0, 'pruned': 0}
+        imported_files = []
+        best = {}
+        for directory in directories:
+            for path in glob.glob(os.path.join(directory, '*.json')):
+                name = os.path.basename(path)[:-len('.json')]
+                for rank, suffix in enumerate(LEGACY_SUFFIXES):
+                    if name.endswith(suffix):
+                        video_id = name[:-len(suffix)]
+                        summary['files'] += 1
+                        if video_id not in best or rank < best[video_id][0]:
+                            best[video_id] = (rank, path)
+                        imported_files.append((video_id, path))
+                        break
+
+        videos = []
+        for video_id in sorted(best):
+            path = best[video_id][1]
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not data.get('transcript'):
+                summary['empty'] += 1
+                continue
+            data.setdefault('video_id', video_id)
+            videos.append(result_video(data, data.get('method') or 'json'))
+        summary['imported'] = self.put_many(videos)
+        summary['unchanged'] = len(videos) - summary['imported']
+
+        if prune:
+            for video_id, path in imported_files:
+                if video_id in self:
+                    os.remove(path)
+                    summary['pruned'] += 1
+        return summary
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(path=STORE_DIR):
+    """Shared store instance per path; the default store imports the legacy
+    cache directories the first time it is opened"""
+    path = os.path.abspath(path)
+    with _stores_lock:
+        if path not in _stores:
+            first_run = path == STORE_DIR and not is_store(path)
+            _stores[path] = TranscriptStore(path)
+            if first_run:
+                _stores[path].import_legacy()
+        return _stores[path]
+
+
+def store_for(cache_dir):
+    """The store at cache_dir, or None for a legacy per-file cache directory"""
+    if os.path.abspath(cache_dir) == STORE_DIR or is_store(cache_dir):
+        return open_store(cache_dir)
+    return None
+
+
+def has_video(cache_dir, video_id):
+    """Whether cache_dir (store or legacy directory) already has this video"""
+    store = store_for(cache_dir)
+    if store is not None:
+        return video_id in store
+    return os.path.exists(os.path.join(cache_dir, f'{video_id}_real.json'))
+
+
+def read_results(text):
+    """Extractor result dicts from a JSON array or one JSON object per line"""
+    text = text.strip()
+    if text.startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared transcript store')
+    parser.add_argument('command', choices=['import', 'put', 'stats', 'compact'])
+    parser.add_argument('dirs', nargs='*',
+                        help='import: legacy cache directories; put: extractor result files (- for stdin)')
+    parser.add_argument('--store', default=STORE_DIR)
+    parser.add_argument('--prune', action='store_true',
+                        help='delete legacy cache files once their video is in the store')
+    args = parser.parse_args()
+
+    store = TranscriptStore(args.store)
+    started = time.time()
+    if args.command == 'import':
+        summary = store.import_legacy(args.dirs or None, args.prune)
+        summary.update(store.stats())
+    elif args.command == 'put':
+        results = []
+        for name in args.dirs or ['-']:
+            if name == '-':
+                results.extend(read_results(sys.stdin.read()))
+            else:
+                with open(name, encoding='utf-8') as f:
+                    results.extend(read_results(f.read()))
+        videos = [result_video(result) for result in results if result and result.get('transcript')]
+        summary = {'results': len(results), 'stored': store.put_many(videos)}
+        summary.update(store.stats())
+    elif args.command == 'compact':
+        summary = store.compact()
+    else:
+        summary = store.stats()
+    summary['time_ms'] = int((time.time() - started) * 1000)
+    print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+const { PackFile } = require('./packfile');
+const { tokenize, findString } = require('./phrase-index');
+
+const PAD = '$';
+const MIN_FUZZY_LENGTH = 4; // 짧은 단어는 비슷한 단어가 너무 많아서 교정하지 않음
+const MAX_CORRECTIONS = 3; // 오타 단어 하나당 후보 수
+const MAX_ALTERNATIVES = 8; // 검색어 하나당 시도할 교정 구문 수
+
+/**
+ * 앞뒤에 $ 를 붙인 단어의 서로 다른 trigram (trigram_index.py 의 trigrams() 와 동일하게 유지)
+ * 코드 포인트 단위라 Python 과 같은 trigram 이 나옴
+ */
+function trigrams(term) {
+  const chars = Array.from(PAD + term + PAD);
+  const grams = new Set();
+  for (let i = 0; i + 3 <= chars.length; i++) {
+    grams.add(chars[i] + chars[i + 1] + chars[i + 2]);
+  }
+  return grams;
+}
+
+/**
+ * 오타 허용 편집 거리: 7자 이하 1, 8자부터 2
+ */
+function maxDistance(token) {
+  return token.length < 8 ? 1 : 2;
+}
+
+/**
+ * 이웃한 두 글자 바꿈도 편집 1번으로 세는 편집 거리 (optimal string alignment)
+ * limit 를 넘는 것이 확실해지면 바로 limit + 1 반환
+ * (후보마다 호출되므로 UTF-16 단위로 비교하고 세 줄 배열을 돌려 씀)
+ */
+function boundedDistance(a, b, limit) {
+  if (Math.abs(a.length - b.length) > limit) return limit + 1;
+
+  let before = new Int32Array(b.length + 1);
+  let previous = new Int32Array(b.length + 1);
+  let current = new Int32Array(b.length + 1);
+  for (let j = 0; j <= b.length; j++) previous[j] = j;
+  let previousMin = 0;
+  for (let i = 1; i <= a.length; i++) {
+    current[0] = i;
+    let rowMin = i;
+    for (let j = 1; j <= b.length; j++) {
+      let cost = Math.min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] === b[j - 1] ? 0 : 1));
+      if (i > 1 && j > 1 && a[i - 1] === b[j - 2] && a[i - 2] === b[j - 1]) {
+        cost = Math.min(cost, before[j - 2] + 1);
+      }
+      current[j] = cost;
+      if (cost < rowMin) rowMin = cost;
+    }
+    // 바꿈은 두 줄 전까지 참조하므로 두 줄 모두 limit 를 넘어야 중단
+    if (rowMin > limit && previousMin >= limit) return limit + 1;
+    [before, previous, current] = [previous, current, before];
+    previousMin = rowMin;
+  }
+  return previous[b.length] <= limit ? previous[b.length] : limit + 1;
+}
+
+/**
+ * trigram_index.py 가 만든 trigram 색인 로더 (오타 / 철자 차이 교정)
+ * 공유 trigram 수로 후보 단어를 추린 뒤 제한된 편집 거리로 확인
+ * → 교정된 구문은 phrase / lemma 색인으로 검색 (코퍼스 전체 유사도 스캔 대신)
+ */
+class TrigramIndex {
+  constructor(filePath) {
+    const pack = new PackFile(filePath);
+    this.pack = pack;
+    this.meta = pack.json('meta');
+    this.terms = pack.strings('terms');
+    this.termFrequency = pack.u32('term_frequency');
+    this.trigrams = pack.strings('trigrams');
+    this.trigramOffsets = pack.u32('trigram_offsets');
+    this.trigramTerms = pack.u32('trigram_terms');
+  }
+
+  /**
+   * fold() 한 단어와 가장 가까운 코퍼스 단어들 [{ term, distance }]
+   * (거리가 같으면 코퍼스에 자주 나오는 단어 우선)
+   */
+  corrections(token, limit = MAX_CORRECTIONS) {
+    if (token.length < MIN_FUZZY_LENGTH) return [];
+    const budget = maxDistance(token);
+    const grams = trigrams(token);
+    // 단어별 공유 trigram 수 (배열은 재사용, 건드린 단어만 기록해두고 끝나면 0 으로)
+    const shared = this.shared || (this.shared = new Uint8Array(this.terms.length));
+    const touched = [];
+    for (const gram of grams) {
+      const i = findString(this.trigrams, gram);
+      if (i === -1) continue;
+      for (let k = this.trigramOffsets[i]; k < this.trigramOffsets[i + 1]; k++) {
+        const termId = this.trigramTerms[k];
+        if (shared[termId]++ === 0) touched.push(termId);
+      }
+    }
+
+    // 편집 1번은 trigram 을 최대 3개, 바꿈은 4개까지 바꿈
+    const needed = Math.max(1, grams.size - 4 * budget);
+    const found = [];
+    const { offsets } = this.terms;
+    for (const termId of touched) {
+      const count = shared[termId];
+      shared[termId] = 0;
+      // UTF-8 바이트 수 ≥ 글자 수라 디코딩 전에 너무 짧은 단어를 거름
+      if (count < needed || offsets[termId + 1] - offsets[termId] < token.length - budget) continue;
+      const term = this.terms.get(termId);
+      if (Math.abs(term.length - token.length) > budget) continue;
+      const distance = boundedDistance(token, term, budget);
+      if (distance <= budget) {
+        found.push({ term, distance, frequency: this.termFrequency[termId] });
+      }
+    }
+    found.sort((a, b) => a.distance - b.distance || b.frequency - a.frequency || (a.term < b.term ? -1 : 1));
+    return found.slice(0, limit).map(({ term, distance }) => ({ term, distance }));
+  }
+
+  /**
+   * 교정한 검색어 후보들 (편집 수가 적은 순)
+   * known(term) 이 true 인 단어 (이미 코퍼스에 있는 단어) 는 그대로 둠
+   * 고칠 단어가 없거나 고칠 수 없는 단어가 있으면 빈 배열
+   */
+  alternatives(query, known, limit = MAX_ALTERNATIVES) {
+    const options = [];
+    for (const token of tokenize(query)) {
+      if (known(token)) {
+        options.push([{ term: token, distance: 0 }]);
+        continue;
+      }
+      const fixes = this.corrections(token);
+      if (fixes.length === 0) return [];
+      options.push(fixes);
+    }
+    if (options.every(fixes => fixes.length === 1 && fixes[0].distance === 0)) return [];
+
+    let beam = [{ cost: 0, words: [] }];
+    for (const fixes of options) {
+      beam = beam
+        .flatMap(({ cost, words }) => fixes.map(({ term, distance }) => ({ cost: cost + distance, words: [...words, term] })))
+        .sort((a, b) => a.cost - b.cost)
+        .slice(0, limit);
+    }
+    return beam.map(({ words }) => words.join(' '));
+  }
+}
+
+module.exports = { TrigramIndex, trigrams, boundedDistance };
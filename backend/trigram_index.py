@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Character-trigram index over the phrase index vocabulary
+Maps every trigram of every corpus term ("$shopping$" -> "$sh", "sho", ...)
+to the terms containing it. A misspelled query word is corrected by counting
+shared trigrams over a few short posting lists, keeping only terms that
+share enough of them to be within the edit budget, and verifying those with
+a bounded edit distance. The corrected phrase then goes through the phrase /
+lemma index like any other query, so "went shoping" or "the easyest job"
+cost a handful of lookups instead of a similarity scan over every segment
+(see trigram-index.js for the Node loader).
+
+Layout (packfile sections):
+    meta              JSON     version, counts, corpus_built_at
+    terms             STRINGS  phrase_index terms, same order
+    term_frequency    U32      [terms] occurrences of each term in the corpus
+    trigrams          STRINGS  sorted by UTF-8 bytes
+    trigram_offsets   U32      [trigrams + 1] slice of trigram_terms per trigram
+    trigram_terms     U32      term numbers, ascending per trigram
+
+Usage:
+    python trigram_index.py [--cache-dir DIR] [--phrase-index FILE] [--out FILE]
+    python trigram_index.py --query "went shoping"
+"""
+
+import argparse
+import bisect
+import json
+import os
+import time
+from array import array
+
+from corpus_pack import CACHE_DIR, CORPUS_FILE, Corpus
+from packfile import JSON, STRINGS, U32, PackFile, write_pack
+from phrase_index import INDEX_FILE as PHRASE_INDEX_FILE, PhraseIndex, find_string, tokenize
+
+INDEX_FILE = 'trigram_index.pack'
+INDEX_VERSION = 1
+PAD = '$'
+MIN_FUZZY_LENGTH = 4    # shorter words have too many neighbours to guess from
+MAX_CORRECTIONS = 3     # candidates kept per misspelled word
+MAX_ALTERNATIVES = 8    # corrected phrases tried per query
+
+
+def trigrams(term):
+    """Distinct padded trigrams of a term; keep in sync with trigrams() in trigram-index.js"""
+    padded = PAD + term + PAD
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_distance(token):
+    """Edit budget for a query word: 1 up to 7 characters, 2 from 8"""
+    return 1 if len(token) < 8 else 2
+
+
+def bounded_distance(a, b, limit):
+    """Edit distance of a and b counting a swap of neighbours as one edit
+    (optimal string alignment), or limit + 1 once it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous, previous_min = None, list(range(len(b) + 1)), 0
+    for i in range(1, len(a) + 1):
+        current = [i]
+        for j in range(1, len(b) + 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        # A swap reaches back two rows, so both must be over budget
+        current_min = min(current)
+        if current_min > limit and previous_min >= limit:
+            return limit + 1
+        before, previous, previous_min = previous, current, current_min
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+
+def build_trigram_index(phrase_path, out_path):
+    """Index the vocabulary of phrase_index.pack by trigram, returns the meta dict"""
+    phrase_index = PhraseIndex(phrase_path)
+    try:
+        terms = list(phrase_index.terms)
+        offsets = phrase_index.term_offsets
+        term_frequency = array('I', (offsets[i + 1] - offsets[i] for i in range(len(terms))))
+        corpus_built_at = phrase_index.meta['corpus_built_at']
+    finally:
+        phrase_index.close()
+
+    postings = {}
+    for term_id, term in enumerate(terms):
+        for trigram in trigrams(term):
+            term_ids = postings.get(trigram)
+            if term_ids is None:
+                term_ids = postings[trigram] = array('I')
+            term_ids.append(term_id)
+
+    keys = sorted(postings, key=lambda trigram: trigram.encode('utf-8'))
+    trigram_offsets = array('I', [0])
+    flat = array('I')
+    for trigram in keys:
+        flat.extend(postings[trigram])
+        trigram_offsets.append(len(flat))
+
+    meta = {
+        'version': INDEX_VERSION,
+        'terms': len(terms),
+        'trigrams': len(keys),
+        'postings': len(flat),
+        'corpus_built_at': corpus_built_at,
+        'built_at': int(time.time())
+    }
+    write_pack(out_path, {
+        'meta': (JSON, meta),
+        'terms': (STRINGS, terms),
+        'term_frequency': (U32, term_frequency),
+        'trigrams': (STRINGS, keys),
+        'trigram_offsets': (U32, trigram_offsets),
+        'trigram_terms': (U32, flat)
+    })
+    return meta
+
+
+def index_cache_dir(cache_dir=CACHE_DIR, out_path=None):
+    return build_trigram_index(
+        os.path.join(cache_dir, PHRASE_INDEX_FILE),
+        out_path or os.path.join(cache_dir, INDEX_FILE)
+    )
+
+
+class TrigramIndex:
+    """Memory-mapped trigram_index.pack reader"""
+
+    def __init__(self, path):
+        self.pack = PackFile(path)
+        self.meta = self.pack.json('meta')
+        self.terms = self.pack.strings('terms')
+        self.term_frequency = self.pack.u32('term_frequency')
+        self.trigrams = self.pack.strings('trigrams')
+        self.trigram_offsets = self.pack.u32('trigram_offsets')
+        self.trigram_terms = self.pack.u32('trigram_terms')
+
+    def corrections(self, token, limit=MAX_CORRECTIONS):
+        """[(term, distance)] closest corpus terms to a folded word, most frequent first on ties"""
+        if len(token) < MIN_FUZZY_LENGTH:
+            return []
+        budget = max_distance(token)
+        grams = trigrams(token)
+        shared = {}
+        for trigram in grams:
+            i = find_string(self.trigrams, trigram)
+            if i is None:
+                continue
+            for term_id in self.trigram_terms[self.trigram_offsets[i]:self.trigram_offsets[i + 1]]:
+                shared[term_id] = shared.get(term_id, 0) + 1
+
+        # One edit changes at most three trigrams, a swap four
+        needed = max(1, len(grams) - 4 * budget)
+        found = []
+        for term_id, count in shared.items():
+            if count < needed:
+                continue
+            term = self.terms[term_id]
+            distance = bounded_distance(token, term, budget)
+            if distance <= budget:
+                found.append((distance, -self.term_frequency[term_id], term))
+        found.sort()
+        return [(term, distance) for distance, _, term in found[:limit]]
+
+    def alternatives(self, phrase, known, limit=MAX_ALTERNATIVES):
+        """Corrected spellings of a phrase, fewest edits first
+
+        known(term) says whether a query word is already a corpus term; those
+        words are kept as they are. Empty when nothing needs or allows fixing.
+        """
+        options = []
+        for token in tokenize(phrase):
+            if known(token):
+                options.append([(token, 0)])
+                continue
+            fixes = self.corrections(token)
+            if not fixes:
+                return []
+            options.append(fixes)
+        if not options or all(len(o) == 1 and o[0][1] == 0 for o in options):
+            return []
+
+        beam = [(0, [])]
+        for fixes in options:
+            beam = sorted(
+                ((cost + distance, words + [term]) for cost, words in beam for term, distance in fixes),
+                key=lambda entry: entry[0]
+            )[:limit]
+        return [' '.join(words) for _, words in beam]
+
+    def close(self):
+        self.pack.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the trigram index for typo-tolerant search')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--phrase-index', help=f'phrase index (default: <cache-dir>/{PHRASE_INDEX_FILE})')
+    parser.add_argument('--out', help=f'output file (default: <cache-dir>/{INDEX_FILE})')
+    parser.add_argument('--query', help='correct and look up a phrase in existing indexes instead')
+    args = parser.parse_args()
+
+    phrase_path = args.phrase_index or os.path.join(args.cache_dir, PHRASE_INDEX_FILE)
+    index_path = args.out or os.path.join(args.cache_dir, INDEX_FILE)
+
+    started = time.time()
+    if args.query:
+        index, phrase_index = TrigramIndex(index_path), PhraseIndex(phrase_path)
+        corpus = Corpus(os.path.join(args.cache_dir, CORPUS_FILE))
+        corrected, hits = None, []
+        for alternative in index.alternatives(args.query, lambda term: phrase_index.term_id(term) is not None):
+            segments = phrase_index.find(alternative)
+            if segments:
+                corrected = alternative
+                for segment in segments:
+                    video = bisect.bisect_right(corpus.first_segment, segment) - 1
+                    hits.append({
+                        'video_id': corpus.video_ids[video],
+                        'start_ms': corpus.start_ms[segment],
+                        'text': corpus.texts[segment]
+                    })
+                break
+        print(json.dumps({'query': args.query, 'corrected': corrected, 'hits': hits,
+                          'time_ms': round((time.time() - started) * 1000, 3)}, ensure_ascii=False))
+        return
+
+    meta = build_trigram_index(phrase_path, index_path)
+    meta['time_ms'] = int((time.time() - started) * 1000)
+    print(json.dumps(meta))
+
+
+if __name__ == '__main__':
+    main()
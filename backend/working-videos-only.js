@@ -51,7 +51,12 @@ async function createQualityDatabase() {
   // Clear existing problematic data
   console.log('🧹 Clearing problematic videos from database...');
   await lazySystem.db.run('DELETE FROM videos WHERE transcript_processed = FALSE');
-  await lazySystem.db.run('DELETE FROM transcripts WHERE video_id NOT IN (SELECT id FROM videos WHERE transcript_processed = TRUE)');
+  const orphaned = await lazySystem.db.all('SELECT DISTINCT video_id FROM transcript_blocks WHERE video_id NOT IN (SELECT id FROM videos WHERE transcript_processed = TRUE)');
+  await lazySystem.inTransaction(async () => {
+    for (const { video_id } of orphaned) {
+      await lazySystem.deleteTranscriptBlocks(video_id); // also drops their search terms
+    }
+  });
   
   // Add confirmed working videos
   console.log('📥 Adding confirmed working videos...');
@@ -9,6 +9,7 @@ interface VideoClip {
   videoId: string;
   title: string;
   startTime: number;
+  startMs?: number; // 정확한 시작 위치 (ms)
   searchQuery: string;
   transcript: string;
   contextualText?: string; // 앞뒤 문장 포함된 텍스트
@@ -19,13 +20,42 @@ interface SearchResult {
   videoId: string;
   title: string;
   startTime: number;
+  startMs?: number; // 정확한 시작 위치 (ms)
   transcript: string;
   contextualText?: string; // 앞뒤 문장 포함된 텍스트
+  contextOffset?: number; // contextualText 안에서 transcript 가 시작하는 위치
+  highlights?: [number, number][]; // transcript 안의 매치 문자 범위
   similarity: number;
   searchQuery: string;
 }
 
+interface Suggestion {
+  phrase: string;
+  count: number;
+}
+
 const API_BASE_URL = process.env.REACT_APP_API_URL || '/api';
+const SUGGEST_DELAY_MS = 120; // 입력이 잠깐 멈췄을 때만 자동완성 요청
+
+// 클립 시작 위치 (초), ms 정보가 있으면 소수점까지 정확하게
+const clipStartSeconds = (clip: VideoClip) =>
+  typeof clip.startMs === 'number' ? clip.startMs / 1000 : clip.startTime;
+
+const escapeHtml = (text: string) =>
+  text.replace(/[&<>"']/g, c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c] as string));
+
+// 서버가 준 매치 문자 범위를 <mark> 로 표시 (범위가 없으면 그대로)
+const markHighlights = (text: string | undefined, highlights?: [number, number][], offset = 0) => {
+  if (!text || !highlights || highlights.length === 0) return text;
+  let html = '';
+  let cursor = 0;
+  for (const [start, end] of highlights) {
+    if (start + offset < cursor) continue;
+    html += escapeHtml(text.slice(cursor, start + offset)) + '<mark>' + escapeHtml(text.slice(start + offset, end + offset)) + '</mark>';
+    cursor = end + offset;
+  }
+  return html + escapeHtml(text.slice(cursor));
+};
 
 // Helper function to safely render highlighted text
 const HighlightedText: React.FC<{ text: string }> = ({ text }) => {
@@ -71,6 +101,9 @@ function App() {
   const [player, setPlayer] = useState<any>(null);
   const [isPlayerReady, setIsPlayerReady] = useState(false);
   const [showContext, setShowContext] = useState(true); // 맥락 표시 여부
+  const [suggestions, setSuggestions] = useState<Suggestion[]>([]);
+  const [showSuggestions, setShowSuggestions] = useState(false);
+  const [activeSuggestion, setActiveSuggestion] = useState(-1); // 방향키로 고른 자동완성
   const playerRef = useRef<HTMLDivElement>(null);
 
   // YouTube iframe API 로드
@@ -115,12 +148,17 @@ function App() {
         height: '100%',
         width: '100%',
         playerVars: {
-          start: currentClip.startTime,
+          start: Math.floor(currentClip.startTime),
           autoplay: 1,
           rel: 0,
         },
         events: {
           onReady: (event: any) => {
+            // playerVars.start는 정수 초만 받으므로 남은 소수점만큼 앞으로 이동
+            const preciseStart = clipStartSeconds(currentClip);
+            if (preciseStart > Math.floor(currentClip.startTime)) {
+              event.target.seekTo(preciseStart, true);
+            }
             setIsPlayerReady(true);
             setPlayer(event.target);
             console.log('Player ready');
@@ -138,18 +176,46 @@ function App() {
         currentPlayer.destroy();
       }
     };
-  }, [currentClip?.videoId, currentClip?.startTime]); // eslint-disable-line react-hooks/exhaustive-deps
+  }, [currentClip?.videoId, currentClip?.startTime, currentClip?.startMs]); // eslint-disable-line react-hooks/exhaustive-deps
 
-  const handleSearch = async () => {
-    if (!searchQuery.trim()) return;
+  // 입력하는 동안 자동완성 구문 가져오기 (이전 요청은 취소)
+  useEffect(() => {
+    if (!searchQuery.trim()) {
+      setSuggestions([]);
+      return;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axios.get(`${API_BASE_URL}/suggest`, {
+          params: { q: searchQuery, limit: 8 },
+          signal: controller.signal,
+          timeout: 2000
+        });
+        setSuggestions(Array.isArray(response.data?.suggestions) ? response.data.suggestions : []);
+        setActiveSuggestion(-1);
+      } catch (error) {
+        // 자동완성은 없어도 검색에 지장 없음
+        if (!axios.isCancel(error)) setSuggestions([]);
+      }
+    }, SUGGEST_DELAY_MS);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [searchQuery]);
+
+  const handleSearch = async (query: string = searchQuery) => {
+    if (!query.trim()) return;
+    setShowSuggestions(false);
     
     setIsLoading(true);
-    console.log('🔍 Starting search for:', searchQuery);
+    console.log('🔍 Starting search for:', query);
     
     try {
-      console.log('Searching for:', searchQuery);
+      console.log('Searching for:', query);
       const response = await axios.get(`${API_BASE_URL}/search`, {
-        params: { query: searchQuery },
+        params: { query },
         timeout: 10000 // 10초 타임아웃 추가
       });
       
@@ -187,9 +253,10 @@ function App() {
           videoId: firstResult.videoId,
           title: firstResult.title,
           startTime: firstResult.startTime,
-          searchQuery: searchQuery,
-          transcript: firstResult.transcript || firstResult.text || '',
-          contextualText: firstResult.contextualText,
+          startMs: firstResult.startMs,
+          searchQuery: query,
+          transcript: markHighlights(firstResult.transcript, firstResult.highlights) || firstResult.text || '',
+          contextualText: markHighlights(firstResult.contextualText, firstResult.highlights, firstResult.contextOffset),
           similarity: firstResult.similarity
         };
         
@@ -204,7 +271,7 @@ function App() {
         message: error.message,
         response: error.response?.data,
         status: error.response?.status,
-        searchQuery: searchQuery
+        searchQuery: query
       });
       
       if (error.code === 'ECONNABORTED') {
@@ -220,6 +287,30 @@ function App() {
     }
   };
 
+  const handleSelectSuggestion = (phrase: string) => {
+    setSearchQuery(phrase);
+    handleSearch(phrase);
+  };
+
+  const handleSearchKeyDown = (e: React.KeyboardEvent<HTMLInputElement>) => {
+    const open = showSuggestions && suggestions.length > 0;
+    if (e.key === 'ArrowDown' && open) {
+      e.preventDefault();
+      setActiveSuggestion((activeSuggestion + 1) % suggestions.length);
+    } else if (e.key === 'ArrowUp' && open) {
+      e.preventDefault();
+      setActiveSuggestion(activeSuggestion <= 0 ? suggestions.length - 1 : activeSuggestion - 1);
+    } else if (e.key === 'Escape') {
+      setShowSuggestions(false);
+    } else if (e.key === 'Enter' && !isLoading) {
+      if (open && activeSuggestion >= 0) {
+        handleSelectSuggestion(suggestions[activeSuggestion].phrase);
+      } else {
+        handleSearch();
+      }
+    }
+  };
+
   const handleSaveClip = () => {
     if (currentClip && !savedClips.find(clip => clip.id === currentClip.id)) {
       setSavedClips([...savedClips, currentClip]);
@@ -237,9 +328,10 @@ function App() {
         videoId: prevResult.videoId,
         title: prevResult.title,
         startTime: prevResult.startTime,
+        startMs: prevResult.startMs,
         searchQuery: searchQuery,
-        transcript: prevResult.transcript,
-        contextualText: prevResult.contextualText,
+        transcript: markHighlights(prevResult.transcript, prevResult.highlights) || '',
+        contextualText: markHighlights(prevResult.contextualText, prevResult.highlights, prevResult.contextOffset),
         similarity: prevResult.similarity
       };
       
@@ -260,9 +352,10 @@ function App() {
         videoId: nextResult.videoId,
         title: nextResult.title,
         startTime: nextResult.startTime,
+        startMs: nextResult.startMs,
         searchQuery: searchQuery,
-        transcript: nextResult.transcript,
-        contextualText: nextResult.contextualText,
+        transcript: markHighlights(nextResult.transcript, nextResult.highlights) || '',
+        contextualText: markHighlights(nextResult.contextualText, nextResult.highlights, nextResult.contextOffset),
         similarity: nextResult.similarity
       };
       
@@ -291,7 +384,7 @@ function App() {
 
   const handleGoToSearchTime = () => {
     if (player && isPlayerReady && currentClip) {
-      player.seekTo(currentClip.startTime, true);
+      player.seekTo(clipStartSeconds(currentClip), true);
     }
   };
 
@@ -323,17 +416,44 @@ function App() {
             <div className="card">
               <h2 style={{ fontSize: '20px', fontWeight: '600', marginBottom: '20px' }}>영어 표현 검색</h2>
               <div className="search-container">
-                <input
-                  type="text"
-                  value={searchQuery}
-                  onChange={(e) => setSearchQuery(e.target.value)}
-                  onKeyPress={(e) => e.key === 'Enter' && !isLoading && handleSearch()}
-                  placeholder="예: 'give you up', 'never gonna', 'strangers to love'"
-                  className="search-input"
-                  disabled={isLoading}
-                />
+                <div className="search-input-wrapper">
+                  <input
+                    type="text"
+                    value={searchQuery}
+                    onChange={(e) => {
+                      setSearchQuery(e.target.value);
+                      setShowSuggestions(true);
+                    }}
+                    onKeyDown={handleSearchKeyDown}
+                    onFocus={() => setShowSuggestions(true)}
+                    onBlur={() => setShowSuggestions(false)}
+                    placeholder="예: 'give you up', 'never gonna', 'strangers to love'"
+                    className="search-input"
+                    disabled={isLoading}
+                    autoComplete="off"
+                  />
+                  {/* 자동완성 (코퍼스에 자주 나오는 구문 순) */}
+                  {showSuggestions && suggestions.length > 0 && (
+                    <ul className="suggestions">
+                      {suggestions.map((suggestion, index) => (
+                        <li
+                          key={suggestion.phrase}
+                          className={index === activeSuggestion ? 'suggestion active' : 'suggestion'}
+                          // blur 보다 먼저 처리되도록 mousedown 에서 선택
+                          onMouseDown={(e) => {
+                            e.preventDefault();
+                            handleSelectSuggestion(suggestion.phrase);
+                          }}
+                        >
+                          <span>{suggestion.phrase}</span>
+                          <span className="suggestion-count">{suggestion.count}</span>
+                        </li>
+                      ))}
+                    </ul>
+                  )}
+                </div>
                 <button
-                  onClick={handleSearch}
+                  onClick={() => handleSearch()}
                   disabled={isLoading}
                   className="button"
                 >